@@ -1,10 +1,10 @@
 # database/mongo_client.py
-from pymongo import MongoClient
 from passlib.context import CryptContext
 from bson import ObjectId
 from datetime import datetime
 from typing import List, Dict, Optional
 from scripts.helper.logConfig import get_logger
+from scripts.Initialize import CInitialize
 from scripts.config import load_config
 
 logger = get_logger("MongoDBClient")
@@ -12,8 +12,12 @@ logger = get_logger("MongoDBClient")
 class MongoDBClient:
     def __init__(self):
         config = load_config()
-        self.client = MongoClient(config["MONGODB_URI"])
+        init = CInitialize()
+        self.client = init.MInitializeMongo()
         self.db = self.client["mineai"]
+        # Non-blocking client for async routes; self.db stays for the sync helpers below
+        self.async_client = init.MInitializeAsyncMongo()
+        self.async_db = self.async_client["mineai"]
         self.files_collection = self.db["files"]
         self.chat_sessions_collection = self.db["chat_sessions"]
         self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
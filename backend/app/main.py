@@ -4,19 +4,30 @@ from pydantic import BaseModel, EmailStr
 from bson import ObjectId
 from datetime import datetime
 from typing import Optional
+from collections import OrderedDict
 
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
 import os
-import boto3
-from botocore.client import Config
+import re
+import time
+import uuid
 import io
+import threading
 import google.auth.transport.requests
 import google.oauth2.id_token
 
-from scripts.AgentGraph import AgentGraphBuilder
+from scripts.AgentGraph import AgentGraphBuilder, PROMPT_VERSION
+from scripts.Initialize import CInitialize
 from scripts.VectorStore import CVectorStore
+from scripts.PdfExtractor import PDF_EXTRACTORS
+from scripts.helper.asyncPool import RunInThreadPool, GetThreadPool
+from scripts.helper.singleFlight import CSingleFlight
+from scripts.helper.tracing import Trace, Span, QueueTraceExport, CurrentRequestId
+from scripts.helper.profiling import CProfileGate, ProfileCall
+from scripts.helper.metrics import REQUEST_LATENCY, CACHE_REQUESTS, INGEST_IN_PROGRESS, WORKER_QUEUE_DEPTH
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 from app.models.schemas import (
     ChatCreateRequest, ChatCreateResponse,
@@ -52,9 +63,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Trace each request: spans from graph nodes and client calls are summarised in Server-Timing and exported."""
+    with Trace(request.headers.get("X-Request-ID")) as trace:
+        start = time.perf_counter()
+        response = await call_next(request)
+        if trace is not None:
+            response.headers["X-Request-ID"] = trace.RequestId
+            response.headers["Server-Timing"] = trace.MServerTiming((time.perf_counter() - start) * 1000)
+            # Written by a background thread, off the response path
+            QueueTraceExport(trace)
+    return response
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep the series count bounded
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status)
+        ).observe(time.perf_counter() - start)
+
+WORKER_QUEUE_DEPTH.set_function(lambda: GetThreadPool()._work_queue.qsize())
+
 # Initialize MongoDB
 mongo_client = MongoDBClient()
-mongo_db = mongo_client.db
+mongo_db = mongo_client.async_db
 users_col = mongo_db["users"]
 
 # Global variables
@@ -69,6 +112,74 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 namespace = None
 graph_app = None
 
+# Compiled agent graphs keyed by their sorted namespaces, so repeat chats skip the build.
+# Called from worker-pool threads: agent_graphs_lock guards the cache, and a per-key lock
+# makes concurrent misses for the same namespaces wait for one build instead of each building
+agent_graphs = OrderedDict()
+agent_graphs_lock = threading.Lock()
+agent_graph_builds = {}
+
+
+def cached_agent_graph(key):
+    """Return the cached graph for key (marking it recently used), or None. Caller holds agent_graphs_lock."""
+    graph = agent_graphs.get(key)
+    if graph is not None:
+        agent_graphs.move_to_end(key)
+    return graph
+
+
+def get_agent_graph(namespaces):
+    key = tuple(sorted(namespaces))
+    with agent_graphs_lock:
+        graph = cached_agent_graph(key)
+        if graph is None:
+            build_lock = agent_graph_builds.setdefault(key, threading.Lock())
+    if graph is not None:
+        CACHE_REQUESTS.labels(cache="agent_graph", result="hit").inc()
+        return graph
+    with build_lock:
+        with agent_graphs_lock:
+            graph = cached_agent_graph(key)
+        if graph is not None:
+            # Another request built it while this one waited
+            CACHE_REQUESTS.labels(cache="agent_graph", result="hit").inc()
+            return graph
+        CACHE_REQUESTS.labels(cache="agent_graph", result="miss").inc()
+        try:
+            graph = AgentGraphBuilder(list(key)).build()
+            with agent_graphs_lock:
+                agent_graphs[key] = graph
+                while len(agent_graphs) > load_config().get("AgentGraphCacheSize", 64):
+                    agent_graphs.popitem(last=False)
+        finally:
+            with agent_graphs_lock:
+                agent_graph_builds.pop(key, None)
+    return graph
+
+
+# Identical chat turns arriving together share one graph run
+chat_flights = CSingleFlight()
+
+
+def chat_flight_key(question, namespaces, selected_files):
+    """Coalescing key for a chat turn: whitespace/case-normalised question, namespace set, route input and prompt version.
+
+    Turns without selected files always take the master route while the others go
+    through the intent router, so the two never share a run. Followers share the
+    leader's memory save too, which goes to the same namespace set's memory.
+    """
+    return (" ".join(question.split()).casefold(), tuple(sorted(set(namespaces))), bool(selected_files), PROMPT_VERSION)
+
+
+async def run_chat_turn(graph, state, namespaces, profile_dir=None):
+    # A profiled turn must run its own graph, so it is never coalesced
+    if profile_dir is not None or not config.get("ChatSingleFlightEnabled", True):
+        return await run_agent_graph(graph, state, profile_dir)
+    result, shared = await chat_flights.MDo(chat_flight_key(state["question"], namespaces, state["selected_files"]), run_agent_graph, graph, state)
+    CACHE_REQUESTS.labels(cache="chat_single_flight", result="hit" if shared else "miss").inc()
+    return result
+
+
 def ensure_graph_loaded():
     global namespace, graph_app
     if graph_app is None:
@@ -79,38 +190,73 @@ def ensure_graph_loaded():
     return graph_app
 
 
+config = load_config()
+PROFILE_DIR = config.get("ProfileDir", "Data/Profiles")
+# Admin-only: profiling stays off unless PROFILING_ADMIN_TOKEN is set in the environment
+profile_gate = CProfileGate(
+    config.get("PROFILING_ADMIN_TOKEN"),
+    config.get("ProfilingMaxPerWindow", 5),
+    config.get("ProfilingWindowSeconds", 3600)
+)
+
+
+def profile_directory(http_request: Request):
+    """Return the profile artifact directory when the request asked to be profiled (X-Profile: 1 or ?profile=1), else None."""
+    flag = http_request.headers.get("X-Profile") or http_request.query_params.get("profile")
+    if flag not in ("1", "true"):
+        return None
+    if not profile_gate.MAuthorized(http_request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=403, detail="Profiling requires a valid X-Admin-Token")
+    if not profile_gate.MAcquire():
+        raise HTTPException(status_code=429, detail="Profiling rate limit reached, try again later")
+    # The id is generated here; the client's request id is only a readable prefix, so it can
+    # neither escape PROFILE_DIR nor overwrite an earlier profile
+    request_id = re.sub(r"[^A-Za-z0-9_-]", "", CurrentRequestId() or "")[:64]
+    profile_id = f"{request_id}-{uuid.uuid4().hex}" if request_id else uuid.uuid4().hex
+    return os.path.join(PROFILE_DIR, profile_id)
+
+
+async def run_agent_graph(graph, state, profile_dir=None):
+    if profile_dir is None:
+        return await graph.ainvoke(state)
+    # cProfile sees one thread, so a profiled turn runs the sync graph on a single worker thread
+    return await RunInThreadPool(ProfileCall, profile_dir, graph.invoke, state)
+
+
+def upload_to_r2(file_content, filename):
+    # Cloudflare R2 client (the local object store in ProviderMode "local")
+    R2_BUCKET_NAME = os.getenv("R2_BUCKET_NAME", "local")
+    s3 = CInitialize().MInitializeObjectStore(os.getenv("R2_ENDPOINT"))
+    with Span("r2.upload", bytes=len(file_content)):
+        s3.upload_fileobj(
+            Fileobj=io.BytesIO(file_content),
+            Bucket=R2_BUCKET_NAME,
+            Key=filename
+        )
+
+
 @app.post("/upload")
 async def upload_file(
+    http_request: Request,
+    response: Response,
     file: UploadFile = File(...),
     name: str = Form(...),
     email: str = Form(...),
-    picture: str = Form(None)
+    picture: str = Form(None),
+    extractor: str = Form(None)
 ):
-    # Cloudflare R2 credentials from environment
-    R2_ACCESS_KEY_ID = os.getenv("R2_ACCESS_KEY_ID")
-    R2_SECRET_ACCESS_KEY = os.getenv("R2_SECRET_ACCESS_KEY")
-    R2_ENDPOINT = os.getenv("R2_ENDPOINT")
-    R2_BUCKET_NAME = os.getenv("R2_BUCKET_NAME")
+    if extractor and extractor != "auto" and extractor not in PDF_EXTRACTORS:
+        raise HTTPException(status_code=400, detail=f"Unknown extractor '{extractor}'")
+    profile_dir = profile_directory(http_request)
 
     # Read file content
     file_content = await file.read()
     file_size = len(file_content)
 
-    # Upload to R2
-    session = boto3.session.Session()
-    s3 = session.client(
-        service_name="s3",
-        aws_access_key_id=R2_ACCESS_KEY_ID,
-        aws_secret_access_key=R2_SECRET_ACCESS_KEY,
-        endpoint_url=R2_ENDPOINT,
-        config=Config(signature_version="s3v4")
-    )
-    s3.upload_fileobj(
-        Fileobj=io.BytesIO(file_content),
-        Bucket=R2_BUCKET_NAME,
-        Key=file.filename
-    )
-    r2_url = f"{os.getenv('R2_PUBLIC_DOMAIN').rstrip('/')}/{file.filename}"
+    # Upload to R2 (boto3 blocks, so it runs on the worker pool)
+    await RunInThreadPool(upload_to_r2, file_content, file.filename)
+    public_domain = os.getenv("R2_PUBLIC_DOMAIN")
+    r2_url = f"{public_domain.rstrip('/')}/{file.filename}" if public_domain else f"local://{file.filename}"
 
     # Store file in vector database and get namespace
     vector = CVectorStore()
@@ -120,7 +266,14 @@ async def upload_file(
         with open(temp_path, "wb") as f:
             f.write(file_content)
         
-        status, file_namespace = vector.MStoreFileInVectorDB(temp_path)
+        with INGEST_IN_PROGRESS.track_inprogress():
+            if profile_dir is not None:
+                # cProfile can't see extraction pool processes, so a profiled upload extracts in-process
+                vector.PdfExtractWorkers = 1
+                status, file_namespace = await RunInThreadPool(ProfileCall, profile_dir, vector.MStoreFileInVectorDB, temp_path, extractor)
+                response.headers["X-Profile-Id"] = os.path.basename(profile_dir)
+            else:
+                status, file_namespace = await RunInThreadPool(vector.MStoreFileInVectorDB, temp_path, extractor)
         os.remove(temp_path)  # Clean up temp file
     else:
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
@@ -138,7 +291,12 @@ async def upload_file(
     }
     await mongo_db["uploads"].insert_one(file_doc)
 
-    return {"message": "File uploaded to R2 and metadata saved.", "file": file_doc["file"]}
+    return {"message": "File uploaded to R2 and metadata saved.", "file": file_doc["file"], "ingest_report": vector.IngestReport}
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/files")
 def list_files():
@@ -154,13 +312,16 @@ async def set_selected_files(request: Request):
     return {"status": "received"}
 
 @app.post("/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request, response: Response):
     global graph_app
+    profile_dir = profile_directory(http_request)
+    if profile_dir is not None:
+        response.headers["X-Profile-Id"] = os.path.basename(profile_dir)
     
     if not selected_files:
         # Use default namespace
-        graph_app = ensure_graph_loaded()
-        result = graph_app.invoke({"question": request.question, "selected_files": []})
+        graph_app = await RunInThreadPool(ensure_graph_loaded)
+        result = await run_chat_turn(graph_app, {"question": request.question, "selected_files": []}, [namespace], profile_dir)
         return {"answer": result["answer"]}
     
     try:
@@ -174,9 +335,9 @@ async def chat(request: ChatRequest):
         if not namespaces:
             raise HTTPException(status_code=400, detail="No valid files selected")
         
-        # Create a new graph for the selected namespaces
-        graph_app = AgentGraphBuilder(namespaces).build()
-        result = graph_app.invoke({"question": request.question, "selected_files": selected_files})
+        # Reuse the compiled graph for these namespaces; building one loads models, so it runs off the loop
+        graph_app = await RunInThreadPool(get_agent_graph, namespaces)
+        result = await run_chat_turn(graph_app, {"question": request.question, "selected_files": selected_files}, namespaces, profile_dir)
         return {"answer": result["answer"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,5 +1,4 @@
 # services/file_service.py
-import boto3
 import os
 import uuid
 from datetime import datetime
@@ -7,6 +6,8 @@ from typing import Tuple, Optional, List
 from botocore.exceptions import ClientError
 from scripts.helper.logConfig import get_logger
 from scripts.config import load_config
+from scripts.Initialize import CInitialize
+from scripts.LocalProviders import IsLocalMode
 
 logger = get_logger("FileService")
 
@@ -15,6 +16,15 @@ class FileService:
         """Initialize Cloudflare R2 client using S3-compatible API"""
         try:
             config = load_config()
+            self.public_domain = config.get("R2_PUBLIC_DOMAIN")
+            
+            if IsLocalMode(config):
+                # Filesystem-backed stand-in; no R2 credentials needed
+                self.bucket_name = config.get("R2_BUCKET_NAME", "local")
+                self.endpoint_url = "local:/"
+                self.s3_client = CInitialize().MInitializeObjectStore()
+                logger.info("FileService initialized with the local object store")
+                return
             
             # Cloudflare R2 credentials
             self.access_key_id = config.get("R2_ACCESS_KEY_ID")
@@ -29,16 +39,7 @@ class FileService:
             self.endpoint_url = f"https://{self.account_id}.r2.cloudflarestorage.com"
             
             # Initialize boto3 client for R2
-            self.s3_client = boto3.client(
-                's3',
-                endpoint_url=self.endpoint_url,
-                aws_access_key_id=self.access_key_id,
-                aws_secret_access_key=self.secret_access_key,
-                region_name='auto'  # R2 uses 'auto' as region
-            )
-            
-            # Public domain for file URLs (if you have a custom domain configured)
-            self.public_domain = config.get("R2_PUBLIC_DOMAIN")
+            self.s3_client = CInitialize().MInitializeObjectStore(self.endpoint_url)
             
             logger.info("FileService initialized successfully with Cloudflare R2")
             
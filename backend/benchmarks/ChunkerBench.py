@@ -0,0 +1,87 @@
+"""Compare the token-aware chunker with LangChain's RecursiveCharacterTextSplitter.
+
+Reports chunks/s and pages/s for each splitter, plus the token-size spread of
+the chunks they produce (measured with the embedding model's tokenizer).
+
+Run from the backend directory:
+    python -m benchmarks.ChunkerBench --pages 500 --strategy sentence
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from benchmarks.SyntheticPdf import MakePageLines
+from scripts.Chunker import CTokenChunker
+
+
+def MakeDocuments(Pages: int, Seed: int = 0) -> list:
+    rng = random.Random(Seed)
+    return [
+        Document(page_content="\n".join(MakePageLines(rng, page + 1, "Synthetic Benchmark Corpus")), metadata={"page": page})
+        for page in range(Pages)
+    ]
+
+
+def Measure(Name: str, Split, Documents: list, Chunker: CTokenChunker, Repeats: int) -> dict:
+    timings = []
+    chunks = []
+    for _ in range(Repeats):
+        start = time.perf_counter()
+        chunks = Split(Documents)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    tokens = Chunker.MCountTokens([chunk.page_content for chunk in chunks])
+    return {
+        "splitter": Name,
+        "chunks": len(chunks),
+        "best_seconds": round(best, 4),
+        "chunks_per_second": round(len(chunks) / best, 1),
+        "pages_per_second": round(len(Documents) / best, 1),
+        "tokens_mean": round(statistics.mean(tokens), 1),
+        "tokens_max": max(tokens),
+        "tokens_stdev": round(statistics.pstdev(tokens), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--strategy", default="sentence", choices=["sentence", "paragraph"])
+    parser.add_argument("--chunk-size", type=int, default=240, help="Token budget per chunk")
+    parser.add_argument("--chunk-overlap", type=int, default=32)
+    parser.add_argument("--model", default=None, help="Tokenizer model (default: EmbeddingModel from config.json)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    settings = {"strategy": args.strategy, "chunk_size": args.chunk_size, "chunk_overlap": args.chunk_overlap}
+    chunker = CTokenChunker(args.model, {"default": settings})
+    documents = MakeDocuments(args.pages)
+    chunker.MCountTokens(["warm up"])  # load the tokenizer outside the timed region
+
+    langchain_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    results = [
+        Measure("langchain_recursive_1000c", langchain_splitter.split_documents, documents, chunker, args.repeats),
+        Measure(f"token_{args.strategy}_{args.chunk_size}t", chunker.MSplitDocuments, documents, chunker, args.repeats),
+    ]
+    for row in results:
+        print(
+            f"{row['splitter']:<28} {row['chunks_per_second']:>10} chunks/s  {row['pages_per_second']:>8} pages/s  "
+            f"tokens mean {row['tokens_mean']} max {row['tokens_max']} stdev {row['tokens_stdev']}"
+        )
+
+    report = {"pages": args.pages, "settings": settings, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
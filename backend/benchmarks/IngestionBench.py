@@ -0,0 +1,170 @@
+"""Measure ingestion throughput stage by stage on a synthetic PDF corpus.
+
+Runs the CVectorStore ingestion path (MGenerateFileHash -> MPDFLoader ->
+MPrepareChunks -> embedding -> upsert) and reports pages/s, chunks/s,
+embeddings/s, vectors/s and peak RSS for every combination of page count,
+extraction workers, embedding batch size and upsert batch size. Each
+combination runs in a fresh process so peak RSS is not polluted by earlier
+runs. The embed/upsert split comes from the request-tracing spans, so keep
+TracingEnabled on.
+
+Uses the local stand-in providers (ProviderMode "local") unless
+PROVIDER_MODE is already set in the environment; with PROVIDER_MODE=live the
+configured embedding model and Pinecone index are measured, and each run's
+namespace is deleted afterwards.
+
+Run from the backend directory:
+    python -m benchmarks.IngestionBench --pages 10 100 1000 --workers 1 4 --embed-batch-sizes 32 64 128
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.SyntheticPdf import BuildCorpus
+
+
+def _PeakRssMB(Who=resource.RUSAGE_SELF) -> float:
+    peak = resource.getrusage(Who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _Rate(Count: int, Seconds: float) -> float:
+    return round(Count / Seconds, 2) if Seconds else None
+
+
+def _RunOnce(PDFPath: str, Workers: int, EmbedBatchSize: int, UpsertBatchSize: int, Repeats: int) -> dict:
+    """Ingest the PDF `Repeats` times in this process and return the best time per stage."""
+    from scripts.Initialize import CInitialize
+    from scripts.VectorStore import CVectorStore
+    from scripts.helper.tracing import Trace
+
+    vector = CVectorStore()
+    vector.PdfExtractWorkers = Workers
+    vector.EmbedBatchSize = EmbedBatchSize
+    vector.UpsertBatchSize = UpsertBatchSize
+    embedding = CInitialize().MInitializeEmbeddings()
+    index = CInitialize().MInitializePinecone(vector.MINEAI_INDEX_NAME)
+    # Load the embedding model and tokenizer outside the timed region
+    embedding.embed_query("warm up")
+    vector.Chunker.MCountTokens(["warm up"])
+    baseline_rss = _PeakRssMB()
+
+    best = {}
+    counts = {}
+    for _ in range(Repeats):
+        timings = {}
+        start = time.perf_counter()
+        FileHash = vector.MGenerateFileHash(PDFPath)
+        timings["hash"] = time.perf_counter() - start
+
+        vector.IngestReport = {"file_hash": FileHash}
+        stage_start = time.perf_counter()
+        documents = vector.MPDFLoader(PDFPath)
+        timings["extract"] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        chunks = vector.MPrepareChunks(documents, FileHash)
+        timings["chunk"] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        with Trace() as trace:
+            stored = vector.MStoreInPineconeDB(embedding, chunks, FileHash)
+        store_seconds = time.perf_counter() - stage_start
+        totals = trace.MStageTotals() if trace is not None else {}
+        timings["embed"] = totals.get("embed.documents", 0.0) / 1000 if trace is not None else None
+        timings["upsert"] = totals.get("pinecone.upsert", 0.0) / 1000 if trace is not None else None
+        # Whatever the spans don't cover: docstore writes and record building
+        timings["store_other"] = store_seconds - timings["embed"] - timings["upsert"] if trace is not None else None
+        timings["total"] = time.perf_counter() - start
+
+        index.delete(delete_all=True, namespace=FileHash)
+        for stage, seconds in timings.items():
+            if seconds is not None:
+                best[stage] = min(best.get(stage, seconds), seconds)
+        counts = {"pages": len(documents), "chunks": len(chunks), "vectors": stored, "bytes": os.path.getsize(PDFPath)}
+
+    return {
+        "seconds": best,
+        "counts": counts,
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": _PeakRssMB(),
+        "peak_children_rss_mb": _PeakRssMB(resource.RUSAGE_CHILDREN),
+    }
+
+
+def RunIsolated(PDFPath: str, Workers: int, EmbedBatchSize: int, UpsertBatchSize: int, Repeats: int) -> dict:
+    """Run one configuration in a fresh spawned process and return its measurements."""
+    # Not multiprocessing.Pool: its daemonic workers can't start the PDF extraction pool
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_RunOnce, PDFPath, Workers, EmbedBatchSize, UpsertBatchSize, Repeats).result()
+
+
+def MakeRow(PageCount: int, Workers: int, EmbedBatchSize: int, UpsertBatchSize: int, Run: dict) -> dict:
+    seconds, counts = Run["seconds"], Run["counts"]
+    return {
+        "pages": PageCount,
+        "workers": Workers,
+        "embed_batch_size": EmbedBatchSize,
+        "upsert_batch_size": UpsertBatchSize,
+        "chunks": counts["chunks"],
+        "vectors": counts["vectors"],
+        "seconds": {stage: round(value, 4) for stage, value in seconds.items()},
+        "hash_mb_per_second": _Rate(counts["bytes"] / (1024 * 1024), seconds.get("hash")),
+        "pages_per_second": _Rate(counts["pages"], seconds.get("extract")),
+        "chunks_per_second": _Rate(counts["chunks"], seconds.get("chunk")),
+        "embeddings_per_second": _Rate(counts["vectors"], seconds.get("embed")),
+        "vectors_per_second": _Rate(counts["vectors"], seconds.get("upsert")),
+        "end_to_end_pages_per_second": _Rate(counts["pages"], seconds.get("total")),
+        "peak_rss_mb": round(Run["peak_rss_mb"], 1),
+        "rss_growth_mb": round(Run["peak_rss_mb"] - Run["baseline_rss_mb"], 1),
+        "peak_worker_rss_mb": round(Run["peak_children_rss_mb"], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000], help="Page counts of the synthetic PDFs")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="PdfExtractWorkers values to sweep")
+    parser.add_argument("--embed-batch-sizes", type=int, nargs="+", default=[64], help="EmbedBatchSize values to sweep")
+    parser.add_argument("--upsert-batch-sizes", type=int, nargs="+", default=[100], help="UpsertBatchSize values to sweep")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per configuration; the best time per stage is kept")
+    parser.add_argument("--corpus-dir", default="Data/Benchmarks")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    # Spawned runs inherit the environment, so this selects the stand-ins for them too
+    os.environ.setdefault("PROVIDER_MODE", "local")
+    results = []
+    for pdf_path, page_count in zip(BuildCorpus(args.corpus_dir, args.pages), args.pages):
+        for workers, embed_batch, upsert_batch in itertools.product(args.workers, args.embed_batch_sizes, args.upsert_batch_sizes):
+            row = MakeRow(page_count, workers, embed_batch, upsert_batch, RunIsolated(pdf_path, workers, embed_batch, upsert_batch, args.repeats))
+            results.append(row)
+            print(
+                f"{page_count:>5}p  workers={workers:<3} embed_batch={embed_batch:<4} upsert_batch={upsert_batch:<4} "
+                f"{row['pages_per_second']:>9} pages/s  {row['chunks_per_second']:>9} chunks/s  "
+                f"{row['embeddings_per_second']:>9} emb/s  {row['vectors_per_second']:>9} vec/s  peak {row['peak_rss_mb']} MB"
+            )
+
+    report = {
+        "provider_mode": os.environ["PROVIDER_MODE"],
+        "cpu_count": os.cpu_count(),
+        "repeats": args.repeats,
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""End-to-end HTTP load test for /chat, /upload, /my-files and /chat-sessions.
+
+Closed-loop async workers send a weighted traffic mix for a fixed duration
+while a separate task fires bursts of uploads. Chats go to a few popular
+documents uploaded during setup. The JSON report has p50/p95/p99 latency,
+throughput and error rate per route, plus the git commit, so successive
+builds can be compared.
+
+By default the app runs in-process (httpx ASGITransport) with the local
+stand-in providers (ProviderMode "local"). Pass --base-url to load a running
+server instead; start it with PROVIDER_MODE=local for comparable numbers.
+
+Run from the backend directory:
+    python -m benchmarks.LoadTest --mix chat-heavy --concurrency 16 --duration 30 --output Data/Benchmarks/load.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.SyntheticPdf import WORDS, WriteSyntheticPdf
+
+# Route weights for the closed-loop workers; uploads mostly arrive in bursts (see --burst-every)
+MIXES = {
+    "chat-heavy": {"chat": 0.8, "my-files": 0.1, "chat-sessions": 0.1},
+    "browse-heavy": {"chat": 0.3, "my-files": 0.35, "chat-sessions": 0.35},
+    "mixed": {"chat": 0.6, "my-files": 0.15, "chat-sessions": 0.15, "upload": 0.1},
+}
+
+
+def Percentile(Values: list, Fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not Values:
+        return None
+    index = min(len(Values) - 1, max(0, math.ceil(Fraction * len(Values)) - 1))
+    return Values[index]
+
+
+def Summarise(Samples: list, Seconds: float) -> dict:
+    """Summarise (latency_seconds, ok, error) samples for one route."""
+    latencies = sorted(sample[0] * 1000 for sample in Samples)
+    errors = defaultdict(int)
+    for _, ok, error in Samples:
+        if not ok:
+            errors[error] += 1
+    count = len(Samples)
+    failed = sum(errors.values())
+    return {
+        "requests": count,
+        "errors": failed,
+        "error_rate": round(failed / count, 4) if count else 0.0,
+        "error_kinds": dict(errors),
+        "throughput_rps": round(count / Seconds, 2) if Seconds else None,
+        "p50_ms": round(Percentile(latencies, 0.50), 2) if latencies else None,
+        "p95_ms": round(Percentile(latencies, 0.95), 2) if latencies else None,
+        "p99_ms": round(Percentile(latencies, 0.99), 2) if latencies else None,
+        "mean_ms": round(sum(latencies) / count, 2) if count else None,
+        "max_ms": round(latencies[-1], 2) if latencies else None,
+    }
+
+
+def GitCommit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class CLoadTest:
+    def __init__(self, Client: httpx.AsyncClient, Args):
+        self.Client = Client
+        self.Args = Args
+        self.Rng = random.Random(Args.seed)
+        self.Samples = defaultdict(list)
+        self.ErrorBodies = defaultdict(list)
+        self.Users = [f"loadtest{i}@example.com" for i in range(Args.users)]
+        self.UploadSeed = Args.seed * 100000
+        self.Recording = False
+        self.PdfDir = tempfile.mkdtemp(prefix="loadtest_")
+
+    def MMakePdf(self, Pages: int) -> tuple:
+        """Return (filename, bytes) of a fresh synthetic PDF; each seed gives distinct content and namespace."""
+        self.UploadSeed += 1
+        filename = f"loadtest_{self.Args.seed}_{self.UploadSeed}.pdf"
+        path = WriteSyntheticPdf(os.path.join(self.PdfDir, filename), Pages, Seed=self.UploadSeed, Title=f"Load Test Document {self.UploadSeed}")
+        with open(path, "rb") as f:
+            data = f.read()
+        os.remove(path)
+        return filename, data
+
+    def MQuestion(self) -> str:
+        return " ".join(self.Rng.choice(WORDS) for _ in range(self.Rng.randint(4, 10))).capitalize() + "?"
+
+    async def MRequest(self, Route: str, Method: str, Path: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.Client.request(Method, Path, timeout=self.Args.timeout, **kwargs)
+            ok, error = response.status_code < 400, None if response.status_code < 400 else str(response.status_code)
+        except httpx.HTTPError as e:
+            response, ok, error = None, False, type(e).__name__
+        if self.Recording:
+            self.Samples[Route].append((time.perf_counter() - start, ok, error))
+            # Keep the first few error bodies so failures can be diagnosed from the report
+            if response is not None and not ok and len(self.ErrorBodies[Route]) < 3:
+                self.ErrorBodies[Route].append(response.text[:500])
+        return response
+
+    async def MUpload(self, Pages: int):
+        filename, data = self.MMakePdf(Pages)
+        email = self.Rng.choice(self.Users)
+        return await self.MRequest(
+            "upload", "POST", "/upload",
+            files={"file": (filename, data, "application/pdf")},
+            data={"name": email.split("@")[0], "email": email}
+        ), filename
+
+    async def MSetup(self):
+        """Upload the corpus, select the popular documents and seed chat sessions (not recorded)."""
+        filenames = []
+        for _ in range(self.Args.docs):
+            response, filename = await self.MUpload(self.Args.doc_pages)
+            if response is None or response.status_code >= 400:
+                raise RuntimeError(f"Setup upload failed: {getattr(response, 'text', 'no response')}")
+            filenames.append(filename)
+        # /chat answers over the server-wide selection, so the popular set is fixed for the run
+        popular = filenames[:self.Args.popular]
+        await self.Client.post("/selected-files", json={"files": popular})
+        for email in self.Users:
+            for index in range(self.Args.sessions_per_user):
+                await self.Client.post("/chat-session", json={"email": email, "title": f"Session {index}", "message": None})
+        # Warm the compiled graph for the popular set
+        await self.Client.post("/chat", json={"question": self.MQuestion()}, timeout=self.Args.timeout)
+        return popular
+
+    async def MRunRoute(self, Route: str):
+        if Route == "chat":
+            await self.MRequest("chat", "POST", "/chat", json={"question": self.MQuestion()})
+        elif Route == "my-files":
+            await self.MRequest("my-files", "GET", "/my-files", params={"email": self.Rng.choice(self.Users)})
+        elif Route == "chat-sessions":
+            await self.MRequest("chat-sessions", "GET", "/chat-sessions", params={"email": self.Rng.choice(self.Users)})
+        elif Route == "upload":
+            await self.MUpload(self.Args.upload_pages)
+
+    async def MWorker(self, Deadline: float, Weights: dict):
+        routes, weights = list(Weights), list(Weights.values())
+        while time.perf_counter() < Deadline:
+            await self.MRunRoute(self.Rng.choices(routes, weights)[0])
+
+    async def MBursts(self, Deadline: float):
+        """Fire --burst-size concurrent uploads every --burst-every seconds."""
+        while True:
+            await asyncio.sleep(self.Args.burst_every)
+            if time.perf_counter() >= Deadline:
+                return
+            await asyncio.gather(*(self.MUpload(self.Args.upload_pages) for _ in range(self.Args.burst_size)))
+
+    async def MRun(self) -> dict:
+        popular = await self.MSetup()
+        self.Recording = True
+        start = time.perf_counter()
+        deadline = start + self.Args.duration
+        tasks = [self.MWorker(deadline, MIXES[self.Args.mix]) for _ in range(self.Args.concurrency)]
+        if self.Args.burst_every > 0 and self.Args.burst_size > 0:
+            tasks.append(self.MBursts(deadline))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+        self.Recording = False
+
+        all_samples = [sample for samples in self.Samples.values() for sample in samples]
+        return {
+            "build": {"git_commit": GitCommit(), "finished_at": datetime.now(timezone.utc).isoformat()},
+            "target": self.Args.base_url or "in-process",
+            "settings": {key: value for key, value in vars(self.Args).items() if key != "output"},
+            "popular_documents": popular,
+            "elapsed_seconds": round(elapsed, 3),
+            "routes": {
+                route: {**Summarise(samples, elapsed), "error_samples": self.ErrorBodies.get(route, [])}
+                for route, samples in sorted(self.Samples.items())
+            },
+            "total": Summarise(all_samples, elapsed),
+        }
+
+
+async def RunLoadTest(Args) -> dict:
+    limits = httpx.Limits(max_connections=Args.concurrency + Args.burst_size + 4)
+    if Args.base_url:
+        async with httpx.AsyncClient(base_url=Args.base_url, limits=limits) as client:
+            return await CLoadTest(client, Args).MRun()
+    # The app reads ProviderMode when it is imported, so select the stand-ins first
+    os.environ.setdefault("PROVIDER_MODE", "local")
+    from app.main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits) as client:
+        return await CLoadTest(client, Args).MRun()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=None, help="Load a running server instead of the in-process app")
+    parser.add_argument("--mix", default="chat-heavy", choices=sorted(MIXES))
+    parser.add_argument("--concurrency", type=int, default=16, help="Closed-loop workers")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of recorded load")
+    parser.add_argument("--users", type=int, default=20, help="Distinct user emails")
+    parser.add_argument("--docs", type=int, default=5, help="Documents uploaded during setup")
+    parser.add_argument("--popular", type=int, default=2, help="Documents every chat is asked against")
+    parser.add_argument("--doc-pages", type=int, default=20)
+    parser.add_argument("--sessions-per-user", type=int, default=3)
+    parser.add_argument("--burst-every", type=float, default=10.0, help="Seconds between upload bursts (0 disables)")
+    parser.add_argument("--burst-size", type=int, default=4, help="Concurrent uploads per burst")
+    parser.add_argument("--upload-pages", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(RunLoadTest(args))
+    for route, row in report["routes"].items():
+        print(
+            f"{route:<14} {row['requests']:>6} req  {row['throughput_rps']:>8} req/s  "
+            f"p50 {row['p50_ms']} ms  p95 {row['p95_ms']} ms  p99 {row['p99_ms']} ms  errors {row['error_rate']:.2%}"
+        )
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Measure PDF text extraction throughput (pages/s) against worker count.
+
+Run from the backend directory:
+    python -m benchmarks.PdfExtractionBench --pages 200 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.SyntheticPdf import BuildCorpus
+from scripts.PdfExtractor import LoadPdfPages
+
+
+def RunBenchmark(PDFPath: str, Workers: int, PagesPerShard: int, Repeats: int, Extractor: str = "pypdf") -> dict:
+    """Extract the file `Repeats` times and return the best observed throughput."""
+    timings = []
+    pages = 0
+    for _ in range(Repeats):
+        start = time.perf_counter()
+        pages = len(LoadPdfPages(PDFPath, Workers, PagesPerShard, Extractor))
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        "extractor": Extractor,
+        "workers": Workers,
+        "pages": pages,
+        "pages_per_shard": PagesPerShard,
+        "best_seconds": round(best, 4),
+        "pages_per_second": round(pages / best, 2) if best else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200, help="Pages in the synthetic PDF")
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="Worker counts to sweep (default: 1..cpu_count)")
+    parser.add_argument("--pages-per-shard", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--extractor", default="pypdf", help="Extraction backend (see scripts.PdfExtractor.PDF_EXTRACTORS)")
+    parser.add_argument("--corpus-dir", default="Data/Benchmarks")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    workers = args.workers or list(range(1, (os.cpu_count() or 1) + 1))
+    pdf_path = BuildCorpus(args.corpus_dir, [args.pages])[0]
+
+    results = [RunBenchmark(pdf_path, w, args.pages_per_shard, args.repeats, args.extractor) for w in workers]
+    baseline = results[0]["pages_per_second"]
+    for row in results:
+        row["speedup"] = round(row["pages_per_second"] / baseline, 2) if baseline else None
+        print(f"workers={row['workers']:>3}  {row['pages_per_second']:>10} pages/s  speedup x{row['speedup']}")
+
+    report = {"pdf": pdf_path, "cpu_count": os.cpu_count(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Compare PDF extraction backends on a synthetic corpus.
+
+Reports pages/s, peak RSS and text-length parity against pypdf for every
+installed backend. Each run happens in a fresh process so peak RSS is not
+polluted by earlier runs.
+
+Run from the backend directory:
+    python -m benchmarks.PdfExtractorBench --pages 10 100 500
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+
+from benchmarks.SyntheticPdf import BuildCorpus
+from scripts.PdfExtractor import PDF_EXTRACTORS, LoadPdfPages
+
+
+def _PeakRssMB() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _RunOnce(ExtractorName: str, PDFPath: str, Workers: int, PagesPerShard: int) -> dict:
+    baseline_rss = _PeakRssMB()
+    start = time.perf_counter()
+    pages = LoadPdfPages(PDFPath, Workers, PagesPerShard, ExtractorName)
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "page_lengths": [len(text) for text in pages],
+        "peak_rss_mb": _PeakRssMB(),
+        "baseline_rss_mb": baseline_rss,
+    }
+
+
+def RunIsolated(ExtractorName: str, PDFPath: str, Workers: int, PagesPerShard: int) -> dict:
+    """Run one extraction in a fresh spawned process and return its measurements."""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_RunOnce, (ExtractorName, PDFPath, Workers, PagesPerShard))
+
+
+def Parity(Lengths: list, ReferenceLengths: list, Tolerance: float = 0.1) -> dict:
+    """Compare per-page text lengths with the reference backend."""
+    total = sum(Lengths)
+    reference_total = sum(ReferenceLengths)
+    mismatched = sum(
+        1 for length, reference in zip(Lengths, ReferenceLengths)
+        if abs(length - reference) > Tolerance * max(reference, 1)
+    )
+    return {
+        "text_length_ratio": round(total / reference_total, 4) if reference_total else None,
+        "pages_outside_tolerance": mismatched + abs(len(Lengths) - len(ReferenceLengths)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500], help="Page counts of the synthetic PDFs")
+    parser.add_argument("--extractors", nargs="+", default=None, help="Backends to compare (default: all installed)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--pages-per-shard", type=int, default=16)
+    parser.add_argument("--corpus-dir", default="Data/Benchmarks")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    extractors = args.extractors or [name for name, cls in PDF_EXTRACTORS.items() if cls.MIsAvailable()]
+    results = []
+    for pdf_path, page_count in zip(BuildCorpus(args.corpus_dir, args.pages), args.pages):
+        reference = None
+        for name in extractors:
+            run = RunIsolated(name, pdf_path, args.workers, args.pages_per_shard)
+            if reference is None:
+                reference = run["page_lengths"] if name == "pypdf" else RunIsolated("pypdf", pdf_path, args.workers, args.pages_per_shard)["page_lengths"]
+            row = {
+                "pdf": pdf_path,
+                "pages": page_count,
+                "extractor": name,
+                "seconds": round(run["seconds"], 4),
+                "pages_per_second": round(page_count / run["seconds"], 2) if run["seconds"] else None,
+                "peak_rss_mb": round(run["peak_rss_mb"], 1),
+                "rss_growth_mb": round(run["peak_rss_mb"] - run["baseline_rss_mb"], 1),
+                **Parity(run["page_lengths"], reference),
+            }
+            results.append(row)
+            print(
+                f"{page_count:>5}p  {name:<9} {row['pages_per_second']:>10} pages/s  "
+                f"peak {row['peak_rss_mb']:>7} MB  length ratio {row['text_length_ratio']}"
+            )
+
+    report = {"workers": args.workers, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Compare the quantized in-memory vector indexes with exact float32 search.
+
+Reports recall@k against exact search, queries per second, bytes per vector
+and build time for int8 and PQ codes, with and without exact re-ranking.
+Vectors are synthetic: clustered, low-rank 384-dim embeddings shaped like
+all-MiniLM-L6-v2's, and queries are perturbed copies of indexed vectors.
+
+Run from the backend directory:
+    python -m benchmarks.QuantizedIndexBench --vectors 100000 --k 5
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from scripts.QuantizedIndex import BuildVectorIndex, NormalizeRows
+
+
+def MakeVectors(Count: int, Dims: int, Clusters: int, Rank: int = 48, Seed: int = 0) -> np.ndarray:
+    # Sentence embeddings occupy a low-dimensional subspace, so draw clustered
+    # latent points and project them up, plus a little full-rank noise
+    rng = np.random.default_rng(Seed)
+    centres = rng.normal(size=(Clusters, Rank)).astype(np.float32)
+    labels = rng.integers(0, Clusters, Count)
+    latent = centres[labels] + 0.7 * rng.normal(size=(Count, Rank)).astype(np.float32)
+    projection = rng.normal(size=(Rank, Dims)).astype(np.float32)
+    return NormalizeRows(latent @ projection + 0.05 * np.sqrt(Rank) * rng.normal(size=(Count, Dims)).astype(np.float32))
+
+
+def MakeQueries(Vectors: np.ndarray, Count: int, Seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(Seed)
+    picks = Vectors[rng.integers(0, len(Vectors), Count)]
+    # Noise with norm ~0.3 relative to the unit-length vectors
+    return NormalizeRows(picks + 0.3 / np.sqrt(picks.shape[1]) * rng.normal(size=picks.shape).astype(np.float32))
+
+
+def Measure(Name: str, Index, Queries: np.ndarray, Truth: list, K: int, BuildSeconds: float) -> dict:
+    start = time.perf_counter()
+    results = [Index.MSearch(query, K) for query in Queries]
+    elapsed = time.perf_counter() - start
+    recall = np.mean([
+        len({chunk_id for chunk_id, _ in found} & expected) / K
+        for found, expected in zip(results, Truth)
+    ])
+    return {
+        "index": Name,
+        "recall_at_k": round(float(recall), 4),
+        "qps": round(len(Queries) / elapsed, 1),
+        "bytes_per_vector": round(Index.nbytes / len(Index.Ids), 1),
+        "build_seconds": round(BuildSeconds, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--pq-subspaces", type=int, default=48)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    vectors = MakeVectors(args.vectors, args.dims, args.clusters)
+    queries = MakeQueries(vectors, args.queries)
+    ids = [str(i) for i in range(len(vectors))]
+    workdir = tempfile.mkdtemp(prefix="quantized-bench-")
+
+    configs = [
+        ("exact_float32", "none", {}),
+        ("int8", "int8", {}),
+        ("int8_rerank", "int8", {"RerankPath": os.path.join(workdir, "int8.npy")}),
+        ("pq", "pq", {"Subspaces": args.pq_subspaces}),
+        ("pq_rerank", "pq", {"Subspaces": args.pq_subspaces, "RerankPath": os.path.join(workdir, "pq.npy")}),
+    ]
+    results, truth = [], None
+    for name, kind, options in configs:
+        if kind != "none":
+            options["RerankFactor"] = args.rerank_factor
+        start = time.perf_counter()
+        index = BuildVectorIndex(kind, ids, vectors, **options)
+        build_seconds = time.perf_counter() - start
+        if truth is None:
+            truth = [{chunk_id for chunk_id, _ in index.MSearch(query, args.k)} for query in queries]
+        row = Measure(name, index, queries, truth, args.k, build_seconds)
+        results.append(row)
+        print(
+            f"{row['index']:<14} recall@{args.k} {row['recall_at_k']:<7} {row['qps']:>9} qps  "
+            f"{row['bytes_per_vector']:>7} B/vector  build {row['build_seconds']}s"
+        )
+        index.MRelease()
+
+    report = {"vectors": args.vectors, "dims": args.dims, "queries": args.queries, "k": args.k, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""Evaluate retrieval quality and latency for several retrieval configurations.
+
+Reads a JSONL file of questions with the chunks or pages that should be
+retrieved, runs every configuration (method x top-k) and reports recall@k,
+hit rate, MRR, context size and per-stage latency, so settings that shrink
+the prompt without losing relevant context can be picked.
+
+Each line of the questions file:
+    {"question": "...", "namespace": "<file hash or ingested PDF name>",
+     "expected_chunks": ["<hash>#12", 13], "expected_pages": [4]}
+Chunks may be given as ids or ordinals; pages are 1-based as shown in a PDF
+viewer. Either list may be omitted.
+
+Methods:
+    dense   top-k by vector similarity (production path)
+    mmr     MMRFetchK candidates, top-k picked by MMR
+    hybrid  dense and BM25 over the whole namespace, merged by reciprocal rank fusion
+    rerank  MMRFetchK dense candidates re-ordered by a cross-encoder (--rerank-model,
+            needs sentence-transformers) or, by default, fused with their BM25 rank
+
+Runs offline with the local stand-in providers unless PROVIDER_MODE is set.
+The local vector index lives in this process, so pass the PDFs with --pdf to
+ingest them first; --generate writes a synthetic questions file from them.
+
+Run from the backend directory:
+    python -m benchmarks.RetrievalEval --pdf Data/Docs/paper.pdf --generate 200 --questions Data/Eval/questions.jsonl
+    python -m benchmarks.RetrievalEval --pdf Data/Docs/paper.pdf --questions Data/Eval/questions.jsonl --topk 3 5 10
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+import numpy as np
+
+# The stand-ins are selected when the config is first loaded, so this comes before the scripts imports
+os.environ.setdefault("PROVIDER_MODE", "local")
+
+from scripts.Chunker import CTokenChunker
+from scripts.DocStore import CDocStore, MakeChunkId
+from scripts.Initialize import CInitialize
+from scripts.Retrival import CRetrival
+from scripts.VectorStore import CVectorStore
+from scripts.config import load_config
+from scripts.helper.bm25 import CBM25Index, ReciprocalRankFusion
+from scripts.helper.mmr import MaximalMarginalRelevance
+
+METHODS = ("dense", "mmr", "hybrid", "rerank")
+
+
+def _Ms(Seconds: float) -> float:
+    return Seconds * 1000
+
+
+def Summarise(Values: list) -> dict:
+    if not Values:
+        return {"mean_ms": None, "p50_ms": None, "p95_ms": None}
+    ordered = sorted(Values)
+    return {
+        "mean_ms": round(statistics.mean(ordered), 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+    }
+
+
+class CRetrievalEval:
+    def __init__(self, RerankModel: str = None, UseCutoff: bool = True):
+        self.Retrival = CRetrival()
+        if not UseCutoff:
+            self.Retrival.ScoreFloor = 0.0
+            self.Retrival.RelativeCutoff = 0.0
+        self.Chunker = CTokenChunker(CInitialize().EmbeddingModel, {})
+        self.Lexical = {}
+        self.Pages = {}
+        self.CrossEncoder = None
+        if RerankModel:
+            from sentence_transformers import CrossEncoder
+            self.CrossEncoder = CrossEncoder(RerankModel)
+
+    def MNamespaceTexts(self, Namespace: str) -> list:
+        texts = self.Retrival.docstore.MGetRange(Namespace, 0, 2 ** 62)
+        if not texts:
+            raise ValueError(f"No docstore texts for namespace {Namespace}; hybrid and rerank need DocStoreEnabled")
+        return texts
+
+    def MLexicalIndex(self, Namespace: str) -> CBM25Index:
+        if Namespace not in self.Lexical:
+            self.Lexical[Namespace] = CBM25Index(self.MNamespaceTexts(Namespace))
+        return self.Lexical[Namespace]
+
+    def MPageOf(self, Namespace: str, ChunkIds: list) -> dict:
+        """Return {chunk id: 1-based page}, fetching metadata for ids not seen before (untimed)."""
+        known = self.Pages.setdefault(Namespace, {})
+        missing = [chunk_id for chunk_id in ChunkIds if chunk_id not in known]
+        if missing:
+            fetched = self.Retrival.pinecone.fetch(ids=missing, namespace=Namespace)
+            for chunk_id in missing:
+                vector = fetched.vectors.get(chunk_id)
+                page = (vector.metadata or {}).get("page") if vector is not None else None
+                known[chunk_id] = int(page) + 1 if page is not None else None
+        return {chunk_id: known[chunk_id] for chunk_id in ChunkIds}
+
+    def MRetrieve(self, Method: str, Namespace: str, Question: str, QueryVector, TopK: int, Timings: dict) -> tuple:
+        """Return the retrieved chunk ids (best first) and their texts, recording stage latencies in Timings."""
+        retrival = self.Retrival
+        fetch_k = max(retrival.MMRFetchK, TopK)
+        start = time.perf_counter()
+        matches = retrival.MMatchesByVector(Namespace, QueryVector, TopK if Method == "dense" else fetch_k, include_values=Method == "mmr")
+        matches = retrival.MApplyScoreCutoff(matches)
+        Timings["vector_search"] = _Ms(time.perf_counter() - start)
+        dense_ids = [match["id"] for match in matches]
+
+        start = time.perf_counter()
+        if Method == "dense":
+            ids = dense_ids[:TopK]
+        elif Method == "mmr":
+            selected = MaximalMarginalRelevance(QueryVector, [match["values"] for match in matches], TopK, retrival.MMRLambda)
+            ids = [dense_ids[i] for i in selected]
+        elif Method == "hybrid":
+            lexical = self.MLexicalIndex(Namespace).MTopK(Question, fetch_k)
+            lexical_ids = [MakeChunkId(Namespace, position) for position, _ in lexical]
+            ids = ReciprocalRankFusion([dense_ids, lexical_ids])[:TopK]
+        elif self.CrossEncoder is not None:
+            texts = retrival.MResolveTexts(matches)
+            scores = self.CrossEncoder.predict([(Question, text) for text in texts])
+            ids = [dense_ids[i] for i in np.argsort(-np.asarray(scores))[:TopK]]
+        else:
+            texts = retrival.MResolveTexts(matches)
+            lexical = CBM25Index(texts).MScores(Question)
+            lexical_ids = [dense_ids[i] for i in np.argsort(-lexical, kind="stable")]
+            ids = ReciprocalRankFusion([dense_ids, lexical_ids])[:TopK]
+        Timings[Method] = _Ms(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        texts = retrival.MResolveTexts([{"id": chunk_id} for chunk_id in ids])
+        Timings["resolve"] = _Ms(time.perf_counter() - start)
+        return ids, texts
+
+    def MEvaluate(self, Cases: list, Methods: list, TopKs: list) -> dict:
+        embed_ms = []
+        vectors = []
+        for case in Cases:
+            start = time.perf_counter()
+            vectors.append(self.Retrival.embeddings.embed_query(case["question"]))
+            embed_ms.append(_Ms(time.perf_counter() - start))
+
+        results = []
+        for method in Methods:
+            for topk in TopKs:
+                results.append(self.MEvaluateConfig(Cases, vectors, method, topk))
+                row = results[-1]
+                print(
+                    f"{row['config']:<12} recall@{topk} {row['recall']:.3f}  hit {row['hit_rate']:.3f}  MRR {row['mrr']:.3f}  "
+                    f"context {row['context_tokens_mean']:>7} tok  total p50 {row['latency']['total']['p50_ms']} ms"
+                )
+        return {"questions": len(Cases), "embed_latency": Summarise(embed_ms), "results": results}
+
+    def MEvaluateConfig(self, Cases: list, Vectors: list, Method: str, TopK: int) -> dict:
+        recalls, reciprocal_ranks, hits, empty = [], [], 0, 0
+        stage_ms = {}
+        context_tokens, context_chars = [], []
+        for case, vector in zip(Cases, Vectors):
+            timings = {}
+            start = time.perf_counter()
+            ids, texts = self.MRetrieve(Method, case["namespace"], case["question"], vector, TopK, timings)
+            timings["total"] = _Ms(time.perf_counter() - start)
+            for stage, ms in timings.items():
+                stage_ms.setdefault(stage, []).append(ms)
+
+            texts = [text or "" for text in texts]
+            context_chars.append(sum(len(text) for text in texts))
+            context_tokens.append(sum(self.Chunker.MCountTokens(texts)) if texts else 0)
+            empty += not ids
+
+            pages = self.MPageOf(case["namespace"], ids)
+            relevant = [chunk_id in case["expected_chunks"] or pages[chunk_id] in case["expected_pages"] for chunk_id in ids]
+            found_chunks = case["expected_chunks"].intersection(ids)
+            found_pages = case["expected_pages"].intersection(pages.values())
+            targets = len(case["expected_chunks"]) + len(case["expected_pages"])
+            recalls.append((len(found_chunks) + len(found_pages)) / targets)
+            first = next((rank for rank, hit in enumerate(relevant, start=1) if hit), None)
+            reciprocal_ranks.append(1.0 / first if first else 0.0)
+            hits += first is not None
+
+        count = len(Cases)
+        return {
+            "config": f"{Method}@{TopK}",
+            "method": Method,
+            "topk": TopK,
+            "recall": round(statistics.mean(recalls), 4) if count else None,
+            "hit_rate": round(hits / count, 4) if count else None,
+            "mrr": round(statistics.mean(reciprocal_ranks), 4) if count else None,
+            "empty_rate": round(empty / count, 4) if count else None,
+            "context_tokens_mean": round(statistics.mean(context_tokens), 1) if count else None,
+            "context_chars_mean": round(statistics.mean(context_chars), 1) if count else None,
+            "latency": {stage: Summarise(values) for stage, values in stage_ms.items()},
+        }
+
+
+def IngestPdfs(Paths: list) -> dict:
+    """Ingest each PDF (skipped when already stored) and return {file name: namespace}."""
+    vector = CVectorStore()
+    names = {}
+    for path in Paths:
+        _, namespace = vector.MStoreFileInVectorDB(path)
+        names[os.path.basename(path)] = namespace
+        print(f"Ingested {path} -> {namespace}")
+    return names
+
+
+def LoadCases(Path: str, Names: dict) -> list:
+    cases = []
+    with open(Path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            namespace = Names.get(entry["namespace"], entry["namespace"])
+            chunks = entry.get("expected_chunks", [entry["expected_chunk"]] if "expected_chunk" in entry else [])
+            pages = entry.get("expected_pages", [entry["expected_page"]] if "expected_page" in entry else [])
+            if not chunks and not pages:
+                raise ValueError(f"{Path}:{line_number} has no expected_chunks or expected_pages")
+            cases.append({
+                "question": entry["question"],
+                "namespace": namespace,
+                "expected_chunks": {chunk if isinstance(chunk, str) else MakeChunkId(namespace, chunk) for chunk in chunks},
+                "expected_pages": {int(page) for page in pages},
+            })
+    return cases
+
+
+def GenerateCases(Path: str, Namespaces: list, Count: int, Seed: int = 0):
+    """Write Count questions, each a word span sampled from one stored chunk, expecting that chunk."""
+    rng = random.Random(Seed)
+    docstore = CDocStore(load_config().get("DocStoreDir", "Data/DocStore"))
+    pool = [(namespace, ordinal, text) for namespace in Namespaces for ordinal, text in enumerate(docstore.MGetRange(namespace, 0, 2 ** 62))]
+    os.makedirs(os.path.dirname(Path) or ".", exist_ok=True)
+    with open(Path, "w") as f:
+        for namespace, ordinal, text in rng.sample(pool, min(Count, len(pool))):
+            words = text.split()
+            length = min(len(words), rng.randint(6, 12))
+            offset = rng.randint(0, len(words) - length) if words else 0
+            f.write(json.dumps({
+                "question": " ".join(words[offset:offset + length]),
+                "namespace": namespace,
+                "expected_chunks": [MakeChunkId(namespace, ordinal)],
+            }) + "\n")
+    print(f"Wrote {min(Count, len(pool))} synthetic questions to {Path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", required=True, help="JSONL questions file (written when --generate is given)")
+    parser.add_argument("--pdf", nargs="*", default=[], help="PDFs to ingest first; questions may name them instead of a namespace")
+    parser.add_argument("--generate", type=int, default=0, help="Write this many synthetic questions from the --pdf documents, then exit")
+    parser.add_argument("--methods", nargs="+", default=list(METHODS), choices=METHODS)
+    parser.add_argument("--topk", type=int, nargs="+", default=[3, 5, 10])
+    parser.add_argument("--rerank-model", default=None, help="Cross-encoder for the rerank method (default: BM25 fusion)")
+    parser.add_argument("--no-cutoff", action="store_true", help="Disable RetrievalScoreFloor / RetrievalRelativeCutoff")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    names = IngestPdfs(args.pdf)
+    if args.generate:
+        if not names:
+            parser.error("--generate needs the source documents passed with --pdf")
+        GenerateCases(args.questions, list(names.values()), args.generate, args.seed)
+        return
+
+    cases = LoadCases(args.questions, names)
+    evaluator = CRetrievalEval(args.rerank_model, UseCutoff=not args.no_cutoff)
+    report = {
+        "provider_mode": os.environ.get("PROVIDER_MODE"),
+        "embedding_model": CInitialize().EmbeddingModel,
+        "score_cutoff": not args.no_cutoff,
+        "rerank": args.rerank_model or "bm25-rrf",
+        **evaluator.MEvaluate(cases, args.methods, args.topk),
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
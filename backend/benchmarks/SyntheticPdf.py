@@ -0,0 +1,98 @@
+import os
+import random
+
+# Small fixed vocabulary so generated pages look like prose to the chunkers
+WORDS = (
+    "attention model transformer layer token embedding vector query key value "
+    "training dataset gradient loss optimizer batch sequence encoder decoder "
+    "retrieval document context answer question memory index namespace chunk "
+    "the a of and to in is for with on that by this we our are as from"
+).split()
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+LINES_PER_PAGE = 48
+
+
+def MakeSentence(rng: random.Random) -> str:
+    """Return one pseudo-random sentence."""
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+
+def MakePageLines(rng: random.Random, PageNumber: int, Title: str) -> list:
+    """Return the text lines of one page, including a running header and footer."""
+    lines = [Title]
+    line = ""
+    while len(lines) < LINES_PER_PAGE - 1:
+        sentence = MakeSentence(rng)
+        if len(line) + len(sentence) > 90:
+            lines.append(line.strip())
+            line = ""
+        line += " " + sentence
+    lines.append(f"Page {PageNumber}")
+    return lines
+
+
+def _Escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def WriteSyntheticPdf(PDFPath: str, Pages: int, Seed: int = 0, Title: str = "Synthetic Benchmark Corpus") -> str:
+    """Write a text-only PDF with the given number of pages and return its path.
+
+    The file is assembled by hand so benchmarks don't need a PDF authoring library.
+    """
+    rng = random.Random(Seed)
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(b"")
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for page_number in range(1, Pages + 1):
+        ops = ["BT", "/F1 10 Tf", "14 TL", f"50 {PAGE_HEIGHT - 50} Td"]
+        for line in MakePageLines(rng, page_number, Title):
+            ops.append(f"({_Escape(line)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, font_id, content_id)
+        ))
+
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids).encode()
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+
+    os.makedirs(os.path.dirname(PDFPath) or ".", exist_ok=True)
+    with open(PDFPath, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref_offset))
+    return PDFPath
+
+
+def BuildCorpus(Directory: str, PageCounts: list, Seed: int = 0) -> list:
+    """Generate (or reuse) one synthetic PDF per page count and return their paths."""
+    paths = []
+    for pages in PageCounts:
+        path = os.path.join(Directory, f"synthetic_{pages}p_seed{Seed}.pdf")
+        if not os.path.exists(path):
+            WriteSyntheticPdf(path, pages, Seed=Seed + pages)
+        paths.append(path)
+    return paths
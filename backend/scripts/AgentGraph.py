@@ -1,13 +1,33 @@
-from langgraph.graph import StateGraph, END
+from langgraph.graph import END
 from langchain.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
 from typing import TypedDict
+import hashlib
 import json
 
-from scripts.RAGGraph import CRagGraph
+from scripts.RAGGraph import CRagGraph, QA_PROMPT
 from scripts.MemoryManager import CMemoryManager
 from scripts.Initialize import CInitialize
+from scripts.TextArtifactStore import CTextArtifactStore
+from scripts.DocStore import CDocStore
+from scripts.IntentRouter import GetIntentRouter
+from scripts.helper.asyncPool import AsyncNode, RunInThreadPool
+from scripts.helper.logConfig import get_logger
+from scripts.helper.tracing import TracedStateGraph
 from scripts.config import load_config
 
+logger = get_logger("AgentGraph")
+
+MASTER_PROMPT = """
+        EVERY TIME YOU ANSWER MUST SAY "I AM A GENERAL AGENT"
+        You are a helpful general AI assistant.
+        Answer the following question:
+        {input}
+        """
+SUMMARY_PROMPT = "EVERY TIME YOU ANSWER MUST SAY I AM A SUMMARY AGENT' \nSummarize the following document:\n\n{document_text}"
+# Part of the /chat coalescing key, so turns are never shared across a prompt change
+PROMPT_VERSION = hashlib.sha256("\0".join((QA_PROMPT, MASTER_PROMPT, SUMMARY_PROMPT)).encode("utf-8")).hexdigest()[:12]
+
 
 # ----- Graph State -----
 class AgentGraphState(TypedDict):
@@ -15,6 +35,9 @@ class AgentGraphState(TypedDict):
     route: str
     answer: str
     memory: str
+    no_context: bool
+    question_embedding: list[float]
+    intent: dict
     selected_files: list[str]  
 
 
@@ -26,62 +49,106 @@ class AgentGraphBuilder:
         self.init = CInitialize()
         self.llm = self.init.MInitializeLLM()
         self.embeddings = self.init.MInitializeEmbeddings()
-        self.pinecone = self.init.MInitializePinecone(self.config["MineaiIndexName"])
+        self.pinecone = self.init.MInitializePinecone(self.config["MINEAI_INDEX_NAME"])
         self.memory = CMemoryManager(self.embeddings)
+        self.artifacts = CTextArtifactStore()
+        self.docstore = CDocStore(self.config.get("DocStoreDir", "Data/DocStore"))
+        self.intent_router = GetIntentRouter(
+            self.embeddings,
+            self.config.get("IntentPrototypes"),
+            self.config.get("IntentRouterMinScore", 0.35),
+            self.config.get("IntentRouterMinMargin", 0.1)
+        ) if self.config.get("IntentRouterEnabled", True) else None
 
     def build_master_agent(self):
-        prompt = PromptTemplate.from_template("""
-        EVERY TIME YOU ANSWER MUST SAY "I AM A GENERAL AGENT"
-        You are a helpful general AI assistant.
-        Answer the following question:
-        {input}
-        """)
+        prompt = PromptTemplate.from_template(MASTER_PROMPT)
         return prompt | self.llm
 
     def router_node(self):
+        # Intents that leave the document QA route; anything else (or no confident intent) stays on "qa"
+        intent_routes = {"summarize": "summarize", "general": "master"}
+
         def node(state: AgentGraphState):
-            # If files are selected, use QA agent
-            if state.get("selected_files"):
-                route = "qa"
-            else:
-                route = "master"
-            print(f"[Auto Route Decision] Selected Files: {state.get('selected_files')} -> {route}")
-            return {"route": route}
+            # Without selected files there is nothing to retrieve or summarize
+            if not state.get("selected_files"):
+                logger.info("Route decision: no selected files -> master")
+                return {"route": "master"}
+            update = {"route": "qa"}
+            if self.intent_router is not None:
+                decision = self.intent_router.MClassify(state["question_embedding"], state["question"])
+                update["intent"] = decision
+                update["route"] = intent_routes.get(decision["intent"], "qa")
+            logger.info(f"Route decision: {len(state['selected_files'])} selected file(s) -> {update['route']}")
+            return update
         return node
 
 
     def qa_agent_node(self):
-        graph = CRagGraph(self.memory, self.namespaces).MBuildGraph()
+        graph = CRagGraph(self.namespaces).MBuildGraph()
         def node(state: AgentGraphState):
-            result = graph.invoke({"question": state["question"]})
-            return {"answer": result["answer"]}
-        return node
+            # Memory was already fetched (and is saved) by this graph, so the QA graph only retrieves and answers
+            result = graph.invoke({
+                "question": state["question"],
+                "question_embedding": state["question_embedding"],
+                "memory": state.get("memory", "")
+            })
+            return {"answer": result["answer"], "no_context": result.get("no_context", False)}
+
+        async def anode(state: AgentGraphState):
+            result = await graph.ainvoke({
+                "question": state["question"],
+                "question_embedding": state["question_embedding"],
+                "memory": state.get("memory", "")
+            })
+            return {"answer": result["answer"], "no_context": result.get("no_context", False)}
+        return RunnableLambda(node, afunc=anode, name="qa")
 
     def master_agent_node(self):
         master_agent = self.build_master_agent()
         def node(state: AgentGraphState):
             result = master_agent.invoke({"input": state["question"]})
             return {"answer": result.content}
-        return node
+
+        async def anode(state: AgentGraphState):
+            result = await master_agent.ainvoke({"input": state["question"]})
+            return {"answer": result.content}
+        return RunnableLambda(node, afunc=anode, name="master")
+
+    def embed_question_node(self):
+        def node(state: AgentGraphState):
+            # The only embedding of the question this turn; memory, routing and retrieval all reuse it
+            return {"question_embedding": self.embeddings.embed_query(state["question"])}
+        # The forward pass is CPU-bound, so under ainvoke it runs on the worker pool
+        return AsyncNode(node)
 
     def get_memory_node(self):
         def node(state: AgentGraphState):
-            context = self.memory.MGetConversationContext(state["question"])
+            context = self.memory.MGetConversationContext(state["question"], state["question_embedding"])
             return {"memory": context}
-        return node
+        return AsyncNode(node)
 
     def save_memory_node(self):
         def node(state: AgentGraphState):
             self.memory.MSaveConversation(state["question"], state["answer"])
             return {}
-        return node
+        return AsyncNode(node)
 
-    def summarize_node(self):
-        index = self.pinecone.Index(self.config["MineaiIndexName"])
+    def load_document_text(self):
+        """Collect document text for summarization, preferring the cached text artifacts."""
+        max_chars = self.config.get("SummaryMaxChars", 12000)
+        per_namespace = max_chars // max(len(self.namespaces), 1)
         all_texts = []
-        
+
         for namespace in self.namespaces:
-            results = index.query(
+            artifact = self.artifacts.MLoad(namespace)
+            if artifact is not None:
+                # Artifact pages are in reading order, so the document opening is what fits the budget
+                all_texts.append("\n".join(artifact["pages"])[:per_namespace])
+                continue
+            if self.docstore.MHas(namespace):
+                all_texts.extend(self.docstore.MGetRange(namespace, 0, 10))
+                continue
+            results = self.pinecone.query(
                 vector=[0] * 384,
                 namespace=namespace,
                 top_k=10,  # Reduced per namespace
@@ -89,18 +156,27 @@ class AgentGraphBuilder:
             )
             texts = [m["metadata"].get("text", "") for m in results["matches"]]
             all_texts.extend(texts)
-        
-        document_text = "\n".join(all_texts)
 
+        return "\n".join(all_texts)
+
+    def summarize_node(self):
         def node(state: AgentGraphState):
-            prompt = f"EVERY TIME YOU ANSWER MUST SAY I AM A SUMMARY AGENT' \nSummarize the following document:\n\n{document_text}"
+            document_text = self.load_document_text()
+            prompt = SUMMARY_PROMPT.format(document_text=document_text)
             summary = self.llm.invoke(prompt).content
             return {"answer": summary}
-        return node
+
+        async def anode(state: AgentGraphState):
+            document_text = await RunInThreadPool(self.load_document_text)
+            prompt = SUMMARY_PROMPT.format(document_text=document_text)
+            summary = (await self.llm.ainvoke(prompt)).content
+            return {"answer": summary}
+        return RunnableLambda(node, afunc=anode, name="summarize")
 
     def build(self):
-        graph = StateGraph(AgentGraphState)
+        graph = TracedStateGraph(AgentGraphState)
 
+        graph.add_node("embed_question", self.embed_question_node())
         graph.add_node("get_memory", self.get_memory_node())
         graph.add_node("router", self.router_node())
         graph.add_node("qa", self.qa_agent_node())
@@ -108,7 +184,8 @@ class AgentGraphBuilder:
         graph.add_node("summarize", self.summarize_node())
         graph.add_node("save_memory", self.save_memory_node())
 
-        graph.set_entry_point("get_memory")
+        graph.set_entry_point("embed_question")
+        graph.add_edge("embed_question", "get_memory")
         graph.add_edge("get_memory", "router")
 
         def route_condition(state: AgentGraphState):
@@ -124,7 +201,20 @@ class AgentGraphBuilder:
             },
         )
 
-        graph.add_edge("qa", "save_memory")
+        def qa_condition(state: AgentGraphState):
+            # No relevant chunks: hand the question to the general agent when configured to
+            if state.get("no_context") and self.config.get("NoContextFallback", "message") == "master":
+                return "master"
+            return "save_memory"
+
+        graph.add_conditional_edges(
+            "qa",
+            qa_condition,
+            {
+                "master": "master",
+                "save_memory": "save_memory"
+            },
+        )
         graph.add_edge("master", "save_memory")
         graph.add_edge("summarize", "save_memory")
         graph.add_edge("save_memory", END)
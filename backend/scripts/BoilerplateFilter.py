@@ -0,0 +1,68 @@
+from scripts.helper.logConfig import get_logger
+from langchain_core.documents import Document
+from collections import Counter
+import re
+
+logger = get_logger("BoilerplateFilter")
+
+DIGITS = re.compile(r"\d+")
+WHITESPACE = re.compile(r"\s+")
+
+
+class CBoilerplateFilter:
+    """Removes running headers, footers, page numbers and license lines repeated across pages.
+
+    Only the first and last `EdgeLines` lines of each page are considered. A
+    line is boilerplate when its normalised form (lower-cased, digits folded to
+    '#', so "Page 3" and "Page 4" match) appears on at least `MinPageRatio` of
+    the pages, and on no fewer than `MinPages` pages.
+    """
+
+    def __init__(self, EdgeLines: int = 3, MinPages: int = 3, MinPageRatio: float = 0.5):
+        self.EdgeLines = EdgeLines
+        self.MinPages = MinPages
+        self.MinPageRatio = MinPageRatio
+
+    @staticmethod
+    def MNormalize(Line: str) -> str:
+        return DIGITS.sub("#", WHITESPACE.sub(" ", Line).strip().lower())
+
+    def MEdgeIndexes(self, LineCount: int) -> set:
+        """Return the indexes of the header/footer zone of a page with LineCount lines."""
+        return set(range(min(self.EdgeLines, LineCount))) | set(range(max(LineCount - self.EdgeLines, 0), LineCount))
+
+    def MFindBoilerplate(self, Pages: list) -> set:
+        """Return the normalised lines that repeat across enough pages to count as boilerplate."""
+        counts = Counter()
+        for lines in Pages:
+            edge = {self.MNormalize(lines[i]) for i in self.MEdgeIndexes(len(lines))}
+            counts.update(line for line in edge if line)
+        threshold = max(self.MinPages, self.MinPageRatio * len(Pages))
+        return {line for line, pages in counts.items() if pages >= threshold}
+
+    def MStrip(self, documents: list):
+        """Return (stripped documents, report) for the pages of one file."""
+        pages = [doc.page_content.split("\n") for doc in documents]
+        report = {"pages": len(pages), "lines_removed": 0, "chars_removed": 0, "patterns": []}
+        if len(pages) < self.MinPages:
+            return documents, report
+
+        boilerplate = self.MFindBoilerplate(pages)
+        if not boilerplate:
+            return documents, report
+
+        stripped = []
+        for doc, lines in zip(documents, pages):
+            edge = self.MEdgeIndexes(len(lines))
+            kept = []
+            for i, line in enumerate(lines):
+                if i in edge and self.MNormalize(line) in boilerplate:
+                    report["lines_removed"] += 1
+                    report["chars_removed"] += len(line)
+                else:
+                    kept.append(line)
+            stripped.append(Document(page_content="\n".join(kept), metadata=doc.metadata))
+
+        report["patterns"] = sorted(boilerplate)[:20]
+        logger.info(f"Removed {report['lines_removed']} boilerplate lines ({report['chars_removed']} chars) across {len(pages)} pages.")
+        return stripped, report
@@ -0,0 +1,186 @@
+from scripts.helper.logConfig import get_logger
+from scripts.config import load_config
+from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from functools import lru_cache
+import re
+import sys
+
+logger = get_logger("Chunker")
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+PARAGRAPH_BOUNDARY = re.compile(r"\n\s*\n")
+# Mirrors the whitespace/punctuation pre-tokenization of WordPiece and BPE tokenizers,
+# so a text's token count is the sum of its words' token counts
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+WORD_CACHE_LIMIT = 200_000
+
+CHUNK_STRATEGIES = ("sentence", "paragraph", "recursive")
+# Below all-MiniLM-L6-v2's 256-token max_seq_length, which also holds [CLS] and [SEP]
+DEFAULT_CHUNK_SETTINGS = {"strategy": "sentence", "chunk_size": 240, "chunk_overlap": 32}
+# Tokens the embedding model adds around every input ([CLS] ... [SEP])
+SPECIAL_TOKENS = 2
+
+
+@lru_cache(maxsize=4)
+def LoadTokenizer(ModelName: str):
+    """Load (once per process) the tokenizer that belongs to an embedding model."""
+    if ModelName == "hash":
+        # Local provider mode: the hash embeddings count words, no download needed
+        from scripts.LocalProviders import CWordTokenizer
+        return CWordTokenizer()
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(ModelName)
+    # Only used for counting, so silence the "sequence longer than max length" warning
+    tokenizer.model_max_length = sys.maxsize
+    return tokenizer
+
+
+class CTokenChunker:
+    """Single-pass chunker that measures chunk size in embedding-model tokens.
+
+    Text is cut into sentences (or paragraphs), units are token-counted through
+    a per-word cache, and packed greedily up to `chunk_size` tokens with up to
+    `chunk_overlap` tokens of trailing units repeated in the next chunk.
+    Settings are resolved per namespace from `ChunkStrategies` in config.json.
+    """
+
+    def __init__(self, ModelName: str = None, Strategies: dict = None):
+        config = load_config()
+        self.ModelName: str = ModelName or config["EmbeddingModel"]
+        self.Strategies: dict = Strategies if Strategies is not None else config.get("ChunkStrategies", {})
+        # The embedding model's max_seq_length; token chunks must fit in it with the special tokens
+        self.MaxModelTokens: int = config.get("EmbeddingMaxTokens", 256)
+        self.WordTokens: dict = {}
+
+    @property
+    def tokenizer(self):
+        return LoadTokenizer(self.ModelName)
+
+    def MSettingsFor(self, Namespace: str = None) -> dict:
+        """Return the chunk settings for a namespace, falling back to the "default" entry."""
+        settings = {**DEFAULT_CHUNK_SETTINGS, **self.Strategies.get("default", {})}
+        if Namespace and Namespace in self.Strategies:
+            settings.update(self.Strategies[Namespace])
+        if settings["strategy"] not in CHUNK_STRATEGIES:
+            raise ValueError(f"Unknown chunk strategy '{settings['strategy']}'. Expected one of: {', '.join(CHUNK_STRATEGIES)}")
+        if not 0 <= settings["chunk_overlap"] < settings["chunk_size"]:
+            raise ValueError("chunk_overlap must be non-negative and smaller than chunk_size")
+        # "recursive" counts characters, so only token strategies are bounded by the model
+        if settings["strategy"] != "recursive" and settings["chunk_size"] > self.MaxModelTokens - SPECIAL_TOKENS:
+            raise ValueError(
+                f"chunk_size {settings['chunk_size']} exceeds the embedding model's {self.MaxModelTokens}-token "
+                f"limit minus {SPECIAL_TOKENS} special tokens; longer chunks are truncated when embedded"
+            )
+        return settings
+
+    def MCountTokens(self, Texts: list) -> list:
+        """Return the token count of each text.
+
+        Only words not seen before are sent to the tokenizer, in one batch.
+        """
+        words_per_text = [WORD_PATTERN.findall(text) for text in Texts]
+        unseen = list({word for words in words_per_text for word in words if word not in self.WordTokens})
+        if unseen:
+            if len(self.WordTokens) + len(unseen) > WORD_CACHE_LIMIT:
+                self.WordTokens.clear()
+            encodings = self.tokenizer.backend_tokenizer.encode_batch(unseen, add_special_tokens=False)
+            self.WordTokens.update(zip(unseen, (len(encoding.ids) for encoding in encodings)))
+        lookup = self.WordTokens.__getitem__
+        return [sum(map(lookup, words)) for words in words_per_text]
+
+    def MSplitTokenWindows(self, Text: str, WindowTokens: int) -> list:
+        """Cut a single over-long unit into pieces of at most WindowTokens tokens."""
+        offsets = self.tokenizer(Text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+        pieces = []
+        for start in range(0, len(offsets), WindowTokens):
+            window = offsets[start:start + WindowTokens]
+            pieces.append((Text[window[0][0]:window[-1][1]], len(window)))
+        return pieces
+
+    def MUnits(self, Text: str, Settings: dict) -> list:
+        """Split text into (unit, token_count) pairs no longer than chunk_size."""
+        size = Settings["chunk_size"]
+        paragraphs = [" ".join(p.split()) for p in PARAGRAPH_BOUNDARY.split(Text)]
+        paragraphs = [p for p in paragraphs if p]
+        if Settings["strategy"] == "paragraph":
+            units = paragraphs
+        else:
+            units = [s for p in paragraphs for s in SENTENCE_BOUNDARY.split(p) if s]
+
+        counted = list(zip(units, self.MCountTokens(units)))
+        if Settings["strategy"] == "paragraph" and any(n > size for _, n in counted):
+            # Fall back to sentences only inside the paragraphs that don't fit
+            oversized = [u for u, n in counted if n > size]
+            sentences = [SENTENCE_BOUNDARY.split(u) for u in oversized]
+            sentence_counts = iter(self.MCountTokens([s for group in sentences for s in group]))
+            expanded = {u: [(s, next(sentence_counts)) for s in group] for u, group in zip(oversized, sentences)}
+            counted = [pair for u, n in counted for pair in (expanded[u] if n > size else [(u, n)])]
+
+        result = []
+        for unit, n in counted:
+            if n > size:
+                result.extend(self.MSplitTokenWindows(unit, size - Settings["chunk_overlap"]))
+            else:
+                result.append((unit, n))
+        return result
+
+    def MPack(self, Units: list, Settings: dict) -> list:
+        """Greedily pack (unit, tokens) pairs into (text, tokens) chunks."""
+        size, overlap = Settings["chunk_size"], Settings["chunk_overlap"]
+        separator = "\n\n" if Settings["strategy"] == "paragraph" else " "
+        chunks = []
+        current, current_tokens = [], 0
+        for unit, n in Units:
+            if current and current_tokens + n > size:
+                chunks.append((separator.join(u for u, _ in current), current_tokens))
+                # Carry trailing units into the next chunk as overlap
+                carry, carry_tokens = [], 0
+                for prev_unit, prev_n in reversed(current):
+                    if carry_tokens + prev_n > overlap or carry_tokens + prev_n + n > size:
+                        break
+                    carry.insert(0, (prev_unit, prev_n))
+                    carry_tokens += prev_n
+                current, current_tokens = carry, carry_tokens
+            current.append((unit, n))
+            current_tokens += n
+        if current:
+            chunks.append((separator.join(u for u, _ in current), current_tokens))
+        return chunks
+
+    def MSplitDocuments(self, documents: list, Namespace: str = None) -> list:
+        """Split documents into chunk Documents, recording the settings used in each chunk's metadata."""
+        settings = self.MSettingsFor(Namespace)
+        if settings["strategy"] == "recursive":
+            # Legacy character-based splitting (chunk_size/overlap count characters here),
+            # kept for namespaces indexed before token chunking
+            splitter = RecursiveCharacterTextSplitter(
+                chunk_size=settings["chunk_size"],
+                chunk_overlap=settings["chunk_overlap"]
+            )
+            split = splitter.split_documents(documents)
+            pieces = [(doc.metadata, doc.page_content) for doc in split]
+            token_counts = self.MCountTokens([text for _, text in pieces])
+        else:
+            pieces, token_counts = [], []
+            for doc in documents:
+                for text, n in self.MPack(self.MUnits(doc.page_content, settings), settings):
+                    pieces.append((doc.metadata, text))
+                    token_counts.append(n)
+
+        chunks = [
+            Document(
+                page_content=text,
+                metadata={
+                    **metadata,
+                    "chunk_index": i,
+                    "chunk_tokens": n,
+                    "chunk_strategy": settings["strategy"],
+                    "chunk_size": settings["chunk_size"],
+                    "chunk_overlap": settings["chunk_overlap"],
+                }
+            )
+            for i, ((metadata, text), n) in enumerate(zip(pieces, token_counts))
+        ]
+        logger.info(f"Split {len(documents)} documents into {len(chunks)} chunks with {settings}.")
+        return chunks
@@ -0,0 +1,167 @@
+from scripts.helper.logConfig import get_logger
+from collections import OrderedDict
+import numpy as np
+import threading
+import zstandard
+import mmap
+import os
+
+logger = get_logger("DocStore")
+
+# Dictionary compression only pays off once there are enough chunks to train on
+DICT_MIN_SAMPLES = 64
+DICT_SIZE = 32 * 1024
+
+
+def MakeChunkId(Namespace: str, ChunkIndex: int) -> str:
+    """Return the vector id used for a chunk; the ordinal is recoverable for neighbour lookups."""
+    return f"{Namespace}#{ChunkIndex}"
+
+
+def ParseChunkId(ChunkId: str):
+    """Split a chunk id into (namespace, ordinal); returns (None, None) for foreign ids."""
+    namespace, _, ordinal = ChunkId.rpartition("#")
+    if not namespace or not ordinal.isdigit():
+        return None, None
+    return namespace, int(ordinal)
+
+
+class _CNamespaceReader:
+    """Memory-mapped view of one namespace's chunk file."""
+
+    def __init__(self, DataPath: str, IndexPath: str, DictPath: str):
+        self.file = open(DataPath, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.offsets = np.load(IndexPath, mmap_mode="r")
+        if os.path.exists(DictPath):
+            with open(DictPath, "rb") as f:
+                self.dctx = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(f.read()))
+        else:
+            self.dctx = zstandard.ZstdDecompressor()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def MGet(self, Ordinal: int):
+        if not 0 <= Ordinal < len(self):
+            return None
+        start, end = int(self.offsets[Ordinal]), int(self.offsets[Ordinal + 1])
+        return self.dctx.decompress(self.data[start:end]).decode("utf-8")
+
+    def MClose(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+
+class CDocStore:
+    """Local store for chunk bodies so vectors only need to carry ids and small fields.
+
+    Each namespace is one data file of independently zstd-compressed chunks
+    (sharing a trained dictionary), plus an offset index. Both are memory-mapped,
+    so a lookup touches only the pages holding the requested chunks.
+    """
+
+    def __init__(self, Directory: str = "Data/DocStore", MaxOpenNamespaces: int = 256):
+        self.Directory = Directory
+        self.MaxOpenNamespaces = MaxOpenNamespaces
+        self._readers = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.Directory, exist_ok=True)
+
+    def MPaths(self, Namespace: str):
+        base = os.path.join(self.Directory, Namespace)
+        return f"{base}.zdocs", f"{base}.zidx.npy", f"{base}.zdict"
+
+    def MHas(self, Namespace: str) -> bool:
+        """Check whether chunk bodies for a namespace are stored locally."""
+        return os.path.exists(self.MPaths(Namespace)[1])
+
+    def MWrite(self, Namespace: str, Texts: list, ZstdLevel: int = 10):
+        """Store the chunk bodies of a namespace in chunk-index order, replacing any previous copy."""
+        DataPath, IndexPath, DictPath = self.MPaths(Namespace)
+        encoded = [text.encode("utf-8") for text in Texts]
+        dictionary = None
+        if len(encoded) >= DICT_MIN_SAMPLES:
+            try:
+                dictionary = zstandard.train_dictionary(DICT_SIZE, encoded)
+            except zstandard.ZstdError as e:
+                logger.warning(f"Could not train compression dictionary for {Namespace}: {e}")
+        cctx = zstandard.ZstdCompressor(level=ZstdLevel, dict_data=dictionary)
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        with open(f"{DataPath}.tmp", "wb") as f:
+            for i, body in enumerate(encoded):
+                f.write(cctx.compress(body))
+                offsets[i + 1] = f.tell()
+        with open(f"{IndexPath}.tmp", "wb") as f:
+            np.save(f, offsets)
+
+        self.MEvict(Namespace)
+        if dictionary is not None:
+            with open(f"{DictPath}.tmp", "wb") as f:
+                f.write(dictionary.as_bytes())
+            os.replace(f"{DictPath}.tmp", DictPath)
+        elif os.path.exists(DictPath):
+            os.remove(DictPath)
+        os.replace(f"{DataPath}.tmp", DataPath)
+        # The index is written last; its presence marks the namespace as complete
+        os.replace(f"{IndexPath}.tmp", IndexPath)
+        raw = sum(len(body) for body in encoded)
+        logger.info(f"Stored {len(encoded)} chunks for {Namespace} in the docstore: {raw} bytes -> {int(offsets[-1])} bytes.")
+
+    def MReader(self, Namespace: str):
+        with self._lock:
+            reader = self._readers.get(Namespace)
+            if reader is not None:
+                self._readers.move_to_end(Namespace)
+                return reader
+            if not self.MHas(Namespace):
+                return None
+            reader = _CNamespaceReader(*self.MPaths(Namespace))
+            self._readers[Namespace] = reader
+            while len(self._readers) > self.MaxOpenNamespaces:
+                _, oldest = self._readers.popitem(last=False)
+                oldest.MClose()
+            return reader
+
+    def MEvict(self, Namespace: str):
+        """Close the cached reader of a namespace, e.g. before it is rewritten or deleted."""
+        with self._lock:
+            reader = self._readers.pop(Namespace, None)
+        if reader is not None:
+            reader.MClose()
+
+    def MDelete(self, Namespace: str):
+        """Remove the stored chunk bodies of a namespace."""
+        self.MEvict(Namespace)
+        for path in self.MPaths(Namespace):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def MGetRange(self, Namespace: str, Start: int, End: int) -> list:
+        """Return the chunk bodies with ordinals in [Start, End)."""
+        reader = self.MReader(Namespace)
+        if reader is None:
+            return []
+        return [reader.MGet(i) for i in range(max(Start, 0), min(End, len(reader)))]
+
+    def MGet(self, ChunkIds: list, Window: int = 0) -> list:
+        """Return the body of each chunk id (None when unknown), in the same order.
+
+        With Window > 0 each body is expanded "small-to-big" with up to Window
+        neighbouring chunks on each side, giving the LLM the surrounding context.
+        """
+        texts = []
+        for chunk_id in ChunkIds:
+            namespace, ordinal = ParseChunkId(chunk_id)
+            reader = self.MReader(namespace) if namespace else None
+            if reader is None or not 0 <= ordinal < len(reader):
+                texts.append(None)
+                continue
+            if Window:
+                texts.append("\n".join(reader.MGet(i) for i in range(max(ordinal - Window, 0), min(ordinal + Window + 1, len(reader)))))
+            else:
+                texts.append(reader.MGet(ordinal))
+        return texts
@@ -1,14 +1,14 @@
-from pymongo import MongoClient
 from datetime import datetime, timezone
 from scripts.config import load_config
 from scripts.helper.logConfig import get_logger
+from scripts.Initialize import CInitialize
 
 logging = get_logger("History")
 class CHistory:
     def __init__(self):
         config = load_config()
         self.mongo_uri = config.get("MONGODB_URI", "mongodb://localhost:27017/")
-        self.client = MongoClient(self.mongo_uri)
+        self.client = CInitialize().MInitializeMongo()
         self.db = self.client["mineai"]
         self.collection = self.db["chat_sessions"]
 
@@ -2,40 +2,160 @@ from langchain_huggingface import HuggingFaceEmbeddings
 from pinecone import Pinecone, ServerlessSpec
 from langchain_groq import ChatGroq
 from scripts.config import load_config
+from scripts.helper.tracing import CTracedEmbeddings, CTracedIndex, CLLMTraceCallback, CMongoTraceListener
+from scripts.helper.metrics import MODEL_MEMORY, ModelBytes
+from scripts.helper.cassette import CCassette, CCassetteEmbeddings, CCassetteIndex, CCassetteChatModel, CCassetteMongoClient, CCassetteAsyncMongoClient
+from scripts import LocalProviders
+from functools import lru_cache
+from botocore.client import Config
+import boto3
 import time
 
+
+@lru_cache(maxsize=2)
+def LoadCassette(Path, Mode, Latency):
+    return CCassette(Path, Mode, Latency)
+
+
+# Loading the embedding model and resolving the index are expensive, so each
+# is done once per process and shared by every graph and request. Each client
+# is wrapped so its calls show up as spans in request traces. With a cassette
+# the calls are recorded, or replayed without building the real client.
+@lru_cache(maxsize=4)
+def LoadEmbeddings(ModelName, Cassette=None):
+    if Cassette is not None:
+        inner = None if Cassette.Replaying else LoadEmbeddings(ModelName).Inner
+        return CTracedEmbeddings(CCassetteEmbeddings(inner, Cassette, ModelName))
+    if ModelName == "hash":
+        return CTracedEmbeddings(LocalProviders.CHashEmbeddings())
+    embeddings = HuggingFaceEmbeddings(model_name=ModelName)
+    MODEL_MEMORY.labels(model=ModelName).set(ModelBytes(embeddings))
+    return CTracedEmbeddings(embeddings)
+
+
+@lru_cache(maxsize=4)
+def LoadPineconeIndex(ApiKey, IndexName, Local=False, Cassette=None):
+    if Cassette is not None:
+        inner = None if Cassette.Replaying else LoadPineconeIndex(ApiKey, IndexName, Local).Inner
+        return CTracedIndex(CCassetteIndex(inner, Cassette))
+    if Local:
+        return CTracedIndex(LocalProviders.GetLocalIndex(IndexName))
+    objPinecone = Pinecone(api_key=ApiKey)
+    # NOTE  : Parameter Dynamic
+    if IndexName not in objPinecone.list_indexes().names():
+        objPinecone.create_index(
+            name=IndexName,
+            dimension=384,
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region="us-east-1")
+        )
+        time.sleep(5)
+    return CTracedIndex(objPinecone.Index(IndexName))
+
+
+@lru_cache(maxsize=4)
+def LoadLLM(ModelName, ApiKey, LocalSettings=None, Cassette=None):
+    if Cassette is not None:
+        # The trace callback moves to the wrapper so each call is recorded once, replayed or not
+        inner = None if Cassette.Replaying else _BuildLLM(ModelName, ApiKey, LocalSettings, Callbacks=False)
+        return CCassetteChatModel(inner=inner, cassette=Cassette, callbacks=[CLLMTraceCallback()])
+    return _BuildLLM(ModelName, ApiKey, LocalSettings)
+
+
+def _BuildLLM(ModelName, ApiKey, LocalSettings=None, Callbacks=True):
+    callbacks = [CLLMTraceCallback()] if Callbacks else None
+    if LocalSettings is not None:
+        LatencyMs, TokensPerSecond, ResponseTokens = LocalSettings
+        return LocalProviders.CLocalChatModel(
+            latency_ms=LatencyMs,
+            tokens_per_second=TokensPerSecond,
+            response_tokens=ResponseTokens,
+            callbacks=callbacks
+        )
+    return ChatGroq(model=ModelName, api_key=ApiKey, callbacks=callbacks)
+
+
+@lru_cache(maxsize=4)
+def LoadMongoClient(Uri, Local=False, Cassette=None):
+    if Cassette is not None:
+        return CCassetteMongoClient(None if Cassette.Replaying else LoadMongoClient(Uri, Local), Cassette)
+    if Local:
+        return LocalProviders.GetLocalMongoClient()
+    from pymongo import MongoClient
+    return MongoClient(Uri, event_listeners=[CMongoTraceListener()])
+
+
+@lru_cache(maxsize=4)
+def LoadAsyncMongoClient(Uri, Local=False, Cassette=None):
+    if Cassette is not None:
+        return CCassetteAsyncMongoClient(None if Cassette.Replaying else LoadAsyncMongoClient(Uri, Local), Cassette)
+    if Local:
+        return LocalProviders.CAsyncMongoClient(LocalProviders.GetLocalMongoClient())
+    from motor.motor_asyncio import AsyncIOMotorClient
+    return AsyncIOMotorClient(Uri, event_listeners=[CMongoTraceListener()])
+
+
+@lru_cache(maxsize=4)
+def LoadObjectStore(EndpointUrl, AccessKeyId, SecretAccessKey, LocalDir=None):
+    if LocalDir is not None:
+        return LocalProviders.CLocalObjectStore(LocalDir)
+    return boto3.client(
+        "s3",
+        endpoint_url=EndpointUrl,
+        aws_access_key_id=AccessKeyId,
+        aws_secret_access_key=SecretAccessKey,
+        region_name="auto",
+        config=Config(signature_version="s3v4")
+    )
+
 class CInitialize():
     def __init__(self):
         config = load_config()
+        # ProviderMode "local" serves every client below from scripts/LocalProviders.py
+        self.Local = LocalProviders.IsLocalMode(config)
         self.EmbeddingModel = config["EmbeddingModel"]
-        self.PINECONE_API_KEY = config["PINECONE_API_KEY"]
-        self.GROQ_API_KEY = config["GROQ_API_KEY"]
+        if self.Local and config.get("LocalEmbeddings", "hash") == "hash":
+            self.EmbeddingModel = "hash"
+        self.PINECONE_API_KEY = config.get("PINECONE_API_KEY")
+        self.GROQ_API_KEY = config.get("GROQ_API_KEY")
         self.LLM_Model = config["LLM_Model"]
+        self.LocalLLMSettings = (
+            config.get("LocalLLMLatencyMs", 200),
+            config.get("LocalLLMTokensPerSecond", 200),
+            config.get("LocalLLMResponseTokens", 64)
+        ) if self.Local else None
+        self.MONGODB_URI = config.get("MONGODB_URI", "mongodb://localhost:27017/")
+        self.R2Settings = (config.get("R2_ENDPOINT"), config.get("R2_ACCESS_KEY_ID"), config.get("R2_SECRET_ACCESS_KEY"))
+        self.LocalObjectDir = config.get("LocalObjectStoreDir", "Data/LocalR2") if self.Local else None
+        # CassetteMode "record" / "replay" captures or serves embedding, Pinecone, LLM and Mongo (sync and async) calls
+        self.Cassette = LoadCassette(
+            config.get("CassettePath", "Data/Cassettes/cassette.jsonl.zst"),
+            config["CassetteMode"],
+            config.get("CassetteLatency", "original")
+        ) if config.get("CassetteMode", "off") != "off" else None
         
         
     def MInitializeEmbeddings(self):        
-        """Initialize the embedding model."""
-        return HuggingFaceEmbeddings(model_name=self.EmbeddingModel)
+        """Initialize the embedding model (shared per process)."""
+        return LoadEmbeddings(self.EmbeddingModel, self.Cassette)
     
     def MInitializePinecone(self, IndexName):
-        """Initialize Pinecone and create index if it doesn't exist."""
-        
-        objPinecone = Pinecone(api_key=self.PINECONE_API_KEY)
-        # NOTE  : Parameter Dynamic
-        if IndexName not in objPinecone.list_indexes().names():
-            objPinecone.create_index(
-                name=IndexName,
-                dimension=384,
-                metric="cosine",
-                spec=ServerlessSpec(cloud="aws", region="us-east-1")
-            )
-            time.sleep(5)
-        
-        return objPinecone.Index(IndexName)
+        """Initialize Pinecone and create index if it doesn't exist (shared per process)."""
+        return LoadPineconeIndex(self.PINECONE_API_KEY, IndexName, self.Local, self.Cassette)
     
     def MInitializeLLM(self):
-        """Initialize the LLM with Groq API."""
-        return ChatGroq(
-            model=self.LLM_Model,
-            api_key= self.GROQ_API_KEY
-        )
+        """Initialize the LLM with Groq API (shared per process)."""
+        return LoadLLM(self.LLM_Model, self.GROQ_API_KEY, self.LocalLLMSettings, self.Cassette)
+
+    def MInitializeMongo(self):
+        """Return the pymongo client (shared per process)."""
+        return LoadMongoClient(self.MONGODB_URI, self.Local, self.Cassette)
+
+    def MInitializeAsyncMongo(self):
+        """Return the motor client for async code (shared per process)."""
+        return LoadAsyncMongoClient(self.MONGODB_URI, self.Local, self.Cassette)
+
+    def MInitializeObjectStore(self, EndpointUrl=None):
+        """Return the S3-compatible R2 client (shared per process and endpoint)."""
+        endpoint, access_key, secret_key = self.R2Settings
+        return LoadObjectStore(EndpointUrl or endpoint, access_key, secret_key, self.LocalObjectDir)
@@ -0,0 +1,104 @@
+from scripts.helper.logConfig import get_logger
+import numpy as np
+import json
+import time
+
+logger = get_logger("IntentRouter")
+
+INTENT_PROTOTYPES = {
+    "summarize": [
+        "Summarize this document",
+        "Give me a summary of the file",
+        "What is this paper about?",
+        "Give me an overview of the document",
+        "TL;DR of the PDF",
+        "What are the key points of this document?",
+        "Briefly describe the contents of the file",
+    ],
+    "qa": [
+        "What does the document say about this topic?",
+        "According to the paper, how does the method work?",
+        "Which dataset was used in the experiments?",
+        "What is the definition given in the text?",
+        "Explain the section on results",
+        "What are the limitations mentioned by the authors?",
+        "How is the value calculated in the report?",
+    ],
+    "general": [
+        "Hello, how are you?",
+        "Tell me a joke",
+        "Who are you?",
+        "What can you do?",
+        "Thanks for the help",
+        "Write a poem about the sea",
+        "What is the capital of France?",
+    ],
+}
+
+
+class CIntentRouter:
+    """Classifies a question as summarize / qa / general without an LLM call.
+
+    The question embedding is compared (cosine) with labelled prototype
+    utterances embedded once at start-up; a label scores as its best matching
+    prototype. Below `MinScore`, or when the best label leads the runner-up by
+    less than `MinMargin`, the router reports no confident intent, so callers
+    fall back to their default route.
+    """
+
+    def __init__(self, embeddings, Prototypes: dict = None, MinScore: float = 0.35, MinMargin: float = 0.1):
+        self.Prototypes = Prototypes or INTENT_PROTOTYPES
+        self.MinScore = MinScore
+        self.MinMargin = MinMargin
+        self.Labels = []
+        utterances = []
+        for label, examples in self.Prototypes.items():
+            self.Labels.extend([label] * len(examples))
+            utterances.extend(examples)
+        matrix = np.asarray(embeddings.embed_documents(utterances), dtype=np.float32)
+        self.Matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        self.Intents = list(self.Prototypes)
+        self.LabelIndex = np.array([self.Intents.index(label) for label in self.Labels])
+        logger.info(f"Intent router ready with {len(utterances)} prototypes for {self.Intents}.")
+
+    def MClassify(self, QuestionEmbedding, Question: str = None) -> dict:
+        """Return {"intent", "confidence", "margin", "scores"}; intent is None when not confident."""
+        start = time.perf_counter()
+        query = np.asarray(QuestionEmbedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        similarity = self.Matrix @ query
+        scores = np.full(len(self.Intents), -1.0, dtype=np.float32)
+        np.maximum.at(scores, self.LabelIndex, similarity)
+        order = np.argsort(-scores)
+        best = float(scores[order[0]])
+        margin = best - float(scores[order[1]]) if len(order) > 1 else best
+        decision = {
+            "intent": self.Intents[order[0]] if best >= self.MinScore and margin >= self.MinMargin else None,
+            "confidence": round(best, 4),
+            "margin": round(margin, 4),
+            "scores": {intent: round(float(score), 4) for intent, score in zip(self.Intents, scores)},
+        }
+        # Logged as JSON so decisions can be collected to tune the prototypes; the question itself only at DEBUG
+        record = {**decision, "ms": round((time.perf_counter() - start) * 1000, 3)}
+        logger.info(f"Intent decision {json.dumps(record)}")
+        logger.debug(f"Intent decision question {json.dumps(Question)}")
+        return decision
+
+
+_routers = {}
+
+
+def GetIntentRouter(embeddings, Prototypes: dict = None, MinScore: float = 0.35, MinMargin: float = 0.1) -> CIntentRouter:
+    """Return a router shared by everything using the same embedding model and prototypes.
+
+    Building one embeds every prototype, so it is done once per process rather than per request.
+    """
+    key = (
+        getattr(embeddings, "model_name", None) or id(embeddings),
+        json.dumps(Prototypes, sort_keys=True),
+        MinScore,
+        MinMargin,
+    )
+    if key not in _routers:
+        _routers[key] = CIntentRouter(embeddings, Prototypes, MinScore, MinMargin)
+    return _routers[key]
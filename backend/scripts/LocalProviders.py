@@ -0,0 +1,387 @@
+from scripts.helper.logConfig import get_logger
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from botocore.exceptions import ClientError
+from collections import namedtuple
+from functools import lru_cache
+from datetime import datetime, timezone
+import numpy as np
+import threading
+import hashlib
+import asyncio
+import time
+import io
+import os
+import re
+
+logger = get_logger("LocalProviders")
+
+# Offline stand-ins for Pinecone, Groq, MongoDB and R2, selected with ProviderMode "local"
+# (config.json or the PROVIDER_MODE environment variable). They keep the call shapes the
+# rest of the code uses, so benchmarks and CI run without credentials or network.
+
+LocalVector = namedtuple("LocalVector", ["id", "values", "metadata"])
+LocalFetchResponse = namedtuple("LocalFetchResponse", ["vectors", "namespace"])
+
+
+def IsLocalMode(config: dict) -> bool:
+    return config.get("ProviderMode", "live") == "local"
+
+
+class CLocalIndex:
+    """In-process vector index with the Pinecone Index calls this codebase uses.
+
+    Cosine metric, namespaces, upsert / query / fetch / list / delete /
+    describe_index_stats. Query results are plain dicts shaped like Pinecone's.
+    """
+
+    def __init__(self, Dimension: int = 384):
+        self.Dimension = Dimension
+        self.Namespaces: dict = {}
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, namespace: str = "", **kwargs):
+        with self._lock:
+            store = self.Namespaces.setdefault(namespace, {})
+            for vector in vectors:
+                if isinstance(vector, dict):
+                    vector_id, values, metadata = vector["id"], vector["values"], vector.get("metadata") or {}
+                else:
+                    vector_id, values = vector[0], vector[1]
+                    metadata = vector[2] if len(vector) > 2 else {}
+                if len(values) != self.Dimension:
+                    raise ValueError(f"Vector dimension {len(values)} does not match the index dimension {self.Dimension}")
+                store[vector_id] = (np.asarray(values, dtype=np.float32), dict(metadata))
+        return {"upserted_count": len(vectors)}
+
+    def query(self, vector=None, top_k: int = 10, namespace: str = "", include_values: bool = False,
+              include_metadata: bool = False, filter: dict = None, id: str = None, **kwargs):
+        with self._lock:
+            items = list(self.Namespaces.get(namespace, {}).items())
+        if id is not None:
+            vector = dict(items)[id][0]
+        if filter:
+            items = [item for item in items if all(item[1][1].get(key) == value for key, value in filter.items())]
+        if not items:
+            return {"matches": [], "namespace": namespace}
+        matrix = np.stack([values for _, (values, _) in items])
+        query = np.asarray(vector, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * max(float(np.linalg.norm(query)), 1e-12)
+        scores = (matrix @ query) / np.maximum(norms, 1e-12)
+        order = np.argsort(-scores)[:top_k]
+        matches = []
+        for i in order:
+            vector_id, (values, metadata) = items[i]
+            match = {"id": vector_id, "score": float(scores[i])}
+            if include_values:
+                match["values"] = values.tolist()
+            if include_metadata:
+                match["metadata"] = dict(metadata)
+            matches.append(match)
+        return {"matches": matches, "namespace": namespace}
+
+    def fetch(self, ids, namespace: str = "", **kwargs):
+        with self._lock:
+            store = self.Namespaces.get(namespace, {})
+            vectors = {
+                vector_id: LocalVector(vector_id, store[vector_id][0].tolist(), dict(store[vector_id][1]))
+                for vector_id in ids if vector_id in store
+            }
+        return LocalFetchResponse(vectors, namespace)
+
+    def list(self, prefix: str = None, limit: int = 100, namespace: str = "", **kwargs):
+        with self._lock:
+            ids = sorted(self.Namespaces.get(namespace, {}))
+        if prefix:
+            ids = [vector_id for vector_id in ids if vector_id.startswith(prefix)]
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def delete(self, ids=None, delete_all: bool = False, namespace: str = "", filter: dict = None, **kwargs):
+        with self._lock:
+            if delete_all:
+                self.Namespaces.pop(namespace, None)
+            elif ids:
+                store = self.Namespaces.get(namespace, {})
+                for vector_id in ids:
+                    store.pop(vector_id, None)
+        return {}
+
+    def describe_index_stats(self, **kwargs):
+        with self._lock:
+            namespaces = {ns: {"vector_count": len(store)} for ns, store in self.Namespaces.items()}
+        return {
+            "dimension": self.Dimension,
+            "namespaces": namespaces,
+            "total_vector_count": sum(ns["vector_count"] for ns in namespaces.values()),
+        }
+
+
+class CHashEmbeddings(Embeddings):
+    """Deterministic feature-hashing embeddings: no model download, lexical similarity only."""
+
+    def __init__(self, Dimension: int = 384):
+        self.Dimension = Dimension
+        self.model_name = f"hash-{Dimension}"
+
+    def MEmbed(self, text: str) -> list:
+        vector = np.zeros(self.Dimension, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.Dimension
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = float(np.linalg.norm(vector))
+        if norm == 0:
+            vector[0] = 1.0
+            norm = 1.0
+        return (vector / norm).tolist()
+
+    def embed_query(self, text: str) -> list:
+        return self.MEmbed(text)
+
+    def embed_documents(self, texts: list) -> list:
+        return [self.MEmbed(text) for text in texts]
+
+
+class CWordTokenizer:
+    """Tokenizer stand-in for the hash embeddings: one token per word or punctuation mark.
+
+    Implements the two calls CTokenChunker makes on a Hugging Face tokenizer,
+    so chunking works without downloading one.
+    """
+
+    WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+    Encoding = namedtuple("Encoding", ["ids"])
+
+    @property
+    def backend_tokenizer(self):
+        return self
+
+    def encode_batch(self, texts, add_special_tokens=False):
+        return [self.Encoding(list(range(len(self.WORD_PATTERN.findall(text))))) for text in texts]
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False):
+        offsets = [(match.start(), match.end()) for match in self.WORD_PATTERN.finditer(text)]
+        return {"offset_mapping": offsets, "input_ids": list(range(len(offsets)))}
+
+
+class CLocalChatModel(BaseChatModel):
+    """Deterministic stand-in for ChatGroq with a configurable latency and token rate.
+
+    The reply is built from the prompt's words, so identical prompts give
+    identical answers. Each call takes latency_ms plus response_tokens /
+    tokens_per_second, and reports token usage like the Groq client.
+    """
+
+    latency_ms: float = 200.0
+    tokens_per_second: float = 200.0
+    response_tokens: int = 64
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-fake"
+
+    def MReply(self, messages):
+        prompt = "\n".join(str(message.content) for message in messages)
+        words = re.findall(r"\w+", prompt)[-self.response_tokens:] or ["ok"]
+        content = "[local] " + " ".join(words)
+        usage = {
+            "prompt_tokens": len(prompt.split()),
+            "completion_tokens": len(words),
+            "total_tokens": len(prompt.split()) + len(words),
+        }
+        delay = self.latency_ms / 1000 + (len(words) / self.tokens_per_second if self.tokens_per_second > 0 else 0)
+        result = ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=content))],
+            llm_output={"token_usage": usage, "model_name": self._llm_type},
+        )
+        return result, delay
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        result, delay = self.MReply(messages)
+        time.sleep(delay)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        result, delay = self.MReply(messages)
+        await asyncio.sleep(delay)
+        return result
+
+
+class CLocalObjectStore:
+    """Filesystem-backed stand-in for the boto3 S3 client used against R2.
+
+    Objects live at {Directory}/{Bucket}/{Key}; missing objects raise the
+    same ClientError (404 / NoSuchKey) as boto3.
+    """
+
+    def __init__(self, Directory: str):
+        self.Directory = Directory
+
+    def MPath(self, Bucket, Key) -> str:
+        path = os.path.abspath(os.path.join(self.Directory, Bucket or "default", Key))
+        if not path.startswith(os.path.abspath(self.Directory) + os.sep):
+            raise ValueError(f"Object key escapes the local store: {Key}")
+        return path
+
+    def MMissing(self, Key, Operation):
+        return ClientError({"Error": {"Code": "404" if Operation == "HeadObject" else "NoSuchKey", "Message": f"Not Found: {Key}"}}, Operation)
+
+    def put_object(self, Bucket, Key, Body=b"", **kwargs):
+        path = self.MPath(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = Body.read() if hasattr(Body, "read") else Body
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return {"ETag": hashlib.md5(data).hexdigest()}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, **kwargs):
+        self.put_object(Bucket=Bucket, Key=Key, Body=Fileobj.read())
+
+    def get_object(self, Bucket, Key, **kwargs):
+        path = self.MPath(Bucket, Key)
+        if not os.path.exists(path):
+            raise self.MMissing(Key, "GetObject")
+        with open(path, "rb") as f:
+            data = f.read()
+        return {"Body": io.BytesIO(data), "ContentLength": len(data)}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        path = self.MPath(Bucket, Key)
+        if not os.path.exists(path):
+            raise self.MMissing(Key, "HeadObject")
+        return {"ContentLength": os.path.getsize(path), "LastModified": os.path.getmtime(path), "Metadata": {}}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        path = self.MPath(Bucket, Key)
+        if os.path.exists(path):
+            os.remove(path)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, **kwargs):
+        root = os.path.join(self.Directory, Bucket or "default")
+        contents = []
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, name)
+                key = os.path.relpath(path, root).replace(os.sep, "/")
+                if key.startswith(Prefix):
+                    contents.append({
+                        "Key": key,
+                        "Size": os.path.getsize(path),
+                        "LastModified": datetime.fromtimestamp(os.path.getmtime(path), timezone.utc),
+                        "ETag": '"local"'
+                    })
+        contents.sort(key=lambda item: item["Key"])
+        response = {"IsTruncated": False, "KeyCount": len(contents[:MaxKeys])}
+        if contents:
+            response["Contents"] = contents[:MaxKeys]
+        return response
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, **kwargs):
+        Params = Params or {}
+        return "file://" + self.MPath(Params.get("Bucket"), Params.get("Key"))
+
+
+# ----- MongoDB -----
+class CAsyncCursor:
+    """Motor-style cursor over a mongomock cursor."""
+
+    def __init__(self, Cursor):
+        self.Cursor = Cursor
+
+    def sort(self, *args, **kwargs):
+        self.Cursor = self.Cursor.sort(*args, **kwargs)
+        return self
+
+    def skip(self, count):
+        self.Cursor = self.Cursor.skip(count)
+        return self
+
+    def limit(self, count):
+        self.Cursor = self.Cursor.limit(count)
+        return self
+
+    async def to_list(self, length=None):
+        documents = list(self.Cursor)
+        return documents if length is None else documents[:length]
+
+    def __aiter__(self):
+        return self.MIterate()
+
+    async def MIterate(self):
+        for document in self.Cursor:
+            yield document
+
+
+class CAsyncCollection:
+    """Motor-style collection: every mongomock call is awaitable; find/aggregate return async cursors."""
+
+    def __init__(self, Collection):
+        self.Collection = Collection
+
+    def find(self, *args, **kwargs):
+        return CAsyncCursor(self.Collection.find(*args, **kwargs))
+
+    def aggregate(self, *args, **kwargs):
+        return CAsyncCursor(self.Collection.aggregate(*args, **kwargs))
+
+    def __getattr__(self, name):
+        attribute = getattr(self.Collection, name)
+        if not callable(attribute):
+            return attribute
+
+        async def method(*args, **kwargs):
+            return attribute(*args, **kwargs)
+        return method
+
+
+class CAsyncDatabase:
+    def __init__(self, Database):
+        self.Database = Database
+
+    def __getitem__(self, name):
+        return CAsyncCollection(self.Database[name])
+
+    def __getattr__(self, name):
+        return CAsyncCollection(self.Database[name])
+
+
+class CAsyncMongoClient:
+    """Motor-style client over the shared mongomock client."""
+
+    def __init__(self, Client):
+        self.Client = Client
+
+    def __getitem__(self, name):
+        return CAsyncDatabase(self.Client[name])
+
+
+@lru_cache(maxsize=1)
+def GetLocalMongoClient():
+    """One in-memory Mongo per process, so the sync (History) and async (app) clients see the same data."""
+    import mongomock
+    logger.info("Using the in-memory local MongoDB (mongomock).")
+    return mongomock.MongoClient()
+
+
+@lru_cache(maxsize=8)
+def GetLocalIndex(IndexName: str, Dimension: int = 384) -> CLocalIndex:
+    """One local index per index name per process."""
+    logger.info(f"Using the local in-process vector index '{IndexName}'.")
+    return CLocalIndex(Dimension)
+
+
+@lru_cache(maxsize=1)
+def GetLocalMemoryStore(embeddings):
+    """Conversation memory store for local mode, shared like the Pinecone memory namespace."""
+    from langchain_core.vectorstores import InMemoryVectorStore
+    return InMemoryVectorStore(embeddings)
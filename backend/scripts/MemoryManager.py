@@ -1,18 +1,23 @@
 from langchain.memory import VectorStoreRetrieverMemory
 from langchain_pinecone import PineconeVectorStore
 from scripts.config import load_config
+from scripts.LocalProviders import IsLocalMode, GetLocalMemoryStore
+from scripts.Initialize import CInitialize
 
 
 class CMemoryManager:
     def __init__(self, embeddings):
         """Initialize VectorStoreRetrieverMemory with Pinecone vector store."""
         config = load_config()
-        self.memory_vector_store = PineconeVectorStore(
-            index_name=config["MineaiIndexName"],
-            embedding=embeddings,
-            pinecone_api_key=config["PINECONE_API_KEY"],
-            namespace=config["NameSpace"]
-        )
+        if IsLocalMode(config):
+            self.memory_vector_store = GetLocalMemoryStore(embeddings)
+        else:
+            # The shared index client, so memory reads and writes are traced and cassette-recorded too
+            self.memory_vector_store = PineconeVectorStore(
+                index=CInitialize().MInitializePinecone(config["MINEAI_INDEX_NAME"]),
+                embedding=embeddings,
+                namespace=config["NameSpace"]
+            )
         self.memory = VectorStoreRetrieverMemory(
             retriever=self.memory_vector_store.as_retriever(search_kwargs={"k": 3}),
             memory_key="conversation_history",
@@ -26,9 +31,15 @@ class CMemoryManager:
         self.memory.save_context({"question": question}, {"answer": answer})
 
 
-    def MGetConversationContext(self, question):
-        """Retrieve relevant conversation history for the given question."""
-        history_docs = self.memory.load_memory_variables({"prompt": question})["conversation_history"]
+    def MGetConversationContext(self, question, question_embedding=None):
+        """Retrieve relevant conversation history for the given question.
+
+        Pass question_embedding when the question is already embedded to skip a second forward pass.
+        """
+        if question_embedding is not None:
+            history_docs = self.memory_vector_store.similarity_search_by_vector(question_embedding, k=3)
+        else:
+            history_docs = self.memory.load_memory_variables({"prompt": question})["conversation_history"]
         if isinstance(history_docs, list):
             history_parts = [doc.page_content for doc in history_docs]
             return "\n\n".join(history_parts)
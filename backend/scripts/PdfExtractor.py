@@ -0,0 +1,191 @@
+from scripts.helper.logConfig import get_logger
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import importlib.util
+import multiprocessing
+import os
+import threading
+
+logger = get_logger("PdfExtractor")
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class CPdfExtractor(ABC):
+    """Base class for PDF text extraction backends."""
+    Name = ""
+    Module = ""
+
+    @classmethod
+    def MIsAvailable(cls) -> bool:
+        """Return True if the backend's library is installed."""
+        return importlib.util.find_spec(cls.Module) is not None
+
+    @abstractmethod
+    def MPageCount(self, PDFPath: str) -> int:
+        """Return the number of pages in the PDF."""
+
+    @abstractmethod
+    def MExtractPageRange(self, PDFPath: str, Start: int, End: int) -> list:
+        """Return the text of pages [Start, End) as a list of strings."""
+
+
+class CPyPdfExtractor(CPdfExtractor):
+    Name = "pypdf"
+    Module = "pypdf"
+
+    def MPageCount(self, PDFPath: str) -> int:
+        from pypdf import PdfReader
+        return len(PdfReader(PDFPath).pages)
+
+    def MExtractPageRange(self, PDFPath: str, Start: int, End: int) -> list:
+        from pypdf import PdfReader
+        reader = PdfReader(PDFPath)
+        return [reader.pages[i].extract_text() or "" for i in range(Start, End)]
+
+
+class CPdfiumExtractor(CPdfExtractor):
+    Name = "pdfium"
+    Module = "pypdfium2"
+
+    def MPageCount(self, PDFPath: str) -> int:
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(PDFPath)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def MExtractPageRange(self, PDFPath: str, Start: int, End: int) -> list:
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(PDFPath)
+        try:
+            texts = []
+            for i in range(Start, End):
+                page = pdf[i]
+                textpage = None
+                try:
+                    textpage = page.get_textpage()
+                    # pdfium separates lines with CRLF; normalise to match the other backends
+                    texts.append(textpage.get_text_bounded().replace("\r\n", "\n"))
+                finally:
+                    if textpage is not None:
+                        textpage.close()
+                    page.close()
+            return texts
+        finally:
+            pdf.close()
+
+
+class CPdfMinerExtractor(CPdfExtractor):
+    Name = "pdfminer"
+    Module = "pdfminer"
+
+    def MPageCount(self, PDFPath: str) -> int:
+        from pdfminer.pdfpage import PDFPage
+        with open(PDFPath, "rb") as f:
+            return sum(1 for _ in PDFPage.get_pages(f))
+
+    def MExtractPageRange(self, PDFPath: str, Start: int, End: int) -> list:
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+        return [
+            "".join(element.get_text() for element in page if isinstance(element, LTTextContainer)).strip()
+            for page in extract_pages(PDFPath, page_numbers=range(Start, End))
+        ]
+
+
+PDF_EXTRACTORS = {
+    extractor.Name: extractor
+    for extractor in (CPyPdfExtractor, CPdfiumExtractor, CPdfMinerExtractor)
+}
+
+
+def GetPdfExtractor(Name: str) -> CPdfExtractor:
+    """Return an instance of the named backend, raising if it is unknown or not installed."""
+    if Name not in PDF_EXTRACTORS:
+        raise ValueError(f"Unknown PDF extractor '{Name}'. Expected one of: {', '.join(PDF_EXTRACTORS)}")
+    extractor = PDF_EXTRACTORS[Name]
+    if not extractor.MIsAvailable():
+        raise ImportError(f"PDF extractor '{Name}' requires the '{extractor.Module}' package")
+    return extractor()
+
+
+def SelectPdfExtractor(PDFPath: str, Requested: str = "auto", AutoThresholdMB: float = 10, LargeFileExtractor: str = "pdfium") -> str:
+    """Resolve the backend name to use for a file.
+
+    An explicit name is returned as-is. "auto" keeps pypdf for small files and
+    switches to `LargeFileExtractor` above `AutoThresholdMB` when it is installed.
+    """
+    if Requested and Requested != "auto":
+        GetPdfExtractor(Requested)
+        return Requested
+    size_mb = os.path.getsize(PDFPath) / (1024 * 1024)
+    if size_mb >= AutoThresholdMB and PDF_EXTRACTORS.get(LargeFileExtractor, CPdfExtractor).MIsAvailable():
+        return LargeFileExtractor
+    return CPyPdfExtractor.Name
+
+
+def ExtractPageRange(ExtractorName: str, PDFPath: str, Start: int, End: int) -> list:
+    """Extract the text of pages [Start, End) from a PDF.
+
+    Runs inside pool workers, so it opens the file by path and only returns
+    plain strings; page objects never cross the process boundary.
+    """
+    return GetPdfExtractor(ExtractorName).MExtractPageRange(PDFPath, Start, End)
+
+
+def GetPdfPool(Workers: int) -> ProcessPoolExecutor:
+    """
+    Return the long-lived extraction pool with `Workers` processes.
+
+    Workers are spawned rather than forked: callers run on the app's worker
+    threads, and forking a multi-threaded process can deadlock the child.
+    Spawning is slow, so the pool is kept and reused across uploads.
+    """
+    with _pools_lock:
+        pool = _pools.get(Workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=Workers, mp_context=multiprocessing.get_context("spawn"))
+            _pools[Workers] = pool
+            logger.info(f"Started PDF extraction pool with {Workers} processes.")
+        return pool
+
+
+def LoadPdfPages(PDFPath: str, Workers: int, PagesPerShard: int, ExtractorName: str = "pypdf") -> list:
+    """Extract every page of a PDF, sharding page ranges across a process pool.
+
+    Returns the page texts in page order regardless of which worker finished first.
+    """
+    TotalPages = GetPdfExtractor(ExtractorName).MPageCount(PDFPath)
+    Shards = [
+        (Start, min(Start + PagesPerShard, TotalPages))
+        for Start in range(0, TotalPages, PagesPerShard)
+    ]
+    # The pool is sized by the configured workers so every document shares it
+    PoolSize = Workers
+    Workers = min(Workers, len(Shards))
+    if Workers <= 1:
+        Results = [ExtractPageRange(ExtractorName, PDFPath, Start, End) for Start, End in Shards]
+    else:
+        executor = GetPdfPool(PoolSize)
+        try:
+            # map() yields results in submission order, i.e. page order
+            Results = list(executor.map(
+                ExtractPageRange,
+                [ExtractorName] * len(Shards),
+                [PDFPath] * len(Shards),
+                [Start for Start, _ in Shards],
+                [End for _, End in Shards],
+            ))
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); drop the pool so the next upload gets a fresh one
+            with _pools_lock:
+                if _pools.get(PoolSize) is executor:
+                    del _pools[PoolSize]
+            executor.shutdown(wait=False)
+            raise
+    logger.info(f"Extracted {TotalPages} pages from {PDFPath} with {ExtractorName} in {len(Shards)} shard(s) using {max(Workers, 1)} worker(s).")
+    return [text for shard in Results for text in shard]
@@ -1,7 +1,10 @@
+import copy
 import os
-from typing import Dict, Any, Optional, TypedDict
+from typing import Dict, Any, Optional, List, TypedDict
 from langgraph.graph import StateGraph, END
 from scripts.helper.logConfig import get_logger
+from scripts.helper.asyncPool import AsyncNode
+from scripts.helper.tracing import TracedStateGraph
 from VectorStore import CVectorStore
 from scripts.config import load_config
 
@@ -15,6 +18,11 @@ class PDFProcessingState(TypedDict):
     processing_status: str
     error_message: Optional[str]
     namespace: Optional[str]
+    vectors_exist: Optional[bool]
+    vector_check_error: Optional[str]
+    documents: Optional[List]
+    extract_error: Optional[str]
+    ingest_report: Optional[Dict[str, Any]]
     success: bool
 
 class PDFProcessingGraph:
@@ -23,11 +31,23 @@ class PDFProcessingGraph:
         try:
             self.vector_store = CVectorStore()
             self.config = load_config()
+            self.graph = self.build_graph()
             logger.info("PDF Processing Graph initialized successfully.")
         except Exception as e:
             logger.error(f"Error initializing PDF Processing Graph: {e}")
             raise
 
+    def run_store(self, state: PDFProcessingState) -> CVectorStore:
+        """Shallow copy of the shared vector store that records into this run's ingest report.
+
+        The graph instance is shared by concurrent runs, so the report lives in
+        the state rather than on self.vector_store; the copy shares the clients,
+        chunker and stores, only IngestReport is per run.
+        """
+        store = copy.copy(self.vector_store)
+        store.IngestReport = state["ingest_report"]
+        return store
+
     def validate_pdf_file(self, state: PDFProcessingState) -> PDFProcessingState:
         """Node: Validate if PDF file exists and is accessible"""
         try:
@@ -79,6 +99,7 @@ class PDFProcessingGraph:
                 state["file_hash"] = file_hash
                 state["namespace"] = file_hash
                 state["processing_status"] = "hash_generated"
+                state["ingest_report"] = {"file_hash": file_hash}
                 logger.info(f"File hash generated successfully: {file_hash}")
             else:
                 state["error_message"] = "Failed to generate file hash"
@@ -93,42 +114,79 @@ class PDFProcessingGraph:
             state["processing_status"] = "hash_generation_error"
             return state
 
-    def check_existing_vectors(self, state: PDFProcessingState) -> PDFProcessingState:
+    # check_vectors and load_artifact run as parallel branches, so each returns
+    # only its own keys; join_stages turns them into the processing status.
+
+    def check_existing_vectors(self, state: PDFProcessingState) -> Dict[str, Any]:
         """Node: Check if vectors already exist for this file"""
         try:
             namespace = state["namespace"]
             logger.info(f"Checking existing vectors for namespace: {namespace}")
-            
-            # Check if vectors already exist in the vector store
-            # This is a placeholder - implement based on your vector store's capability
-            existing_vectors = self.vector_store.MCheckNamespaceExists(namespace) if hasattr(self.vector_store, 'MCheckNamespaceExists') else False
-            
-            if existing_vectors:
-                state["processing_status"] = "vectors_exist"
-                state["success"] = True
+            vectors_exist = not self.vector_store.MIsFileHashUnique(namespace)
+            if vectors_exist:
                 logger.info(f"Vectors already exist for namespace: {namespace}")
             else:
-                state["processing_status"] = "vectors_not_found"
                 logger.info(f"No existing vectors found for namespace: {namespace}")
-            
-            return state
+            return {"vectors_exist": vectors_exist}
             
         except Exception as e:
             logger.error(f"Error checking existing vectors: {e}")
-            state["error_message"] = f"Vector check error: {str(e)}"
+            return {"vector_check_error": f"Vector check error: {str(e)}"}
+
+    def load_artifact(self, state: PDFProcessingState) -> Dict[str, Any]:
+        """Node: Read the cached page texts, if any, while the vector check runs"""
+        try:
+            # Only the cheap artifact lookup overlaps the check; the PDF is parsed in
+            # extract_text, and only once the check has found no vectors
+            return {"documents": self.vector_store.ArtifactStore.MLoadDocuments(state["file_hash"])}
+            
+        except Exception as e:
+            # A missing or unreadable artifact just means the PDF gets parsed
+            logger.warning(f"Could not read text artifact for {state['file_hash']}: {e}")
+            return {"documents": None}
+
+    def join_stages(self, state: PDFProcessingState) -> PDFProcessingState:
+        """Node: Combine the results of the vector check and artifact lookup"""
+        if state.get("vector_check_error"):
+            state["error_message"] = state["vector_check_error"]
             state["processing_status"] = "vector_check_error"
+        elif state.get("vectors_exist"):
+            state["processing_status"] = "vectors_exist"
+            state["success"] = True
+        else:
+            state["processing_status"] = "vectors_not_found"
+        # The pages are only needed by process_pdf; don't carry them through the rest of the run
+        if state["processing_status"] != "vectors_not_found":
+            state["documents"] = None
+        return state
+
+    def extract_text(self, state: PDFProcessingState) -> PDFProcessingState:
+        """Node: Parse the PDF when there are no vectors and no cached text"""
+        try:
+            logger.info(f"Extracting text from PDF: {state['pdf_path']}")
+            state["documents"] = self.run_store(state).MLoadDocuments(state["pdf_path"], state["file_hash"])
+            state["processing_status"] = "text_extracted"
+            return state
+            
+        except Exception as e:
+            logger.error(f"Error extracting text from PDF: {e}")
+            state["extract_error"] = f"PDF processing error: {str(e)}"
+            state["error_message"] = state["extract_error"]
+            state["processing_status"] = "pdf_processing_error"
+            state["success"] = False
             return state
 
     def process_pdf_to_vectors(self, state: PDFProcessingState) -> PDFProcessingState:
-        """Node: Process PDF file and store in vector database"""
+        """Node: Chunk the extracted pages and store them in the vector database"""
         try:
             pdf_path = state["pdf_path"]
             logger.info(f"Processing PDF to vectors: {pdf_path}")
             
-            # Process the PDF and store in vector database
-            result = self.vector_store.MStoreFileInVectorDB(pdf_path)
+            # Chunk, embed and store the pages from the artifact or the PDF parse
+            stored = self.run_store(state).MStoreDocuments(state["documents"], state["file_hash"])
+            state["documents"] = None
             
-            if result:
+            if stored:
                 state["processing_status"] = "pdf_processed"
                 state["success"] = True
                 logger.info(f"PDF processed successfully: {pdf_path}")
@@ -170,6 +228,14 @@ class PDFProcessingGraph:
         if state["processing_status"] == "vectors_exist":
             return "finalize"
         elif state["processing_status"] == "vectors_not_found":
+            # Cached text skips the parse
+            return "process" if state.get("documents") is not None else "extract"
+        else:
+            return "finalize"
+
+    def should_continue_after_extract(self, state: PDFProcessingState) -> str:
+        """Conditional edge: Store the pages unless the parse failed"""
+        if state["processing_status"] == "text_extracted":
             return "process"
         else:
             return "finalize"
@@ -181,23 +247,27 @@ class PDFProcessingGraph:
         else:
             return "finalize"
 
-    def should_continue_after_hash(self, state: PDFProcessingState) -> str:
-        """Conditional edge: Determine next step after hash generation"""
+    def should_continue_after_hash(self, state: PDFProcessingState):
+        """Conditional edge: Fan out to the vector check and artifact lookup after hash generation"""
         if state.get("file_hash"):
-            return "check_vectors"
+            return ["check_vectors", "load_artifact"]
         else:
             return "finalize"
 
     def build_graph(self) -> StateGraph:
         """Build and return the PDF processing workflow graph"""
         # Create the graph
-        workflow = StateGraph(PDFProcessingState)
+        workflow = TracedStateGraph(PDFProcessingState)
         
         # Add nodes
         workflow.add_node("validate_file", self.validate_pdf_file)
-        workflow.add_node("generate_hash", self.generate_file_hash)
-        workflow.add_node("check_vectors", self.check_existing_vectors)
-        workflow.add_node("process_pdf", self.process_pdf_to_vectors)
+        # Hashing, PDF parsing, embedding and Pinecone calls block, so under ainvoke they run on the worker pool
+        workflow.add_node("generate_hash", AsyncNode(self.generate_file_hash))
+        workflow.add_node("check_vectors", AsyncNode(self.check_existing_vectors))
+        workflow.add_node("load_artifact", AsyncNode(self.load_artifact))
+        workflow.add_node("join_stages", self.join_stages)
+        workflow.add_node("extract_text", AsyncNode(self.extract_text))
+        workflow.add_node("process_pdf", AsyncNode(self.process_pdf_to_vectors))
         workflow.add_node("finalize", self.finalize_processing)
         
         # Set entry point
@@ -218,13 +288,27 @@ class PDFProcessingGraph:
             self.should_continue_after_hash,
             {
                 "check_vectors": "check_vectors",
+                "load_artifact": "load_artifact",
                 "finalize": "finalize"
             }
         )
         
+        # Wait for both branches before deciding whether to store
+        workflow.add_edge(["check_vectors", "load_artifact"], "join_stages")
+        
         workflow.add_conditional_edges(
-            "check_vectors",
+            "join_stages",
             self.should_process_pdf,
+            {
+                "extract": "extract_text",
+                "process": "process_pdf",
+                "finalize": "finalize"
+            }
+        )
+        
+        workflow.add_conditional_edges(
+            "extract_text",
+            self.should_continue_after_extract,
             {
                 "process": "process_pdf",
                 "finalize": "finalize"
@@ -240,47 +324,67 @@ class PDFProcessingGraph:
     def process_pdf(self, pdf_path: str) -> Dict[str, Any]:
         """Main method to process a PDF file using the graph"""
         try:
-            # Build the graph
-            graph = self.build_graph()
-            
-            # Initial state
-            initial_state = PDFProcessingState(
-                pdf_path=pdf_path,
-                file_exists=False,
-                file_hash=None,
-                processing_status="initialized",
-                error_message=None,
-                namespace=None,
-                success=False
-            )
+            initial_state = self.initial_state(pdf_path)
             
             # Execute the graph
             logger.info(f"Starting PDF processing workflow for: {pdf_path}")
-            final_state = graph.invoke(initial_state)
+            final_state = self.graph.invoke(initial_state)
+            return self.final_result(final_state)
             
-            # Prepare result
-            result = {
-                "pdf_path": final_state["pdf_path"],
-                "namespace": final_state.get("namespace"),
-                "file_hash": final_state.get("file_hash"),
-                "success": final_state.get("success", False),
-                "status": final_state["processing_status"],
-                "error_message": final_state.get("error_message")
-            }
-            
-            logger.info(f"PDF processing workflow completed. Status: {result['status']}")
-            return result
+        except Exception as e:
+            return self.workflow_error(e, pdf_path)
+
+    async def aprocess_pdf(self, pdf_path: str) -> Dict[str, Any]:
+        """Async variant of process_pdf for callers running on an event loop"""
+        try:
+            initial_state = self.initial_state(pdf_path)
+            logger.info(f"Starting async PDF processing workflow for: {pdf_path}")
+            final_state = await self.graph.ainvoke(initial_state)
+            return self.final_result(final_state)
             
         except Exception as e:
-            logger.error(f"Error in PDF processing workflow: {e}")
-            return {
-                "pdf_path": pdf_path,
-                "namespace": None,
-                "file_hash": None,
-                "success": False,
-                "status": "workflow_error",
-                "error_message": str(e)
-            }
+            return self.workflow_error(e, pdf_path)
+
+    def initial_state(self, pdf_path: str) -> PDFProcessingState:
+        return PDFProcessingState(
+            pdf_path=pdf_path,
+            file_exists=False,
+            file_hash=None,
+            processing_status="initialized",
+            error_message=None,
+            namespace=None,
+            vectors_exist=None,
+            vector_check_error=None,
+            documents=None,
+            extract_error=None,
+            ingest_report=None,
+            success=False
+        )
+
+    def final_result(self, final_state: Dict[str, Any]) -> Dict[str, Any]:
+        result = {
+            "pdf_path": final_state["pdf_path"],
+            "namespace": final_state.get("namespace"),
+            "file_hash": final_state.get("file_hash"),
+            "success": final_state.get("success", False),
+            "status": final_state["processing_status"],
+            "error_message": final_state.get("error_message"),
+            "ingest_report": final_state.get("ingest_report") or {}
+        }
+        
+        logger.info(f"PDF processing workflow completed. Status: {result['status']}")
+        return result
+
+    def workflow_error(self, e: Exception, pdf_path: str) -> Dict[str, Any]:
+        logger.error(f"Error in PDF processing workflow: {e}")
+        return {
+            "pdf_path": pdf_path,
+            "namespace": None,
+            "file_hash": None,
+            "success": False,
+            "status": "workflow_error",
+            "error_message": str(e)
+        }
 
 def main():
     """Test the PDF processing graph"""
@@ -0,0 +1,275 @@
+from scripts.helper.logConfig import get_logger
+from abc import ABC, abstractmethod
+import numpy as np
+import threading
+import os
+
+logger = get_logger("QuantizedIndex")
+
+# Rows scored per block, so decoding never materialises a float32 copy of the whole index
+SCORE_BLOCK_ROWS = 8192
+
+
+def NormalizeRows(Matrix) -> np.ndarray:
+    """Return the rows of Matrix scaled to unit length as a contiguous float32 array."""
+    matrix = np.asarray(Matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.ascontiguousarray(matrix / np.where(norms == 0, 1, norms))
+
+
+def TopK(Scores: np.ndarray, K: int) -> np.ndarray:
+    """Return the indexes of the K highest scores, best first."""
+    k = min(K, len(Scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-Scores, k - 1)[:k]
+    return top[np.argsort(-Scores[top])]
+
+
+class CExactIndex:
+    """Exact cosine search over a float32 matrix; the baseline for the quantized indexes."""
+
+    Kind = "exact"
+
+    def __init__(self, Ids: list, Matrix):
+        self.Ids = Ids
+        self.Matrix = NormalizeRows(Matrix)
+
+    @property
+    def nbytes(self) -> int:
+        return self.Matrix.nbytes
+
+    def MScores(self, Query: np.ndarray) -> np.ndarray:
+        return self.Matrix @ Query
+
+    def MVectors(self, Rows: np.ndarray) -> np.ndarray:
+        """Return the (normalised) vectors stored at the given rows."""
+        return self.Matrix[Rows]
+
+    def MResults(self, Rows: np.ndarray, Scores: np.ndarray, IncludeValues: bool) -> list:
+        if not IncludeValues:
+            return [(self.Ids[row], float(score)) for row, score in zip(Rows, Scores)]
+        vectors = self.MVectors(Rows)
+        return [(self.Ids[row], float(score), vector) for row, score, vector in zip(Rows, Scores, vectors)]
+
+    def MSearch(self, Vector, K: int, IncludeValues: bool = False) -> list:
+        """Return [(id, cosine score), ...] for the K nearest vectors.
+
+        With IncludeValues each tuple also carries the stored vector, e.g. for MMR.
+        """
+        query = NormalizeRows(Vector)
+        scores = self.MScores(query)
+        top = TopK(scores, K)
+        return self.MResults(top, scores[top], IncludeValues)
+
+    def MRelease(self):
+        pass
+
+
+class CQuantizedIndex(CExactIndex, ABC):
+    """Base for compressed indexes: approximate scores from codes, optional exact re-rank.
+
+    With `RerankPath` the normalised float32 vectors are written to disk and
+    memory-mapped; the top K * RerankFactor approximate candidates are then
+    re-scored exactly, touching only those rows. The path must not be shared
+    with another live index.
+
+    MRelease can run while searches are still reading the mapped vectors (the
+    replica cache evicts outside its search path), so searches register as
+    readers and the file is unmapped and deleted when the last one finishes;
+    Windows refuses to delete a file that is still mapped.
+    """
+
+    def __init__(self, Ids: list, Matrix, RerankPath: str = None, RerankFactor: int = 4):
+        self.Ids = Ids
+        self.RerankFactor = RerankFactor
+        self.RerankPath = RerankPath
+        matrix = NormalizeRows(Matrix)
+        self.MFit(matrix)
+        self.Rerank = None
+        self._readers = 0
+        self._released = False
+        self._rerank_lock = threading.Lock()
+        if RerankPath:
+            os.makedirs(os.path.dirname(RerankPath) or ".", exist_ok=True)
+            np.save(RerankPath, matrix)
+            self.Rerank = np.load(RerankPath, mmap_mode="r")
+
+    @abstractmethod
+    def MFit(self, Matrix: np.ndarray):
+        """Learn the codes (and any codebooks) for the normalised matrix."""
+
+    def MPrepareQuery(self, Query: np.ndarray):
+        """Per-query state shared by every block, computed once in MScores."""
+        return Query
+
+    @abstractmethod
+    def MBlockScores(self, Prepared, Start: int, End: int) -> np.ndarray:
+        """Approximate scores of rows Start:End for a query from MPrepareQuery."""
+
+    def MScores(self, Query: np.ndarray) -> np.ndarray:
+        prepared = self.MPrepareQuery(Query)
+        return np.concatenate([
+            self.MBlockScores(prepared, start, min(start + SCORE_BLOCK_ROWS, len(self.Ids)))
+            for start in range(0, len(self.Ids), SCORE_BLOCK_ROWS)
+        ])
+
+    @abstractmethod
+    def MDecode(self, Rows: np.ndarray) -> np.ndarray:
+        """Reconstruct the vectors at the given rows from their codes."""
+
+    def MRerankRows(self, Rows: np.ndarray):
+        """Return a copy of the exact vectors at the given rows, or None without re-rank vectors.
+
+        The mapped file is only read here and never handed out, so once
+        MRelease has run and the last reader leaves, nothing references it.
+        """
+        with self._rerank_lock:
+            rerank = None if self._released else self.Rerank
+            if rerank is None:
+                return None
+            self._readers += 1
+        try:
+            return np.array(rerank[Rows])
+        finally:
+            del rerank
+            with self._rerank_lock:
+                self._readers -= 1
+                if self._released and not self._readers:
+                    self.MDeleteRerank()
+
+    def MVectors(self, Rows: np.ndarray) -> np.ndarray:
+        # Exact vectors when they are on disk, otherwise the reconstruction from the codes
+        vectors = self.MRerankRows(np.asarray(Rows))
+        return vectors if vectors is not None else self.MDecode(np.asarray(Rows))
+
+    def MSearch(self, Vector, K: int, IncludeValues: bool = False) -> list:
+        query = NormalizeRows(Vector)
+        scores = self.MScores(query)
+        shortlist = np.sort(TopK(scores, K * self.RerankFactor)) if self.Rerank is not None else None
+        vectors = self.MRerankRows(shortlist) if shortlist is not None else None
+        if vectors is None:
+            # No re-rank vectors, or they were released since the check above
+            top = TopK(scores, K)
+            return self.MResults(top, scores[top], IncludeValues)
+        exact = vectors @ query
+        top = TopK(exact, K)
+        return self.MResults(shortlist[top], exact[top], IncludeValues)
+
+    def MRelease(self):
+        """Remove the on-disk re-rank vectors, once no search is reading them."""
+        with self._rerank_lock:
+            self._released = True
+            if not self._readers:
+                self.MDeleteRerank()
+
+    def MDeleteRerank(self):
+        """Unmap and delete the re-rank file. Caller holds the re-rank lock."""
+        # Dropping the last reference closes the memory map
+        self.Rerank = None
+        if self.RerankPath and os.path.exists(self.RerankPath):
+            try:
+                os.remove(self.RerankPath)
+            except OSError as e:
+                logger.warning(f"Could not delete re-rank vectors {self.RerankPath}: {e}")
+
+
+class CInt8Index(CQuantizedIndex):
+    """Symmetric per-dimension int8 scalar quantization (4x smaller than float32)."""
+
+    Kind = "int8"
+
+    def MFit(self, Matrix: np.ndarray):
+        self.Scale = np.maximum(np.abs(Matrix).max(axis=0), 1e-12).astype(np.float32) / 127.0
+        self.Codes = np.clip(np.rint(Matrix / self.Scale), -127, 127).astype(np.int8)
+
+    @property
+    def nbytes(self) -> int:
+        return self.Codes.nbytes + self.Scale.nbytes
+
+    def MDecode(self, Rows: np.ndarray) -> np.ndarray:
+        return self.Codes[Rows].astype(np.float32) * self.Scale
+
+    def MPrepareQuery(self, Query: np.ndarray):
+        # Fold the scale into the query so the codes are used as-is
+        return Query * self.Scale
+
+    def MBlockScores(self, Prepared, Start: int, End: int) -> np.ndarray:
+        return self.Codes[Start:End].astype(np.float32) @ Prepared
+
+
+class CPQIndex(CQuantizedIndex):
+    """Product quantization: `Subspaces` sub-vectors, each coded as one of 256 k-means centroids.
+
+    Scores use asymmetric distance computation: the query is compared with the
+    centroids once, then each vector's score is a sum of table lookups.
+    """
+
+    Kind = "pq"
+
+    def __init__(self, Ids: list, Matrix, RerankPath: str = None, RerankFactor: int = 4,
+                 Subspaces: int = 48, Iterations: int = 10, TrainSamples: int = 20000, Seed: int = 0):
+        self.Subspaces = Subspaces
+        self.Iterations = Iterations
+        self.TrainSamples = TrainSamples
+        self.Seed = Seed
+        super().__init__(Ids, Matrix, RerankPath, RerankFactor)
+
+    def MFit(self, Matrix: np.ndarray):
+        n, dims = Matrix.shape
+        if dims % self.Subspaces:
+            raise ValueError(f"Vector dimension {dims} is not divisible by {self.Subspaces} PQ subspaces")
+        width = dims // self.Subspaces
+        rng = np.random.default_rng(self.Seed)
+        centroids = min(256, n)
+        train = Matrix[rng.choice(n, min(n, self.TrainSamples), replace=False)]
+        self.Codebooks = np.empty((self.Subspaces, centroids, width), dtype=np.float32)
+        self.Codes = np.empty((n, self.Subspaces), dtype=np.uint8)
+        for m in range(self.Subspaces):
+            sub = train[:, m * width:(m + 1) * width]
+            book = sub[rng.choice(len(sub), centroids, replace=False)].copy()
+            for _ in range(self.Iterations):
+                assign = self.MAssign(sub, book)
+                counts = np.bincount(assign, minlength=centroids)
+                sums = np.stack([np.bincount(assign, weights=sub[:, w], minlength=centroids) for w in range(width)], axis=1)
+                filled = counts > 0
+                book[filled] = sums[filled] / counts[filled, None]
+            self.Codebooks[m] = book
+            self.Codes[:, m] = self.MAssign(Matrix[:, m * width:(m + 1) * width], book)
+
+    @staticmethod
+    def MAssign(Vectors: np.ndarray, Book: np.ndarray) -> np.ndarray:
+        """Index of the nearest centroid for each vector (||c||^2 - 2 x.c is enough for argmin)."""
+        return np.argmin((Book * Book).sum(axis=1) - 2 * Vectors @ Book.T, axis=1)
+
+    @property
+    def nbytes(self) -> int:
+        return self.Codes.nbytes + self.Codebooks.nbytes
+
+    def MDecode(self, Rows: np.ndarray) -> np.ndarray:
+        parts = self.Codebooks[np.arange(self.Subspaces), self.Codes[Rows]]
+        return parts.reshape(len(Rows), -1)
+
+    def MPrepareQuery(self, Query: np.ndarray):
+        # The ADC lookup table: query . centroid for every subspace and centroid
+        width = self.Codebooks.shape[2]
+        return np.einsum("mcw,mw->mc", self.Codebooks, Query.reshape(self.Subspaces, width))
+
+    def MBlockScores(self, Prepared, Start: int, End: int) -> np.ndarray:
+        return Prepared[np.arange(self.Subspaces), self.Codes[Start:End]].sum(axis=1)
+
+
+VECTOR_INDEXES = {
+    "none": CExactIndex,
+    "int8": CInt8Index,
+    "pq": CPQIndex,
+}
+
+
+def BuildVectorIndex(Kind: str, Ids: list, Matrix, RerankPath: str = None, **kwargs):
+    """Build the in-memory index named by Kind ("none", "int8" or "pq")."""
+    if Kind not in VECTOR_INDEXES:
+        raise ValueError(f"Unknown vector index '{Kind}'. Expected one of: {', '.join(VECTOR_INDEXES)}")
+    if Kind == "none":
+        return CExactIndex(Ids, Matrix)
+    return VECTOR_INDEXES[Kind](Ids, Matrix, RerankPath, **kwargs)
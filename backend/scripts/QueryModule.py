@@ -1,4 +1,8 @@
+import asyncio
+
+from scripts.helper.asyncPool import RunInThreadPool
 from scripts.helper.logConfig import get_logger
+from scripts.helper.rateLimit import CAsyncRateLimiter
 from scripts.Initialize import CInitialize
 from scripts.Retrival import CRetrival
 from scripts.config import load_config
@@ -219,19 +223,99 @@ class CQuery:
             logger.error(f"Error in simple enhanced query: {e}")
             return "Sorry, I encountered an error while processing your query."
 
+    def MEmbedQueries(self, queries, batch_size=None):
+        """Embed queries in batched forward passes instead of one embed_query call each."""
+        batch_size = batch_size or config.get("BatchEmbedSize", 64)
+        vectors = []
+        for start in range(0, len(queries), batch_size):
+            vectors.extend(self.retrieval.embeddings.embed_documents(queries[start:start + batch_size]))
+        return vectors
+
+    async def MAnswerOne(self, item, query_embedding, topk, query_slots, llm_slots, limiter):
+        """Retrieve and answer one batch item; failures become an "error" result instead of raising."""
+        query = item["query"]
+        result = {"index": item["index"], "id": item.get("id"), "namespace": item["namespace"], "query": query}
+        try:
+            async with query_slots:
+                retrieved_docs = await RunInThreadPool(self.retrieval.MRetrivByVector, item["namespace"], query_embedding, topk)
+            context = self.MFormatContext(retrieved_docs)
+            prompt = self.MCreatePromptTemplate().format(context=context, question=query)
+            async with llm_slots:
+                await limiter.MAcquire()
+                response = await self.llm.ainvoke(prompt)
+            answer = response.content if hasattr(response, 'content') else str(response)
+            result.update({"context": context, "answer": answer, "retrieved_docs_count": len(retrieved_docs) if retrieved_docs else 0})
+        except Exception as e:
+            logger.error(f"Error answering batch item {item['index']}: {e}")
+            result.update({
+                "context": "",
+                "answer": "Sorry, I encountered an error while processing your query.",
+                "retrieved_docs_count": 0,
+                "error": str(e)
+            })
+        return result
+
+    async def MABatchQuery(self, items, topk=5, embed_batch_size=None, query_concurrency=None, llm_concurrency=None, llm_requests_per_minute=None):
+        """
+        Answer many questions concurrently, yielding each result as soon as it completes.
+
+        items: dicts with "query" and "namespace" (optional "id"); results carry the
+        item's position as "index" so callers can restore input order. Questions are
+        embedded in batches of BatchEmbedSize on the worker pool, and each batch's
+        retrieval and LLM calls start while the next batch is being embedded.
+        Vector queries are capped at BatchQueryConcurrency, LLM calls at
+        BatchLLMConcurrency and BatchLLMRequestsPerMinute (0: unlimited).
+        """
+        embed_batch_size = embed_batch_size or config.get("BatchEmbedSize", 64)
+        query_slots = asyncio.Semaphore(query_concurrency or config.get("BatchQueryConcurrency", 16))
+        llm_slots = asyncio.Semaphore(llm_concurrency or config.get("BatchLLMConcurrency", 8))
+        limiter = CAsyncRateLimiter(config.get("BatchLLMRequestsPerMinute", 0) if llm_requests_per_minute is None else llm_requests_per_minute)
+
+        items = [dict(item, index=item.get("index", position)) for position, item in enumerate(items)]
+        pending = set()
+        try:
+            for start in range(0, len(items), embed_batch_size):
+                batch = items[start:start + embed_batch_size]
+                vectors = await RunInThreadPool(self.MEmbedQueries, [item["query"] for item in batch], embed_batch_size)
+                for item, vector in zip(batch, vectors):
+                    pending.add(asyncio.ensure_future(self.MAnswerOne(item, vector, topk, query_slots, llm_slots, limiter)))
+                # Hand back whatever finished while this batch was embedding
+                done = {task for task in pending if task.done()}
+                pending -= done
+                for task in done:
+                    yield task.result()
+            for task in asyncio.as_completed(pending):
+                yield await task
+            logger.info(f"Processed {len(items)} queries in batch.")
+        finally:
+            for task in pending:
+                task.cancel()
+
     def MBatchQuery(self, namespace, queries, topk=5):
-        """Process multiple queries in batch."""
+        """Process multiple queries in batch; results are returned in input order.
+
+        Runs its own event loop, so it cannot be called from async code; use
+        MABatchQuery there. A failed question comes back as an "error" result.
+        """
         try:
-            results = []
-            for query in queries:
-                result = self.MQueryWithContext(namespace, query, topk)
-                results.append(result)
-            
-            logger.info(f"Processed {len(queries)} queries in batch.")
-            return results
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError("MBatchQuery cannot run inside an event loop; use 'async for result in MABatchQuery(...)' instead.")
+
+        async def collect():
+            return [result async for result in self.MABatchQuery([{"query": query, "namespace": namespace} for query in queries], topk)]
+
+        try:
+            results = sorted(asyncio.run(collect()), key=lambda result: result["index"])
         except Exception as e:
             logger.error(f"Error in batch query processing: {e}")
-            return []
+            raise
+        for result in results:
+            for key in ("index", "id", "namespace"):
+                result.pop(key, None)
+        return results
 
 def main():
     """Test the Query module."""
@@ -1,6 +1,9 @@
 from typing import Dict, Any, Optional, List, TypedDict
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
 from scripts.helper.logConfig import get_logger
+from scripts.helper.asyncPool import AsyncNode
+from scripts.helper.tracing import TracedStateGraph
 from History import CHistory
 from QueryModule import CQuery
 from VectorStore import CVectorStore
@@ -14,8 +17,10 @@ class QueryProcessingState(TypedDict):
     namespace: str
     user_query: str
     topk: int
+    use_mmr: Optional[bool]
     chat_history: Optional[List]
     formatted_history: Optional[str]
+    history_error: Optional[str]
     retrieved_docs: Optional[List]
     context: Optional[str]
     enhanced_prompt: Optional[str]
@@ -33,6 +38,7 @@ class QueryProcessingGraph:
             self.query_module = CQuery()
             self.vector_store = CVectorStore()
             self.config = load_config()
+            self.graph = self.build_graph()
             logger.info("Query Processing Graph initialized successfully.")
         except Exception as e:
             logger.error(f"Error initializing Query Processing Graph: {e}")
@@ -77,7 +83,10 @@ class QueryProcessingGraph:
             state["success"] = False
             return state
 
-    def retrieve_chat_history(self, state: QueryProcessingState) -> QueryProcessingState:
+    # retrieve_history and retrieve_context run as parallel branches, so each
+    # returns only its own keys; two branches writing the same key would conflict.
+
+    def retrieve_chat_history(self, state: QueryProcessingState) -> Dict[str, Any]:
         """Node: Retrieve and format chat history"""
         try:
             chat_id = state["chat_id"]
@@ -85,25 +94,22 @@ class QueryProcessingGraph:
             
             # Get last 3 conversations from history
             chat_history = self.history.MGetLastNChats(chat_id, n=3)
-            state["chat_history"] = chat_history
             
             # Format chat history for context
             formatted_history = self.format_chat_history(chat_history)
-            state["formatted_history"] = formatted_history
             
-            state["processing_status"] = "history_retrieved"
             logger.info(f"Chat history retrieved and formatted for chat_id: {chat_id}")
-            return state
+            return {"chat_history": chat_history, "formatted_history": formatted_history}
             
         except Exception as e:
             logger.error(f"Error retrieving chat history: {e}")
-            state["error_message"] = f"Chat history retrieval error: {str(e)}"
-            state["processing_status"] = "history_retrieval_error"
             # Continue processing even if history retrieval fails
-            state["formatted_history"] = "No previous conversation history available."
-            return state
+            return {
+                "history_error": f"Chat history retrieval error: {str(e)}",
+                "formatted_history": "No previous conversation history available."
+            }
 
-    def retrieve_relevant_context(self, state: QueryProcessingState) -> QueryProcessingState:
+    def retrieve_relevant_context(self, state: QueryProcessingState) -> Dict[str, Any]:
         """Node: Retrieve relevant documents from vector store"""
         try:
             namespace = state["namespace"]
@@ -112,24 +118,62 @@ class QueryProcessingGraph:
             
             logger.info(f"Retrieving relevant context for query: '{user_query[:50]}...'")
             
-            # Retrieve top-k relevant documents
-            retrieved_docs = self.query_module.retrieval.MRetrivTopk(namespace, user_query, topk)
-            state["retrieved_docs"] = retrieved_docs
+            # Retrieve top-k relevant documents. Not MRetrivTopk: it turns an embedding or
+            # Pinecone failure into [], which would be answered as "nothing found"
+            retrieval = self.query_module.retrieval
+            query_embedding = retrieval.embeddings.embed_query(user_query)
+            retrieved_docs = retrieval.MRetrivByVector(namespace, query_embedding, topk, state.get("use_mmr"))
             
             # Format the context from retrieved documents
             context = self.query_module.MFormatContext(retrieved_docs)
-            state["context"] = context
             
-            state["processing_status"] = "context_retrieved"
             logger.info(f"Retrieved {len(retrieved_docs) if retrieved_docs else 0} relevant documents")
-            return state
+            return {"retrieved_docs": retrieved_docs, "context": context, "processing_status": "context_retrieved"}
             
         except Exception as e:
             logger.error(f"Error retrieving relevant context: {e}")
-            state["error_message"] = f"Context retrieval error: {str(e)}"
-            state["processing_status"] = "context_retrieval_error"
-            state["context"] = "No relevant context found."
-            return state
+            return {
+                "error_message": f"Context retrieval error: {str(e)}",
+                "processing_status": "context_retrieval_error",
+                "context": "No relevant context found."
+            }
+
+    def join_retrieval(self, state: QueryProcessingState) -> Dict[str, Any]:
+        """Node: Wait for the history and context branches"""
+        if state.get("history_error") and not state.get("error_message"):
+            return {"error_message": state["history_error"]}
+        return {}
+
+    def no_context_response(self, state: QueryProcessingState) -> QueryProcessingState:
+        """Node: Answer without the RAG prompt when no chunk cleared the retrieval score cutoff"""
+        try:
+            if self.config.get("NoContextFallback", "message") == "master":
+                logger.info("No relevant context found; answering as a general assistant")
+                response = self.query_module.llm.invoke(state["user_query"])
+                return self.apply_no_context_response(state, self.response_text(response))
+            logger.info("No relevant context found; skipping LLM generation")
+            return self.apply_no_context_response(state, self.config.get("NoContextMessage", "I couldn't find anything about that in your documents."))
+
+        except Exception as e:
+            return self.apply_response_error(state, e)
+
+    async def ano_context_response(self, state: QueryProcessingState) -> QueryProcessingState:
+        """Async variant of no_context_response"""
+        try:
+            if self.config.get("NoContextFallback", "message") == "master":
+                logger.info("No relevant context found; answering as a general assistant")
+                response = await self.query_module.llm.ainvoke(state["user_query"])
+                return self.apply_no_context_response(state, self.response_text(response))
+            logger.info("No relevant context found; skipping LLM generation")
+            return self.apply_no_context_response(state, self.config.get("NoContextMessage", "I couldn't find anything about that in your documents."))
+
+        except Exception as e:
+            return self.apply_response_error(state, e)
+
+    def apply_no_context_response(self, state: QueryProcessingState, ai_response: str) -> QueryProcessingState:
+        state["ai_response"] = ai_response
+        state["processing_status"] = "no_context"
+        return state
 
     def create_enhanced_prompt(self, state: QueryProcessingState) -> QueryProcessingState:
         """Node: Create enhanced prompt with history and context"""
@@ -181,31 +225,46 @@ Answer:
     def generate_ai_response(self, state: QueryProcessingState) -> QueryProcessingState:
         """Node: Generate AI response using LLM"""
         try:
-            enhanced_prompt = state["enhanced_prompt"]
             logger.info("Generating AI response using LLM")
             
             # Generate response using the LLM
-            response = self.query_module.llm.invoke(enhanced_prompt)
-            
-            # Handle different response types
-            if hasattr(response, 'content'):
-                ai_response = response.content
-            elif isinstance(response, str):
-                ai_response = response
-            else:
-                ai_response = str(response)
-            
-            state["ai_response"] = ai_response
-            state["processing_status"] = "response_generated"
-            logger.info(f"AI response generated successfully for query: '{state['user_query'][:50]}...'")
-            return state
+            response = self.query_module.llm.invoke(state["enhanced_prompt"])
+            return self.apply_ai_response(state, response)
             
         except Exception as e:
-            logger.error(f"Error generating AI response: {e}")
-            state["error_message"] = f"Response generation error: {str(e)}"
-            state["processing_status"] = "response_generation_error"
-            state["ai_response"] = "Sorry, I encountered an error while processing your query. Please try again."
-            return state
+            return self.apply_response_error(state, e)
+
+    async def agenerate_ai_response(self, state: QueryProcessingState) -> QueryProcessingState:
+        """Async variant of generate_ai_response; the event loop is free while Groq generates"""
+        try:
+            logger.info("Generating AI response using LLM")
+            response = await self.query_module.llm.ainvoke(state["enhanced_prompt"])
+            return self.apply_ai_response(state, response)
+            
+        except Exception as e:
+            return self.apply_response_error(state, e)
+
+    @staticmethod
+    def response_text(response) -> str:
+        # Handle different response types
+        if hasattr(response, 'content'):
+            return response.content
+        elif isinstance(response, str):
+            return response
+        return str(response)
+
+    def apply_ai_response(self, state: QueryProcessingState, response) -> QueryProcessingState:
+        state["ai_response"] = self.response_text(response)
+        state["processing_status"] = "response_generated"
+        logger.info(f"AI response generated successfully for query: '{state['user_query'][:50]}...'")
+        return state
+
+    def apply_response_error(self, state: QueryProcessingState, error: Exception) -> QueryProcessingState:
+        logger.error(f"Error generating AI response: {error}")
+        state["error_message"] = f"Response generation error: {str(error)}"
+        state["processing_status"] = "response_generation_error"
+        state["ai_response"] = "Sorry, I encountered an error while processing your query. Please try again."
+        return state
 
     def save_to_history(self, state: QueryProcessingState) -> QueryProcessingState:
         """Node: Save the conversation to chat history"""
@@ -293,14 +352,16 @@ Answer:
             return "Error retrieving chat history."
 
     def should_continue_after_validation(self, state: QueryProcessingState) -> str:
-        """Conditional edge: Determine next step after validation"""
+        """Conditional edge: Fan out to history and context retrieval after validation"""
         if state["processing_status"] == "inputs_validated":
-            return "retrieve_history"
+            return ["retrieve_history", "retrieve_context"]
         else:
             return "prepare_result"
 
     def should_continue_after_context(self, state: QueryProcessingState) -> str:
-        """Conditional edge: Determine next step after context retrieval"""
+        """Conditional edge: Determine next step once history and context are both in"""
+        if state["processing_status"] == "context_retrieved" and not state.get("retrieved_docs"):
+            return "no_context"
         if state["processing_status"] in ["context_retrieved", "context_retrieval_error"]:
             return "create_prompt"
         else:
@@ -323,15 +384,19 @@ Answer:
     def build_graph(self) -> StateGraph:
         """Build and return the query processing workflow graph"""
         # Create the graph
-        workflow = StateGraph(QueryProcessingState)
+        workflow = TracedStateGraph(QueryProcessingState)
         
         # Add nodes
         workflow.add_node("validate_inputs", self.validate_inputs)
-        workflow.add_node("retrieve_history", self.retrieve_chat_history)
-        workflow.add_node("retrieve_context", self.retrieve_relevant_context)
+        # Blocking Mongo / Pinecone / embedding nodes run on the worker pool under ainvoke;
+        # LLM nodes have native async variants
+        workflow.add_node("retrieve_history", AsyncNode(self.retrieve_chat_history))
+        workflow.add_node("retrieve_context", AsyncNode(self.retrieve_relevant_context))
+        workflow.add_node("join_retrieval", self.join_retrieval)
+        workflow.add_node("no_context", RunnableLambda(self.no_context_response, afunc=self.ano_context_response, name="no_context"))
         workflow.add_node("create_prompt", self.create_enhanced_prompt)
-        workflow.add_node("generate_response", self.generate_ai_response)
-        workflow.add_node("save_history", self.save_to_history)
+        workflow.add_node("generate_response", RunnableLambda(self.generate_ai_response, afunc=self.agenerate_ai_response, name="generate_response"))
+        workflow.add_node("save_history", AsyncNode(self.save_to_history))
         workflow.add_node("prepare_result", self.prepare_final_result)
         
         # Set entry point
@@ -343,22 +408,26 @@ Answer:
             self.should_continue_after_validation,
             {
                 "retrieve_history": "retrieve_history",
+                "retrieve_context": "retrieve_context",
                 "prepare_result": "prepare_result"
             }
         )
         
-        # Add direct edges
-        workflow.add_edge("retrieve_history", "retrieve_context")
+        # History (Mongo) and context (embedding + Pinecone) are independent; join before the prompt
+        workflow.add_edge(["retrieve_history", "retrieve_context"], "join_retrieval")
         
         workflow.add_conditional_edges(
-            "retrieve_context",
+            "join_retrieval",
             self.should_continue_after_context,
             {
                 "create_prompt": "create_prompt",
+                "no_context": "no_context",
                 "prepare_result": "prepare_result"
             }
         )
         
+        workflow.add_edge("no_context", "save_history")
+        
         workflow.add_conditional_edges(
             "create_prompt",
             self.should_continue_after_prompt,
@@ -382,59 +451,79 @@ Answer:
         
         return workflow.compile()
 
-    def process_query(self, chat_id: str, namespace: str, user_query: str, topk: int = 5) -> Dict[str, Any]:
-        """Main method to process a query using the graph"""
+    def process_query(self, chat_id: str, namespace: str, user_query: str, topk: int = 5, use_mmr: Optional[bool] = None) -> Dict[str, Any]:
+        """Main method to process a query using the graph.
+
+        use_mmr turns MMR diversification of the retrieved chunks on or off;
+        None uses MMREnabled from config.
+        """
         try:
-            # Build the graph
-            graph = self.build_graph()
-            
-            # Initial state
-            initial_state = QueryProcessingState(
-                chat_id=chat_id,
-                namespace=namespace,
-                user_query=user_query,
-                topk=topk,
-                chat_history=None,
-                formatted_history=None,
-                retrieved_docs=None,
-                context=None,
-                enhanced_prompt=None,
-                ai_response=None,
-                processing_status="initialized",
-                error_message=None,
-                success=False,
-                final_result=None
-            )
+            initial_state = self.initial_state(chat_id, namespace, user_query, topk, use_mmr)
             
             # Execute the graph
             logger.info(f"Starting query processing workflow for chat_id: {chat_id}")
-            final_state = graph.invoke(initial_state)
-            
-            # Return the final result
-            result = final_state.get("final_result", {
-                "chat_id": chat_id,
-                "namespace": namespace,
-                "user_query": user_query,
-                "ai_response": "Error processing query",
-                "status": "error",
-                "processing_status": final_state.get("processing_status", "unknown"),
-                "error_message": final_state.get("error_message", "Unknown error")
-            })
-            
-            logger.info(f"Query processing workflow completed. Status: {result.get('status')}")
-            return result
+            final_state = self.graph.invoke(initial_state)
+            return self.final_result(final_state, chat_id, namespace, user_query)
             
         except Exception as e:
-            logger.error(f"Error in query processing workflow: {e}")
-            return {
-                "chat_id": chat_id,
-                "namespace": namespace,
-                "user_query": user_query,
-                "ai_response": "I apologize, but I encountered an error processing your request. Please try again.",
-                "status": "error",
-                "processing_status": "workflow_error",
-                "error_message": str(e)
-            }
+            return self.workflow_error(e, chat_id, namespace, user_query)
+
+    async def aprocess_query(self, chat_id: str, namespace: str, user_query: str, topk: int = 5, use_mmr: Optional[bool] = None) -> Dict[str, Any]:
+        """Async variant of process_query for callers running on an event loop."""
+        try:
+            initial_state = self.initial_state(chat_id, namespace, user_query, topk, use_mmr)
+            logger.info(f"Starting async query processing workflow for chat_id: {chat_id}")
+            final_state = await self.graph.ainvoke(initial_state)
+            return self.final_result(final_state, chat_id, namespace, user_query)
+            
+        except Exception as e:
+            return self.workflow_error(e, chat_id, namespace, user_query)
+
+    def initial_state(self, chat_id: str, namespace: str, user_query: str, topk: int, use_mmr: Optional[bool]) -> QueryProcessingState:
+        return QueryProcessingState(
+            chat_id=chat_id,
+            namespace=namespace,
+            user_query=user_query,
+            topk=topk,
+            use_mmr=use_mmr,
+            chat_history=None,
+            formatted_history=None,
+            history_error=None,
+            retrieved_docs=None,
+            context=None,
+            enhanced_prompt=None,
+            ai_response=None,
+            processing_status="initialized",
+            error_message=None,
+            success=False,
+            final_result=None
+        )
+
+    def final_result(self, final_state: Dict[str, Any], chat_id: str, namespace: str, user_query: str) -> Dict[str, Any]:
+        result = final_state.get("final_result", {
+            "chat_id": chat_id,
+            "namespace": namespace,
+            "user_query": user_query,
+            "ai_response": "Error processing query",
+            "status": "error",
+            "processing_status": final_state.get("processing_status", "unknown"),
+            "error_message": final_state.get("error_message", "Unknown error")
+        })
+        
+        logger.info(f"Query processing workflow completed. Status: {result.get('status')}")
+        return result
+
+    def workflow_error(self, e: Exception, chat_id: str, namespace: str, user_query: str) -> Dict[str, Any]:
+        logger.error(f"Error in query processing workflow: {e}")
+        return {
+            "chat_id": chat_id,
+            "namespace": namespace,
+            "user_query": user_query,
+            "ai_response": "I apologize, but I encountered an error processing your request. Please try again.",
+            "status": "error",
+            "processing_status": "workflow_error",
+            "error_message": str(e)
+        }
 
 def main():
     """Test the query processing graph"""
@@ -1,93 +1,110 @@
-from langgraph.graph import StateGraph, END
+from langgraph.graph import END
 from langchain_core.runnables import RunnableLambda
 from typing import TypedDict
 from scripts.Initialize import CInitialize
+from scripts.Retrival import CRetrival
+from scripts.helper.asyncPool import RunInThreadPool
+from scripts.helper.tracing import TracedStateGraph
+import asyncio
 from scripts.config import load_config
 
 config = load_config()
+
+QA_PROMPT = """
+EVERY TIME YOU ANSWER MUST SAY "I AM A QA AGENT"
+Conversation History:
+{memory}
+
+Document Context:
+{context}
+
+Question: {question}
+Answer:"""
+
 class GraphState(TypedDict):
     question: str
+    question_embedding: list
     context: str
     memory: str
     answer: str
+    no_context: bool
 
 class CRagGraph:
-    def __init__(self, memory_manager, namespaces):
+    def __init__(self, namespaces, use_mmr=None):
+        """QA over the given namespaces.
+
+        Conversation memory is fetched and saved by the calling graph and
+        passed in as state["memory"].
+        """
         _objInit = CInitialize()
         self.embeddings = _objInit.MInitializeEmbeddings()
-        self.pinecone = _objInit.MInitializePinecone(config["MineaiIndexName"])
+        self.pinecone = _objInit.MInitializePinecone(config["MINEAI_INDEX_NAME"])
+        self.retrieval = CRetrival(self.embeddings, self.pinecone)
         self.llm = _objInit.MInitializeLLM()
-        self.memory_manager = memory_manager
         self.namespaces = namespaces if isinstance(namespaces, list) else [namespaces]
+        # None follows MMREnabled in config
+        self.use_mmr = use_mmr
     
     def MGetContextNode(self):
         def node(state: GraphState):
-            query_embedding = self.embeddings.embed_query(state["question"])
-            index = self.pinecone.Index(config["MineaiIndexName"])
+            # Reuse the embedding computed by the calling graph when there is one
+            query_embedding = state.get("question_embedding") or self.embeddings.embed_query(state["question"])
             
             # Query each namespace and combine results
             all_contexts = []
             for namespace in self.namespaces:
-                query_result = index.query(
-                    vector=query_embedding,
-                    top_k=3,  # Reduced per namespace to avoid too much context
-                    include_metadata=True,
-                    namespace=namespace
-                )
-                
-                contexts = [
-                    match["metadata"].get("text", "")
-                    for match in query_result.get("matches", [])
-                ]
+                # Reduced per namespace to avoid too much context
+                contexts = self.retrieval.MRetrivByVector(namespace, query_embedding, 3, self.use_mmr)
                 all_contexts.extend(contexts)
             
-            return {"context": "\n\n".join(all_contexts)}
-        return node
-    
-    def MGetMemoryNode(self):
-        def node(state: GraphState):
-            memory = self.memory_manager.MGetConversationContext(state["question"])
-            return {"memory": memory}
-        return node
+            # Nothing cleared the retrieval score cutoff in any namespace
+            return {"context": "\n\n".join(all_contexts), "no_context": not all_contexts}
+
+        async def anode(state: GraphState):
+            query_embedding = state.get("question_embedding") or await RunInThreadPool(self.embeddings.embed_query, state["question"])
+            # Namespaces are queried concurrently instead of one round trip after another
+            results = await asyncio.gather(*[
+                RunInThreadPool(self.retrieval.MRetrivByVector, namespace, query_embedding, 3, self.use_mmr)
+                for namespace in self.namespaces
+            ])
+            all_contexts = [context for contexts in results for context in contexts]
+            return {"context": "\n\n".join(all_contexts), "no_context": not all_contexts}
+        return RunnableLambda(node, afunc=anode, name="get_context")
     
+    def MNoContextAnswer(self):
+        """Answer used when nothing cleared the retrieval score cutoff."""
+        if config.get("NoContextFallback", "message") == "master":
+            # The agent graph answers through its master route instead
+            return ""
+        return config.get("NoContextMessage", "I couldn't find anything about that in your documents.")
+
+    def MBuildPrompt(self, state: GraphState):
+        return QA_PROMPT.format(memory=state['memory'], context=state['context'], question=state['question'])
+
     def MGenerateAnswerNode(self):
         def node(state: GraphState):
-            prompt = f"""
-EVERY TIME YOU ANSWER MUST SAY "I AM A QA AGENT"
-Conversation History:
-{state['memory']}
-
-Document Context:
-{state['context']}
+            if state.get("no_context"):
+                return {"answer": self.MNoContextAnswer()}
+            answer = self.llm.invoke(self.MBuildPrompt(state)).content
+            return {"answer": answer}
 
-Question: {state['question']}
-Answer:"""
-            answer = self.llm.invoke(prompt).content
+        async def anode(state: GraphState):
+            if state.get("no_context"):
+                return {"answer": self.MNoContextAnswer()}
+            answer = (await self.llm.ainvoke(self.MBuildPrompt(state))).content
             return {"answer": answer}
-        return node
-    
-    def MSaveMemoryNode(self):
-        def node(state: GraphState):
-            self.memory_manager.MSaveConversation(state["question"], state["answer"])
-            return {}
-        return node
+        return RunnableLambda(node, afunc=anode, name="generate_answer")
     
     def MBuildGraph(self):
-        graph = StateGraph(GraphState)
+        graph = TracedStateGraph(GraphState)
         
-        graph.add_node("load_input", RunnableLambda(lambda state: {"question": state["question"]}))
-        graph.add_node("get_context", RunnableLambda(self.MGetContextNode()))
-        graph.add_node("get_memory", RunnableLambda(self.MGetMemoryNode()))
-        graph.add_node("generate_answer", RunnableLambda(self.MGenerateAnswerNode()))
-        graph.add_node("save_memory", RunnableLambda(self.MSaveMemoryNode()))
+        graph.add_node("load_input", RunnableLambda(lambda state: {"question": state["question"], "memory": state.get("memory", "")}))
+        graph.add_node("get_context", self.MGetContextNode())
+        graph.add_node("generate_answer", self.MGenerateAnswerNode())
 
         graph.set_entry_point("load_input")
         graph.add_edge("load_input", "get_context")
-        graph.add_edge("load_input", "get_memory")
-        # Merge both into generate_answer
         graph.add_edge("get_context", "generate_answer")
-        graph.add_edge("get_memory", "generate_answer")
-        graph.add_edge("generate_answer", "save_memory")
-        graph.add_edge("save_memory", END)
+        graph.add_edge("generate_answer", END)
         
         return graph.compile()
\ No newline at end of file
@@ -0,0 +1,212 @@
+from scripts.helper.logConfig import get_logger
+from scripts.config import load_config
+from scripts.QuantizedIndex import BuildVectorIndex
+from scripts.helper.metrics import CACHE_REQUESTS, MODEL_MEMORY
+from scripts.helper.tracing import Span
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+import numpy as np
+import threading
+import time
+import uuid
+import os
+
+logger = get_logger("ReplicaCache")
+
+REPLICA_POLICIES = ("lru", "lfu")
+# Pinecone caps the number of ids per fetch request
+FETCH_BATCH_SIZE = 200
+
+
+class _CReplica:
+    """Local index of one namespace plus its usage counters."""
+
+    def __init__(self, Index):
+        self.Index = Index
+        self.Hits = 0
+        self.LastUsed = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        return self.Index.nbytes
+
+
+class CReplicaCache:
+    """Read-through, in-memory copy of the vectors of the most-queried namespaces.
+
+    A namespace becomes hot after `WarmAfter` queries; its vectors are then
+    pulled from the index in the background and later queries are answered
+    locally with a matrix-vector product (cosine, matching the index metric).
+    Replicas are evicted by LRU or LFU once `MaxNamespaces` or `MaxMemoryMB`
+    is exceeded. `Quantization` ("int8" or "pq") stores compressed codes
+    instead of float32, optionally re-ranking the shortlist exactly from
+    vectors memory-mapped under `Directory`; a replica's file is deleted once
+    it is evicted and no search is still reading it. Namespaces are file
+    hashes, so their contents only change on re-indexing, which calls
+    MInvalidate.
+    Each namespace has a generation that MInvalidate bumps; a warm-up only
+    installs its copy if the generation is unchanged since it started, so a
+    fetch that overlapped re-indexing is thrown away.
+    """
+
+    def __init__(self, Index, MaxNamespaces: int = 32, MaxMemoryMB: float = 512, Policy: str = "lfu", WarmAfter: int = 2,
+                 Quantization: str = "none", Rerank: bool = True, RerankFactor: int = 4, Directory: str = "Data/ReplicaCache"):
+        if Policy not in REPLICA_POLICIES:
+            raise ValueError(f"Unknown replica cache policy '{Policy}'. Expected one of: {', '.join(REPLICA_POLICIES)}")
+        self.Index = Index
+        self.MaxNamespaces = MaxNamespaces
+        self.MaxBytes = int(MaxMemoryMB * 1024 * 1024)
+        self.Policy = Policy
+        self.WarmAfter = WarmAfter
+        self.Quantization = Quantization
+        self.Rerank = Rerank
+        self.RerankFactor = RerankFactor
+        self.Directory = Directory
+        self.Replicas: dict = {}
+        self.QueryCounts = Counter()
+        self.Generations = Counter()
+        self.Stats = Counter()
+        self._warming = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="replica-warm")
+        MODEL_MEMORY.labels(model="replica_cache").set_function(lambda: self.nbytes)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(replica.nbytes for replica in list(self.Replicas.values()))
+
+    def MSearch(self, Namespace: str, Vector, TopK: int, IncludeValues: bool = False):
+        """Return [(id, score), ...] from the local replica, or None on a miss.
+
+        With IncludeValues each tuple also carries the (normalised) vector.
+
+        A miss counts towards the namespace becoming hot and may schedule a
+        background warm-up; the caller should query the remote index.
+        """
+        with self._lock:
+            self.QueryCounts[Namespace] += 1
+            replica = self.Replicas.get(Namespace)
+            if replica is None:
+                self.Stats["misses"] += 1
+                CACHE_REQUESTS.labels(cache="replica", result="miss").inc()
+                if self.QueryCounts[Namespace] >= self.WarmAfter and Namespace not in self._warming:
+                    self._warming.add(Namespace)
+                    self._executor.submit(self.MWarm, Namespace, self.Generations[Namespace])
+                return None
+            self.Stats["hits"] += 1
+            CACHE_REQUESTS.labels(cache="replica", result="hit").inc()
+            replica.Hits += 1
+            replica.LastUsed = time.monotonic()
+        with Span("replica.search", namespace=Namespace):
+            return replica.Index.MSearch(Vector, TopK, IncludeValues)
+
+    def MFetchNamespace(self, Namespace: str):
+        """Download every vector of a namespace; returns (ids, float32 matrix)."""
+        ids, rows = [], []
+        for page in self.Index.list(namespace=Namespace):
+            for start in range(0, len(page), FETCH_BATCH_SIZE):
+                batch = page[start:start + FETCH_BATCH_SIZE]
+                vectors = self.Index.fetch(ids=batch, namespace=Namespace).vectors
+                for vector_id in batch:
+                    if vector_id in vectors:
+                        ids.append(vector_id)
+                        rows.append(vectors[vector_id].values)
+        return ids, np.asarray(rows, dtype=np.float32)
+
+    def MWarm(self, Namespace: str, Generation: int = None):
+        """Load a namespace into the cache, evicting others to stay within the limits.
+
+        `Generation` is the namespace's generation when the warm-up was
+        scheduled (default: now); the copy is discarded if it has changed.
+        """
+        if Generation is None:
+            with self._lock:
+                Generation = self.Generations[Namespace]
+        try:
+            start = time.perf_counter()
+            ids, matrix = self.MFetchNamespace(Namespace)
+            if not ids:
+                return
+            options = {}
+            if self.Quantization != "none":
+                options["RerankFactor"] = self.RerankFactor
+                if self.Rerank:
+                    # One file per build: a previous replica of the namespace may still be mapped by a search
+                    options["RerankPath"] = os.path.join(self.Directory, f"{Namespace}-{uuid.uuid4().hex[:12]}.npy")
+            replica = _CReplica(BuildVectorIndex(self.Quantization, ids, matrix, **options))
+            if replica.nbytes > self.MaxBytes:
+                logger.warning(f"Namespace {Namespace} needs {replica.nbytes} bytes, more than the replica cache limit; not caching.")
+                replica.Index.MRelease()
+                return
+            previous = None
+            with self._lock:
+                stale = self.Generations[Namespace] != Generation
+                if not stale:
+                    previous = self.Replicas.get(Namespace)
+                    self.Replicas[Namespace] = replica
+                    self.MEvict(Keep=Namespace)
+            if previous is not None:
+                previous.Index.MRelease()
+            if stale:
+                logger.info(f"Discarded replica of {Namespace}: it was re-indexed while the vectors were being fetched.")
+                self.Stats["stale_warms"] += 1
+                replica.Index.MRelease()
+                return
+            logger.info(f"Warmed replica of {Namespace}: {len(ids)} vectors, {replica.nbytes} bytes in {time.perf_counter() - start:.2f}s.")
+        except Exception as e:
+            logger.error(f"Error warming replica of {Namespace}: {e}")
+        finally:
+            with self._lock:
+                self._warming.discard(Namespace)
+
+    def MEvict(self, Keep: str = None):
+        """Drop replicas until the cache is within its limits. Caller holds the lock."""
+        while len(self.Replicas) > self.MaxNamespaces or self.nbytes > self.MaxBytes:
+            candidates = [ns for ns in self.Replicas if ns != Keep]
+            if not candidates:
+                break
+            if self.Policy == "lru":
+                victim = min(candidates, key=lambda ns: self.Replicas[ns].LastUsed)
+            else:
+                victim = min(candidates, key=lambda ns: (self.Replicas[ns].Hits, self.Replicas[ns].LastUsed))
+            self.Replicas.pop(victim).Index.MRelease()
+            self.Stats["evictions"] += 1
+            logger.info(f"Evicted replica of {victim} ({self.Policy}).")
+
+    def MInvalidate(self, Namespace: str):
+        """Forget the replica of a namespace whose vectors changed, and any warm-up still in progress."""
+        with self._lock:
+            self.Generations[Namespace] += 1
+            replica = self.Replicas.pop(Namespace, None)
+        if replica is not None:
+            replica.Index.MRelease()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def GetReplicaCache(Index=None):
+    """Return the process-wide replica cache, creating it on first use with an index.
+
+    Returns None when `ReplicaCacheEnabled` is off, or when no cache exists yet
+    and no index was given.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None and Index is not None:
+            config = load_config()
+            if not config.get("ReplicaCacheEnabled", False):
+                return None
+            _shared_cache = CReplicaCache(
+                Index,
+                MaxNamespaces=config.get("ReplicaCacheMaxNamespaces", 32),
+                MaxMemoryMB=config.get("ReplicaCacheMaxMB", 512),
+                Policy=config.get("ReplicaCachePolicy", "lfu"),
+                WarmAfter=config.get("ReplicaCacheWarmAfter", 2),
+                Quantization=config.get("ReplicaCacheQuantization", "none"),
+                Rerank=config.get("ReplicaCacheRerank", True),
+                RerankFactor=config.get("ReplicaCacheRerankFactor", 4),
+                Directory=config.get("ReplicaCacheDir", "Data/ReplicaCache")
+            )
+        return _shared_cache
@@ -1,40 +1,103 @@
 from scripts.helper.logConfig import get_logger
 from scripts.Initialize import CInitialize
 from scripts.config import load_config
+from scripts.DocStore import CDocStore
+from scripts.ReplicaCache import GetReplicaCache
+from scripts.helper.mmr import MaximalMarginalRelevance
 
 config = load_config()
 logging = get_logger("Retrival")
 class CRetrival:
     
-    def __init__(self):
-        """Initialize the retriever with embeddings and Pinecone index."""
+    def __init__(self, embeddings=None, pinecone=None):
+        """Initialize the retriever with embeddings and Pinecone index.
+
+        Callers that already hold an embedding model or index can pass them in
+        instead of having a second copy loaded.
+        """
         try:
             objInit = CInitialize()
-            self.embeddings = objInit.MInitializeEmbeddings()
-            self.pinecone = objInit.MInitializePinecone(config["MINEAI_INDEX_NAME"])
+            self.embeddings = embeddings or objInit.MInitializeEmbeddings()
+            self.pinecone = pinecone or objInit.MInitializePinecone(config["MINEAI_INDEX_NAME"])
+            self.docstore = CDocStore(config.get("DocStoreDir", "Data/DocStore"))
+            self.NeighbourWindow: int = config.get("DocStoreNeighbourWindow", 0)
+            self.replica = GetReplicaCache(self.pinecone)
+            self.MMREnabled: bool = config.get("MMREnabled", False)
+            self.MMRLambda: float = config.get("MMRLambda", 0.5)
+            self.MMRFetchK: int = config.get("MMRFetchK", 20)
+            self.ScoreFloor: float = config.get("RetrievalScoreFloor", 0.0)
+            self.RelativeCutoff: float = config.get("RetrievalRelativeCutoff", 0.0)
             logging.info("CRetrival initialized successfully.")
         except Exception as e:
             logging.error(f"Error during CRetrival initialization: {e}")
             raise
 
-    def MRetrivTopk(self,namespace, query, topk):
+    def MResolveTexts(self, matches: list) -> list:
+        """Return the chunk text of each match from the docstore, falling back to metadata["text"]."""
+        texts = self.docstore.MGet([match["id"] for match in matches], self.NeighbourWindow)
+        return [
+            text if text is not None else (match.get("metadata") or {}).get("text", "")
+            for match, text in zip(matches, texts)
+        ]
+
+    def MMatchesByVector(self, namespace, query_embedding, topk, include_values=False):
+        """Return the top-k matches ({"id", "score"[, "values"][, "metadata"]}) for an embedded query."""
+        # Hot namespaces are served from the in-memory replica; text comes from the docstore
+        if self.replica is not None and self.docstore.MHas(namespace):
+            hits = self.replica.MSearch(namespace, query_embedding, topk, include_values)
+            if hits is not None:
+                return [dict(zip(("id", "score", "values"), hit)) for hit in hits]
+        # Namespaces with a local docstore only need ids back, not ~1 KB of metadata per match
+        QueryResult = self.pinecone.query(
+            vector=query_embedding,
+            top_k=topk,
+            include_metadata=not self.docstore.MHas(namespace),
+            include_values=include_values,
+            namespace=namespace
+        )
+        matches = QueryResult.get("matches", [])
+        if not matches:
+            logging.warning(f"No matches found in namespace: '{namespace}'")
+        return matches
+
+    def MApplyScoreCutoff(self, matches: list) -> list:
+        """Drop weak matches: below RetrievalScoreFloor, or below RetrievalRelativeCutoff x the best score.
+
+        Returns an empty list when nothing clears the floor, so callers can skip generation.
+        """
+        if not matches:
+            return matches
+        best = max(match["score"] for match in matches)
+        threshold = max(self.ScoreFloor, best * self.RelativeCutoff)
+        kept = [match for match in matches if match["score"] >= threshold]
+        if len(kept) < len(matches):
+            logging.info(f"Score cutoff kept {len(kept)} of {len(matches)} matches (best {best:.3f}, threshold {threshold:.3f}).")
+        return kept
+
+    def MRetrivByVector(self, namespace, query_embedding, topk, use_mmr=None):
+        """Retrieve up to top-k chunk texts for an already embedded query.
+
+        Matches are first cut by score (see MApplyScoreCutoff), so fewer than
+        topk, or none, may come back. With MMR, MMRFetchK candidates are fetched
+        with their vectors and topk of them are picked for relevance and
+        diversity (MMRLambda).
+        """
+        if use_mmr is None:
+            use_mmr = self.MMREnabled
+        if not use_mmr:
+            matches = self.MApplyScoreCutoff(self.MMatchesByVector(namespace, query_embedding, topk))
+            return self.MResolveTexts(matches)
+        matches = self.MMatchesByVector(namespace, query_embedding, max(self.MMRFetchK, topk), include_values=True)
+        matches = self.MApplyScoreCutoff(matches)
+        selected = MaximalMarginalRelevance(query_embedding, [match["values"] for match in matches], topk, self.MMRLambda)
+        return self.MResolveTexts([matches[i] for i in selected])
+
+    def MRetrivTopk(self,namespace, query, topk, use_mmr=None):
         """Retrieve top-k results for a given query from the specified namespace."""
         
         try:
             query_embedding = self.embeddings.embed_query(query)
-            QueryResult = self.pinecone.query(
-                vector=query_embedding,
-                top_k=topk,
-                include_metadata=True,
-                namespace= namespace
-            )
-            matches = QueryResult.get("matches", [])
-            if not matches:
-                logging.warning(f"No matches found for query: '{query}' in namespace: '{namespace}'")
-            retriveTopK = [
-                match["metadata"].get("text", "")
-                for match in matches
-            ]
+            retriveTopK = self.MRetrivByVector(namespace, query_embedding, topk, use_mmr)
             logging.info(f"Retrieved {len(retriveTopK)} results for query: '{query}'")
             return retriveTopK
         except Exception as e:
@@ -0,0 +1,115 @@
+from scripts.helper.logConfig import get_logger
+from scripts.config import load_config
+from scripts.Initialize import CInitialize
+from langchain_core.documents import Document
+from botocore.exceptions import ClientError
+import zstandard
+import json
+import os
+
+logger = get_logger("TextArtifactStore")
+
+ARTIFACT_VERSION = 1
+
+
+class CTextArtifactStore:
+    """Stores the extracted per-page text of a PDF as a zstd-compressed JSON artifact keyed by file hash.
+
+    Re-chunking, re-embedding and summarization read the artifact instead of
+    downloading and re-parsing the original PDF.
+    """
+
+    def __init__(self):
+        config = load_config()
+        self.Backend: str = config.get("TextArtifactBackend", "local")
+        self.Directory: str = config.get("TextArtifactDir", "Data/Artifacts")
+        self.Prefix: str = config.get("TextArtifactPrefix", "artifacts/text/")
+        self.ZstdLevel: int = config.get("TextArtifactZstdLevel", 10)
+        if self.Backend == "r2":
+            self.BucketName = config.get("R2_BUCKET_NAME")
+            self.s3_client = CInitialize().MInitializeObjectStore()
+        elif self.Backend == "local":
+            os.makedirs(self.Directory, exist_ok=True)
+        else:
+            raise ValueError(f"Unknown TextArtifactBackend '{self.Backend}'. Expected 'local' or 'r2'.")
+
+    def MKey(self, FileHash: str) -> str:
+        """Return the artifact file name / object key for a file hash."""
+        if self.Backend == "r2":
+            return f"{self.Prefix}{FileHash}.json.zst"
+        return os.path.join(self.Directory, f"{FileHash}.json.zst")
+
+    def MSave(self, FileHash: str, Pages: list, Metadata: dict = None):
+        """Compress and store the page texts of a file."""
+        try:
+            payload = {
+                "version": ARTIFACT_VERSION,
+                "file_hash": FileHash,
+                "metadata": Metadata or {},
+                "pages": Pages,
+            }
+            data = zstandard.ZstdCompressor(level=self.ZstdLevel).compress(
+                json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            )
+            key = self.MKey(FileHash)
+            if self.Backend == "r2":
+                self.s3_client.put_object(Bucket=self.BucketName, Key=key, Body=data, ContentType="application/zstd")
+            else:
+                # Write to a temp file first so readers never see a partial artifact
+                TempPath = f"{key}.tmp"
+                with open(TempPath, "wb") as f:
+                    f.write(data)
+                os.replace(TempPath, key)
+            logger.info(f"Stored text artifact for {FileHash}: {len(Pages)} pages, {len(data)} bytes compressed.")
+        except Exception as e:
+            logger.error(f"Error storing text artifact for {FileHash}: {e}")
+            raise
+
+    def MLoad(self, FileHash: str):
+        """Return the stored artifact dict for a file hash, or None if there is none."""
+        key = self.MKey(FileHash)
+        try:
+            if self.Backend == "r2":
+                data = self.s3_client.get_object(Bucket=self.BucketName, Key=key)["Body"].read()
+            else:
+                with open(key, "rb") as f:
+                    data = f.read()
+        except FileNotFoundError:
+            return None
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            logger.error(f"Error loading text artifact for {FileHash}: {e}")
+            raise
+        artifact = json.loads(zstandard.ZstdDecompressor().decompress(data))
+        if artifact.get("version") != ARTIFACT_VERSION:
+            logger.warning(f"Ignoring text artifact for {FileHash} with version {artifact.get('version')}")
+            return None
+        logger.info(f"Loaded text artifact for {FileHash}: {len(artifact['pages'])} pages.")
+        return artifact
+
+    def MExists(self, FileHash: str) -> bool:
+        """Check whether an artifact exists for a file hash."""
+        key = self.MKey(FileHash)
+        if self.Backend == "r2":
+            try:
+                self.s3_client.head_object(Bucket=self.BucketName, Key=key)
+                return True
+            except ClientError:
+                return False
+        return os.path.exists(key)
+
+    def MLoadDocuments(self, FileHash: str):
+        """Return the artifact as one Document per page, or None if there is no artifact."""
+        artifact = self.MLoad(FileHash)
+        if artifact is None:
+            return None
+        metadata = artifact.get("metadata", {})
+        TotalPages = len(artifact["pages"])
+        return [
+            Document(
+                page_content=text,
+                metadata={**metadata, "page": page, "total_pages": TotalPages}
+            )
+            for page, text in enumerate(artifact["pages"])
+        ]
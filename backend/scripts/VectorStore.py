@@ -1,23 +1,78 @@
 from scripts.helper.logConfig import get_logger
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_pinecone import PineconeVectorStore
+from langchain_core.documents import Document
 from scripts.Initialize import CInitialize
 from scripts.config import load_config
-from pinecone import Pinecone
+from scripts.LocalProviders import IsLocalMode
+from scripts.PdfExtractor import LoadPdfPages, SelectPdfExtractor
+from scripts.TextArtifactStore import CTextArtifactStore
+from scripts.Chunker import CTokenChunker
+from scripts.BoilerplateFilter import CBoilerplateFilter
+from scripts.DocStore import CDocStore, MakeChunkId
+from scripts.ReplicaCache import GetReplicaCache
+from scripts.helper.metrics import RecordIngest
+from scripts.helper.allocationProfile import AllocationStage
+from contextlib import nullcontext
+import functools
 import hashlib
+import time
+import os
 
 logger = get_logger("VectorStore")
 
+
+def MemoryStage(Stage: str):
+    """Method decorator recording the call as an ingestion stage in IngestReport["memory"] when IngestMemoryProfile is on."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.MMemoryStage(Stage):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
 class CVectorStore:
     def __init__(self):
         config = load_config()
         # Validate config keys
-        if "MINEAI_INDEX_NAME" not in config or "PINECONE_API_KEY" not in config:
+        needs_key = not IsLocalMode(config) and config.get("CassetteMode") != "replay"
+        if "MINEAI_INDEX_NAME" not in config or ("PINECONE_API_KEY" not in config and needs_key):
             logger.error("Missing required configuration keys in config file.")
             raise KeyError("Missing required configuration keys in config file.")
         self.MINEAI_INDEX_NAME: str = config["MINEAI_INDEX_NAME"]
-        self.PINECONE_API_KEY: str = config["PINECONE_API_KEY"]
+        self.PINECONE_API_KEY: str = config.get("PINECONE_API_KEY")
+        # 0 means one worker per CPU core
+        self.PdfExtractWorkers: int = config.get("PdfExtractWorkers", 0) or os.cpu_count() or 1
+        self.PdfPagesPerShard: int = max(1, config.get("PdfPagesPerShard", 16))
+        self.PdfExtractor: str = config.get("PdfExtractor", "auto")
+        self.PdfExtractorAutoThresholdMB: float = config.get("PdfExtractorAutoThresholdMB", 10)
+        self.PdfExtractorLargeFile: str = config.get("PdfExtractorLargeFile", "pdfium")
+        self.ArtifactStore = CTextArtifactStore()
+        # Chunk with the tokenizer of the embedding model in use ("hash" in local provider mode)
+        self.Chunker = CTokenChunker(CInitialize().EmbeddingModel, config.get("ChunkStrategies", {}))
+        self.BoilerplateStripEnabled: bool = config.get("BoilerplateStripEnabled", True)
+        # Diagnostic: re-chunk the unstripped pages for an exact vectors_saved instead of an estimate
+        self.BoilerplateExactSavings: bool = config.get("BoilerplateExactSavings", False)
+        self.Boilerplate = CBoilerplateFilter(
+            EdgeLines=config.get("BoilerplateEdgeLines", 3),
+            MinPages=config.get("BoilerplateMinPages", 3),
+            MinPageRatio=config.get("BoilerplateMinPageRatio", 0.5)
+        )
+        self.DocStoreEnabled: bool = config.get("DocStoreEnabled", True)
+        self.DocStore = CDocStore(config.get("DocStoreDir", "Data/DocStore"))
+        self.EmbedBatchSize: int = config.get("EmbedBatchSize", 64)
+        self.UpsertBatchSize: int = config.get("UpsertBatchSize", 100)
+        # Per-stage statistics of the most recent ingestion, surfaced with the job result
+        self.IngestReport: dict = {}
+        # Diagnostic mode: tracemalloc peak/net allocations per stage under IngestReport["memory"]
+        self.IngestMemoryProfile: bool = config.get("IngestMemoryProfile", False)
+        self.IngestMemoryTopSites: int = config.get("IngestMemoryTopSites", 10)
+
+    def MMemoryStage(self, Stage: str):
+        """Context manager recording a stage's allocations when IngestMemoryProfile is on."""
+        if not self.IngestMemoryProfile:
+            return nullcontext()
+        return AllocationStage(Stage, self.IngestReport.setdefault("memory", []), self.IngestMemoryTopSites)
 
     def MGenerateFileHash(self, PDFPath: str) -> str:
         """Generate a hash for the PDF file."""
@@ -35,45 +90,148 @@ class CVectorStore:
             logger.error(f"Unexpected error generating file hash: {e}")
             raise
 
-    def MPDFLoader(self, PDFPath: str) -> list:
-        """Load PDF file and return documents."""
+    def MPDFLoader(self, PDFPath: str, Extractor: str = None) -> list:
+        """Load PDF file and return one document per page, in page order.
+
+        `Extractor` names a backend from PDF_EXTRACTORS; when omitted the
+        configured `PdfExtractor` is used ("auto" picks by file size). Large
+        files are split into page-range shards that are extracted in parallel
+        on a process pool sized by `PdfExtractWorkers`.
+        """
         try:
-            loader = PyPDFLoader(PDFPath)
-            documents = loader.load()
+            ExtractorName = SelectPdfExtractor(
+                PDFPath,
+                Extractor or self.PdfExtractor,
+                self.PdfExtractorAutoThresholdMB,
+                self.PdfExtractorLargeFile
+            )
+            PageTexts = LoadPdfPages(PDFPath, self.PdfExtractWorkers, self.PdfPagesPerShard, ExtractorName)
+            TotalPages = len(PageTexts)
+            documents = [
+                Document(
+                    page_content=text,
+                    metadata={"source": PDFPath, "page": page, "total_pages": TotalPages, "extractor": ExtractorName}
+                )
+                for page, text in enumerate(PageTexts)
+            ]
             logger.info(f"Loaded PDF file: {PDFPath} with {len(documents)} documents.")
             return documents
         except Exception as e:
             logger.error(f"Error loading PDF file: {PDFPath}, Error: {e}")
             raise
 
-    def MCreateChunks(self, documents: list) -> list:
-        """Create text chunks from documents."""
+    @MemoryStage("extract")
+    def MLoadDocuments(self, PDFPath: str, FileHash: str, Extractor: str = None) -> list:
+        """Return per-page documents from the cached text artifact, parsing the PDF and caching it on a miss."""
+        documents = self.ArtifactStore.MLoadDocuments(FileHash)
+        if documents is not None:
+            logger.info(f"Using cached text artifact for {FileHash}; skipping PDF parsing.")
+            return documents
+        documents = self.MPDFLoader(PDFPath, Extractor)
+        try:
+            self.ArtifactStore.MSave(
+                FileHash,
+                [doc.page_content for doc in documents],
+                {
+                    "source": os.path.basename(PDFPath),
+                    "extractor": documents[0].metadata.get("extractor") if documents else None
+                }
+            )
+        except Exception as e:
+            # A missing artifact only costs a re-parse later, so don't fail the upload over it
+            logger.warning(f"Could not cache text artifact for {FileHash}: {e}")
+        return documents
+
+    def MCreateChunks(self, documents: list, Namespace: str = None) -> list:
+        """Create token-sized text chunks from documents using the namespace's chunk settings."""
         try:
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-            chunks = text_splitter.split_documents(documents)
+            chunks = self.Chunker.MSplitDocuments(documents, Namespace)
             logger.info(f"Created {len(chunks)} chunks from documents.")
             return chunks
         except Exception as e:
             logger.error(f"Error creating chunks from documents: {e}")
             raise
 
-    def MLoadAndCreateChunks(self, PDFPath: str) -> list:
-        """Load PDF and split into chunks."""
-        documents = self.MPDFLoader(PDFPath)
-        return self.MCreateChunks(documents)
+    @MemoryStage("chunk")
+    def MPrepareChunks(self, documents: list, FileHash: str) -> list:
+        """Strip repeated headers/footers, then chunk; records the vectors saved in IngestReport."""
+        if not self.BoilerplateStripEnabled:
+            chunks = self.MCreateChunks(documents, FileHash)
+            self.IngestReport["boilerplate"] = {"enabled": False}
+            return chunks
+        stripped, report = self.Boilerplate.MStrip(documents)
+        chunks = self.MCreateChunks(stripped, FileHash)
+        if report["lines_removed"] and self.BoilerplateExactSavings:
+            # Doubles the chunking work, so only in diagnostic mode
+            report["vectors_without_stripping"] = len(self.Chunker.MSplitDocuments(documents, FileHash))
+        elif report["lines_removed"]:
+            report["vectors_without_stripping"] = len(chunks) + self.MEstimateExtraChunks(chunks, report["chars_removed"])
+            report["vectors_saved_estimated"] = True
+        else:
+            report["vectors_without_stripping"] = len(chunks)
+        report["vectors"] = len(chunks)
+        report["vectors_saved"] = report["vectors_without_stripping"] - len(chunks)
+        self.IngestReport["boilerplate"] = report
+        logger.info(f"Boilerplate stripping saved {report['vectors_saved']} of {report['vectors_without_stripping']} vectors for {FileHash}.")
+        return chunks
+
+    @staticmethod
+    def MEstimateExtraChunks(chunks: list, CharsRemoved: int) -> int:
+        """Estimate the chunks that CharsRemoved more characters would have produced.
+
+        Converts the characters to tokens at the chunks' own tokens-per-character
+        rate, then divides by the tokens each additional chunk advances
+        (chunk_size - chunk_overlap).
+        """
+        if not chunks or not CharsRemoved:
+            return 0
+        chars = sum(len(chunk.page_content) for chunk in chunks)
+        tokens = sum(chunk.metadata.get("chunk_tokens", 0) for chunk in chunks)
+        metadata = chunks[0].metadata
+        stride = max(1, metadata.get("chunk_size", 1) - metadata.get("chunk_overlap", 0))
+        removed_tokens = CharsRemoved * tokens / max(chars, 1)
+        return -(-int(round(removed_tokens)) // stride)
+
+    @staticmethod
+    def MVectorMetadata(metadata: dict) -> dict:
+        """Keep only the metadata values Pinecone accepts (no None, lists of strings only)."""
+        return {
+            key: value for key, value in metadata.items()
+            if isinstance(value, (str, int, float, bool))
+            or (isinstance(value, list) and all(isinstance(v, str) for v in value))
+        }
 
+    @MemoryStage("embed_store")
     def MStoreInPineconeDB(self, embedding, chunks: list, FileHash: str):
-        """NOTE : Store chunks in Pinecone."""
+        """NOTE : Store chunks in Pinecone.
+
+        Vector ids are "{FileHash}#{chunk_index}". With `DocStoreEnabled` the
+        chunk bodies go to the local docstore and the vectors carry only small
+        metadata fields; otherwise the body is kept under metadata["text"].
+        """
         try:
-            res = PineconeVectorStore.from_documents(
-                documents=chunks,
-                embedding=embedding,
-                index_name=self.MINEAI_INDEX_NAME,
-                pinecone_api_key=self.PINECONE_API_KEY,
-                namespace=FileHash
-            )
+            texts = [chunk.page_content for chunk in chunks]
+            if self.DocStoreEnabled:
+                # Write bodies first so every vector visible to queries can be resolved
+                self.DocStore.MWrite(FileHash, texts)
+            index = CInitialize().MInitializePinecone(self.MINEAI_INDEX_NAME)
+            for start in range(0, len(chunks), self.EmbedBatchSize):
+                batch = chunks[start:start + self.EmbedBatchSize]
+                vectors = embedding.embed_documents(texts[start:start + self.EmbedBatchSize])
+                records = []
+                for chunk, values in zip(batch, vectors):
+                    metadata = self.MVectorMetadata(chunk.metadata)
+                    if not self.DocStoreEnabled:
+                        metadata["text"] = chunk.page_content
+                    records.append({
+                        "id": MakeChunkId(FileHash, chunk.metadata["chunk_index"]),
+                        "values": values,
+                        "metadata": metadata
+                    })
+                for offset in range(0, len(records), self.UpsertBatchSize):
+                    index.upsert(vectors=records[offset:offset + self.UpsertBatchSize], namespace=FileHash)
             logger.info(f"Stored {len(chunks)} chunks in Pinecone DB under namespace {FileHash}.")
-            return res
+            return len(chunks)
         except Exception as e:
             logger.error(f"Error storing in Pinecone DB: {e}")
             raise
@@ -81,8 +239,7 @@ class CVectorStore:
     def MIsFileHashUnique(self, FileHash: str) -> bool:
         """Check if the file hash (namespace) already exists in the Pinecone index."""
         try:
-            pc = Pinecone(api_key=self.PINECONE_API_KEY)
-            index = pc.Index(self.MINEAI_INDEX_NAME)
+            index = CInitialize().MInitializePinecone(self.MINEAI_INDEX_NAME)
             # Query for any vector in the namespace (file hash)
             query_result = index.query(
                 vector=[0.0] * 384,  # dummy vector, dimension should match your embeddings
@@ -98,23 +255,64 @@ class CVectorStore:
             logger.error(f"Error checking uniqueness of file hash '{FileHash}': {e}")
             raise
 
-    def MStoreFileInVectorDB(self, PDFPath: str):
-        """Main method to store file in vector DB if not already stored."""
+    def MStoreFileInVectorDB(self, PDFPath: str, Extractor: str = None):
+        """Main method to store file in vector DB if not already stored.
+
+        Returns a (status, namespace) tuple; the namespace is the file hash.
+        """
         FileHash = self.MGenerateFileHash(PDFPath)
+        self.IngestReport = {"file_hash": FileHash}
         if not self.MIsFileHashUnique(FileHash):
             logger.info(f"File with hash {FileHash} already exists in the vector DB. Skipping store.")
-            return True
-        chunks = self.MLoadAndCreateChunks(PDFPath)
+            return True, FileHash
+        documents = self.MLoadDocuments(PDFPath, FileHash, Extractor)
+        self.MStoreDocuments(documents, FileHash)
+        return True, FileHash
+
+    def MStoreDocuments(self, documents: list, FileHash: str) -> int:
+        """Chunk, embed and store already extracted pages under the file-hash namespace."""
+        start = time.perf_counter()
+        chunks = self.MPrepareChunks(documents, FileHash)
         embedding = CInitialize().MInitializeEmbeddings()
-        result = self.MStoreInPineconeDB(embedding, chunks, FileHash)
-        return result
+        stored = self.MStoreInPineconeDB(embedding, chunks, FileHash)
+        RecordIngest(len(documents), len(chunks), stored, time.perf_counter() - start)
+        return stored
+
+    def MReindexFromArtifact(self, FileHash: str):
+        """Re-chunk and re-embed a file from its text artifact, replacing its vectors.
+
+        Used for chunking changes and embedding-model migrations; the original
+        PDF is not needed.
+        """
+        documents = self.ArtifactStore.MLoadDocuments(FileHash)
+        if documents is None:
+            logger.error(f"No text artifact found for {FileHash}; cannot re-index.")
+            raise FileNotFoundError(f"No text artifact found for {FileHash}")
+        self.IngestReport = {"file_hash": FileHash}
+        try:
+            index = CInitialize().MInitializePinecone(self.MINEAI_INDEX_NAME)
+            if not self.MIsFileHashUnique(FileHash):
+                index.delete(delete_all=True, namespace=FileHash)
+            chunks = self.MPrepareChunks(documents, FileHash)
+            embedding = CInitialize().MInitializeEmbeddings()
+            self.MStoreInPineconeDB(embedding, chunks, FileHash)
+            # Invalidate once the new vectors are in: this drops the old replica, and bumping the
+            # namespace generation discards any warm-up that fetched while vectors were replaced
+            replica = GetReplicaCache()
+            if replica is not None:
+                replica.MInvalidate(FileHash)
+            logger.info(f"Re-indexed {FileHash} from its text artifact: {len(chunks)} chunks.")
+            return True, FileHash
+        except Exception as e:
+            logger.error(f"Error re-indexing {FileHash} from its text artifact: {e}")
+            raise
 
 def main():
     PDFPath = r"Data\Docs\PEFT.pdf"
     objVectorDB = CVectorStore()
-    status = objVectorDB.MStoreFileInVectorDB(PDFPath)
+    status, namespace = objVectorDB.MStoreFileInVectorDB(PDFPath)
     if status:
-        print(f"File stored successfully in vector DB. {status}")
+        print(f"File stored successfully in vector DB. Namespace: {namespace}")
     else:
         print(f"Failed to store file in vector DB. {status}")
 
@@ -8,12 +8,6 @@ def load_config():
     load_dotenv()
     env_vars = {key: value for key, value in os.environ.items() if value}
     
-    # Validate required API keys
-    required_keys = ["GROQ_API_KEY", "PINECONE_API_KEY"]
-    missing_keys = [key for key in required_keys if key not in env_vars or not env_vars[key]]
-    if missing_keys:
-        raise ValueError(f"Missing required environment variables: {', '.join(missing_keys)}")
-    
     # Load static settings from config.json
     try:
         with open("config.json", "r") as f:
@@ -22,6 +16,18 @@ def load_config():
         raise FileNotFoundError("config.json file not found.")
     except json.JSONDecodeError:
         raise ValueError("Invalid JSON format in config.json.")
+
+    # "local" swaps Pinecone, Groq, MongoDB and R2 for offline stand-ins (scripts/LocalProviders.py)
+    static_config["ProviderMode"] = env_vars.get("PROVIDER_MODE") or static_config.get("ProviderMode", "live")
+    # "record" / "replay" captures or serves external calls through a cassette (scripts/helper/cassette.py)
+    static_config["CassetteMode"] = env_vars.get("CASSETTE_MODE") or static_config.get("CassetteMode", "off")
+    
+    # Validate required API keys; a replayed run makes no external calls
+    if static_config["ProviderMode"] != "local" and static_config["CassetteMode"] != "replay":
+        required_keys = ["GROQ_API_KEY", "PINECONE_API_KEY"]
+        missing_keys = [key for key in required_keys if key not in env_vars or not env_vars[key]]
+        if missing_keys:
+            raise ValueError(f"Missing required environment variables: {', '.join(missing_keys)}")
     
     # Combine environment variables with static settings
     return {**env_vars, **static_config}
\ No newline at end of file
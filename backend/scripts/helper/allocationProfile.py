@@ -0,0 +1,71 @@
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from .logConfig import get_logger
+
+logger = get_logger("helper.allocationProfile")
+
+# Stages currently being measured; tracemalloc is stopped again when the last one ends
+_active_stages = 0
+_started_here = False
+_lock = threading.Lock()
+# Leave out allocations made by tracemalloc's own snapshots
+_SNAPSHOT_FILTERS = (tracemalloc.Filter(False, tracemalloc.__file__),)
+
+
+@contextmanager
+def AllocationStage(Name, Report, TopN=10):
+    """
+    Measure Python allocations made while the block runs and append them to Report.
+
+    Appends {"stage", "net_kb", "peak_kb", "seconds", "top_sites"}:
+    net_kb is memory allocated in the block and still alive at its end,
+    peak_kb the highest traced memory above the starting point, and
+    top_sites the source lines holding the most of that net memory.
+    tracemalloc is process-wide, so allocations by concurrent work (other
+    requests, parallel graph branches) are counted too, and memory used by
+    worker processes or native libraries outside Python's allocator is not.
+
+    Parameters:
+    Name (str): Stage name.
+    Report (list): Receives the stage entry.
+    TopN (int): Number of allocation sites to keep.
+    """
+    global _active_stages, _started_here
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_here = True
+        _active_stages += 1
+    before = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    start_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        sites = [
+            {"site": str(stat.traceback), "size_kb": round(stat.size_diff / 1024, 1), "count": stat.count_diff}
+            for stat in after.compare_to(before, "lineno")[:TopN]
+            if stat.size_diff > 0
+        ]
+        entry = {
+            "stage": Name,
+            "net_kb": round((current - start_current) / 1024, 1),
+            "peak_kb": round(max(peak - start_current, 0) / 1024, 1),
+            "seconds": round(elapsed, 3),
+            "top_sites": sites,
+        }
+        Report.append(entry)
+        logger.info(f"Allocation stage {Name}: net {entry['net_kb']} KB, peak {entry['peak_kb']} KB")
+        del before, after
+        with _lock:
+            _active_stages -= 1
+            if _active_stages == 0 and _started_here:
+                tracemalloc.stop()
+                _started_here = False
@@ -0,0 +1,56 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.runnables import RunnableLambda
+
+from .logConfig import get_logger
+
+logger = get_logger("helper.asyncPool")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def GetThreadPool():
+    """
+    Return the process-wide thread pool for blocking work called from async code.
+
+    Sized by AsyncWorkerThreads in config.json (0 or missing: min(32, CPU count + 4)).
+    Embedding forward passes, sync Pinecone/Mongo clients and PDF work run here
+    instead of on the event loop.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from scripts.config import load_config
+            workers = load_config().get("AsyncWorkerThreads", 0) or min(32, (os.cpu_count() or 1) + 4)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="async-worker")
+            logger.info(f"Started async worker pool with {workers} threads.")
+        return _executor
+
+
+async def RunInThreadPool(func, *args, **kwargs):
+    """
+    Run a blocking callable on the worker pool and await its result.
+
+    The caller's context variables are carried over, so request-scoped state
+    (e.g. request ids) is visible inside the worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(GetThreadPool(), functools.partial(context.run, func, *args, **kwargs))
+
+
+def AsyncNode(func):
+    """
+    Wrap a blocking graph node so it can run under both invoke() and ainvoke().
+
+    invoke() calls it directly; ainvoke() runs it on the worker pool.
+    """
+    async def afunc(state):
+        return await RunInThreadPool(func, state)
+    return RunnableLambda(func, afunc=afunc, name=getattr(func, "__name__", None))
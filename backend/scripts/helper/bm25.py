@@ -0,0 +1,101 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+from .logConfig import get_logger
+
+logger = get_logger("helper.bm25")
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def Tokenize(Text):
+    """Lower-cased word tokens used for lexical scoring."""
+    return _TOKEN_PATTERN.findall(Text.lower())
+
+
+class CBM25Index:
+    """
+    Okapi BM25 over a fixed list of texts.
+
+    Postings are built once, so scoring a query only touches the documents
+    that contain its terms.
+
+    Parameters:
+    Texts (list of str): The documents, addressed by their position.
+    K1 (float): Term-frequency saturation.
+    B (float): Length normalisation.
+    """
+
+    def __init__(self, Texts, K1=1.5, B=0.75):
+        self.K1 = K1
+        self.B = B
+        self.Count = len(Texts)
+        self.Postings = {}
+        lengths = np.zeros(self.Count, dtype=np.float32)
+        for position, text in enumerate(Texts):
+            counts = Counter(Tokenize(text or ""))
+            lengths[position] = sum(counts.values())
+            for term, frequency in counts.items():
+                self.Postings.setdefault(term, []).append((position, frequency))
+        self.Lengths = lengths
+        self.AverageLength = float(lengths.mean()) if self.Count else 0.0
+        logger.debug(f"Built BM25 index over {self.Count} texts with {len(self.Postings)} terms")
+
+    def MScores(self, Query):
+        """
+        Score every document against the query.
+
+        Parameters:
+        Query (str): The query text.
+
+        Returns:
+        numpy.ndarray: One BM25 score per document, 0 where no term matches.
+        """
+        scores = np.zeros(self.Count, dtype=np.float32)
+        if not self.Count:
+            return scores
+        norm = self.K1 * (1 - self.B + self.B * self.Lengths / max(self.AverageLength, 1e-9))
+        for term in set(Tokenize(Query)):
+            postings = self.Postings.get(term)
+            if not postings:
+                continue
+            idf = np.log(1 + (self.Count - len(postings) + 0.5) / (len(postings) + 0.5))
+            positions = np.fromiter((p for p, _ in postings), dtype=np.int64, count=len(postings))
+            frequencies = np.fromiter((f for _, f in postings), dtype=np.float32, count=len(postings))
+            scores[positions] += idf * frequencies * (self.K1 + 1) / (frequencies + norm[positions])
+        return scores
+
+    def MTopK(self, Query, K):
+        """
+        Return the K best (position, score) pairs with a positive score, best first.
+        """
+        scores = self.MScores(Query)
+        if not self.Count or K <= 0:
+            return []
+        K = min(K, self.Count)
+        top = np.argpartition(-scores, K - 1)[:K]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+
+def ReciprocalRankFusion(Rankings, K=60):
+    """
+    Merge ranked lists by reciprocal rank fusion.
+
+    Each item scores sum(1 / (K + rank)) over the lists it appears in, so
+    items ranked well by several retrievers rise to the top.
+
+    Parameters:
+    Rankings (list of lists): Ranked item keys, best first.
+    K (int): Damping constant; larger values flatten the rank weights.
+
+    Returns:
+    list: Item keys ordered by fused score, best first.
+    """
+    scores = {}
+    for ranking in Rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (K + rank)
+    return sorted(scores, key=scores.get, reverse=True)
@@ -0,0 +1,565 @@
+import asyncio
+import atexit
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import numpy as np
+import zstandard
+from bson import json_util
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from .logConfig import get_logger
+
+logger = get_logger("helper.cassette")
+
+CASSETTE_VERSION = 1
+# Float lists at least this long (embeddings, vector values) are stored as packed float32
+_PACK_MIN_FLOATS = 8
+
+
+class CCassetteMiss(KeyError):
+    """A replayed run made an external call that the cassette did not record."""
+
+
+def _IsFloatList(value):
+    return (
+        isinstance(value, (list, tuple)) and len(value) >= _PACK_MIN_FLOATS
+        and all(isinstance(v, float) for v in value)
+    )
+
+
+def _Pack(value):
+    if _IsFloatList(value):
+        return {"$f32": base64.b64encode(np.asarray(value, dtype=np.float32).tobytes()).decode("ascii")}
+    if isinstance(value, dict):
+        return {key: _Pack(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_Pack(item) for item in value]
+    return value
+
+
+def _Unpack(value):
+    if isinstance(value, dict):
+        if len(value) == 1 and "$f32" in value:
+            return np.frombuffer(base64.b64decode(value["$f32"]), dtype=np.float32).tolist()
+        return {key: _Unpack(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_Unpack(item) for item in value]
+    return value
+
+
+def _Feed(hasher, value):
+    """Hash a request payload; float lists are hashed as float32 so replayed vectors match recorded ones."""
+    if _IsFloatList(value):
+        hasher.update(b"f")
+        hasher.update(np.asarray(value, dtype=np.float32).tobytes())
+    elif isinstance(value, dict):
+        hasher.update(b"{")
+        for key in sorted(value, key=str):
+            _Feed(hasher, key)
+            _Feed(hasher, value[key])
+        hasher.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        hasher.update(b"[")
+        for item in value:
+            _Feed(hasher, item)
+        hasher.update(b"]")
+    elif isinstance(value, np.ndarray):
+        _Feed(hasher, value.tolist())
+    else:
+        hasher.update(repr(value).encode("utf-8"))
+        hasher.update(b",")
+
+
+class CCassette:
+    """
+    Recorded responses of external calls, keyed by a hash of the request.
+
+    Record mode runs each call against the real client and stores its
+    response and duration; replay mode serves the stored responses without
+    touching any client. Identical requests made several times are served in
+    recorded order (the last one repeats). Writes are keyed by method only,
+    since their payloads carry ids and timestamps that change between runs.
+
+    The file is zstd-compressed JSON lines; vectors are stored as packed
+    float32 and BSON types (ObjectId, datetime) via bson.json_util.
+
+    Parameters:
+    Path (str): Cassette file.
+    Mode (str): "record" or "replay".
+    Latency (str): In replay, "original" sleeps for each call's recorded duration, "zero" does not.
+    """
+
+    def __init__(self, Path, Mode, Latency="original"):
+        if Mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{Mode}'")
+        self.Path = Path
+        self.Mode = Mode
+        self.Latency = Latency
+        self.Entries = []
+        self.Recorded = {}
+        self.Served = {}
+        self._lock = threading.Lock()
+        if Mode == "replay":
+            self.MLoad()
+        else:
+            atexit.register(self.MSave)
+
+    @property
+    def Replaying(self):
+        return self.Mode == "replay"
+
+    def MKey(self, Kind, Method, Payload):
+        hasher = hashlib.blake2b(digest_size=16)
+        _Feed(hasher, [Kind, Method, Payload])
+        return hasher.hexdigest()
+
+    def MRecord(self, Key, Kind, Method, Seconds, Response):
+        entry = {"key": Key, "kind": Kind, "method": Method, "ms": round(Seconds * 1000, 3), "response": _Pack(Response)}
+        with self._lock:
+            self.Entries.append(entry)
+
+    def MReplay(self, Key, Kind, Method):
+        """Return (seconds, response) for the next recorded response of a request."""
+        with self._lock:
+            recorded = self.Recorded.get(Key)
+            if not recorded:
+                logger.error(f"Cassette {self.Path} has no recording for {Kind}.{Method} ({Key})")
+                raise CCassetteMiss(f"No recorded {Kind}.{Method} call matches this request ({Key})")
+            position = self.Served.get(Key, 0)
+            self.Served[Key] = position + 1
+            entry = recorded[min(position, len(recorded) - 1)]
+        return entry["ms"] / 1000 if self.Latency == "original" else 0.0, entry["response"]
+
+    def MCall(self, Kind, Method, Payload, Call, Summarise=lambda result: result, Write=False):
+        """
+        Record or replay one external call.
+
+        Parameters:
+        Kind (str): Client kind ("embed", "pinecone", "llm", "mongo").
+        Method (str): Client method name.
+        Payload: Request arguments identifying the call (ignored for writes).
+        Call (callable): Runs the real call; used in record mode only.
+        Summarise (callable): Turns the real result into the JSON-friendly response to store.
+        Write (bool): Key the call by method only.
+
+        Returns:
+        In record mode, the real result; in replay mode, the stored response.
+        """
+        key = self.MKey(Kind, Method, None if Write else Payload)
+        if self.Replaying:
+            delay, response = self.MReplay(key, Kind, Method)
+            if delay:
+                time.sleep(delay)
+            return response
+        start = time.perf_counter()
+        result = Call()
+        self.MRecord(key, Kind, Method, time.perf_counter() - start, Summarise(result))
+        return result
+
+    async def MACall(self, Kind, Method, Payload, Call, Summarise=lambda result: result, Write=False):
+        """Async MCall; Call returns an awaitable and replay latency does not block the loop."""
+        key = self.MKey(Kind, Method, None if Write else Payload)
+        if self.Replaying:
+            delay, response = self.MReplay(key, Kind, Method)
+            if delay:
+                await asyncio.sleep(delay)
+            return response
+        start = time.perf_counter()
+        result = await Call()
+        self.MRecord(key, Kind, Method, time.perf_counter() - start, Summarise(result))
+        return result
+
+    def MSave(self):
+        """Write the recorded calls to the cassette file (record mode)."""
+        if self.Replaying:
+            return
+        with self._lock:
+            entries = list(self.Entries)
+        os.makedirs(os.path.dirname(self.Path) or ".", exist_ok=True)
+        header = {"version": CASSETTE_VERSION, "calls": len(entries)}
+        lines = [json.dumps(header)] + [json_util.dumps(entry) for entry in entries]
+        tmp_path = f"{self.Path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zstandard.ZstdCompressor(level=10).compress("\n".join(lines).encode("utf-8")))
+        os.replace(tmp_path, self.Path)
+        logger.info(f"Saved {len(entries)} recorded calls to cassette {self.Path}")
+
+    def MLoad(self):
+        try:
+            with open(self.Path, "rb") as f:
+                lines = zstandard.ZstdDecompressor().decompressobj().decompress(f.read()).decode("utf-8").splitlines()
+        except FileNotFoundError:
+            logger.error(f"Cassette file not found: {self.Path}")
+            raise
+        header = json.loads(lines[0])
+        if header.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version {header.get('version')} in {self.Path}")
+        for line in lines[1:]:
+            entry = json_util.loads(line)
+            entry["response"] = _Unpack(entry["response"])
+            self.Recorded.setdefault(entry["key"], []).append(entry)
+        logger.info(f"Loaded {len(lines) - 1} recorded calls from cassette {self.Path}")
+
+
+# ----- Embeddings -----
+class CCassetteEmbeddings(Embeddings):
+    """Embeddings recorded to / replayed from a cassette; Inner is None in replay."""
+
+    def __init__(self, Inner, Cassette, ModelName=None):
+        self.Inner = Inner
+        self.Cassette = Cassette
+        self.model_name = getattr(Inner, "model_name", None) or ModelName
+
+    def __getattr__(self, name):
+        if self.__dict__.get("Inner") is None:
+            raise AttributeError(name)
+        return getattr(self.Inner, name)
+
+    def embed_query(self, text):
+        return self.Cassette.MCall("embed", "query", text, lambda: self.Inner.embed_query(text), list)
+
+    def embed_documents(self, texts):
+        return self.Cassette.MCall(
+            "embed", "documents", list(texts),
+            lambda: self.Inner.embed_documents(texts),
+            lambda vectors: [list(vector) for vector in vectors]
+        )
+
+
+# ----- Pinecone -----
+def _QueryResponse(result):
+    if hasattr(result, "to_dict"):
+        result = result.to_dict()
+    return {
+        "namespace": result.get("namespace", ""),
+        "matches": [
+            {key: match[key] for key in ("id", "score", "values", "metadata") if match.get(key) not in (None, [])}
+            for match in result.get("matches", [])
+        ],
+    }
+
+
+def _FetchResponse(result):
+    return {
+        "namespace": getattr(result, "namespace", ""),
+        "vectors": {
+            vector_id: {"values": list(vector.values or []), "metadata": dict(vector.metadata or {})}
+            for vector_id, vector in result.vectors.items()
+        },
+    }
+
+
+def _WriteResponse(result):
+    if hasattr(result, "to_dict"):
+        return result.to_dict()
+    return result if isinstance(result, dict) else {}
+
+
+class CCassetteIndex:
+    """Pinecone index proxy recording to / replaying from a cassette; Inner is None in replay."""
+
+    def __init__(self, Inner, Cassette):
+        self.Inner = Inner
+        self.Cassette = Cassette
+        if Inner is None:
+            # langchain's PineconeVectorStore reads the host and key of an index it is given
+            self.config = SimpleNamespace(host="cassette", api_key="")
+
+    def __getattr__(self, name):
+        if self.__dict__.get("Inner") is None:
+            raise AttributeError(name)
+        return getattr(self.Inner, name)
+
+    def query(self, **kwargs):
+        return self.Cassette.MCall("pinecone", "query", kwargs, lambda: self.Inner.query(**kwargs), _QueryResponse)
+
+    def fetch(self, ids, **kwargs):
+        response = self.Cassette.MCall(
+            "pinecone", "fetch", {"ids": list(ids), **kwargs},
+            lambda: self.Inner.fetch(ids=ids, **kwargs), _FetchResponse
+        )
+        if not self.Cassette.Replaying:
+            return response
+        from scripts.LocalProviders import LocalFetchResponse, LocalVector
+        vectors = {
+            vector_id: LocalVector(vector_id, vector["values"], vector["metadata"])
+            for vector_id, vector in response["vectors"].items()
+        }
+        return LocalFetchResponse(vectors, response["namespace"])
+
+    def list(self, **kwargs):
+        # Recorded as one call: the full list of id pages
+        pages = self.Cassette.MCall("pinecone", "list", kwargs, lambda: [list(page) for page in self.Inner.list(**kwargs)])
+        yield from pages
+
+    def describe_index_stats(self, **kwargs):
+        return self.Cassette.MCall(
+            "pinecone", "describe_index_stats", kwargs,
+            lambda: self.Inner.describe_index_stats(**kwargs), _WriteResponse
+        )
+
+    def upsert(self, vectors, **kwargs):
+        return self.Cassette.MCall("pinecone", "upsert", None, lambda: self.Inner.upsert(vectors=vectors, **kwargs), _WriteResponse, Write=True)
+
+    def delete(self, **kwargs):
+        return self.Cassette.MCall("pinecone", "delete", None, lambda: self.Inner.delete(**kwargs), _WriteResponse, Write=True)
+
+
+# ----- LLM -----
+def _ChatResponse(result):
+    return {
+        "generations": [message_to_dict(generation.message) for generation in result.generations],
+        "llm_output": result.llm_output,
+    }
+
+
+def _ChatResult(response):
+    return ChatResult(
+        generations=[ChatGeneration(message=message) for message in messages_from_dict(response["generations"])],
+        llm_output=response["llm_output"],
+    )
+
+
+class CCassetteChatModel(BaseChatModel):
+    """Chat model recording to / replaying from a cassette; inner is None in replay.
+
+    Calls are keyed by the role and content of each prompt message and the
+    stop sequences.
+    """
+
+    inner: Any = None
+    cassette: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def MPayload(self, messages, stop):
+        return {"messages": [(message.type, message.content) for message in messages], "stop": stop}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        response = self.cassette.MCall(
+            "llm", "generate", self.MPayload(messages, stop),
+            lambda: _ChatResponse(self.inner._generate(messages, stop=stop, **kwargs))
+        )
+        return _ChatResult(response)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        async def call():
+            return _ChatResponse(await self.inner._agenerate(messages, stop=stop, **kwargs))
+        response = await self.cassette.MACall("llm", "generate", self.MPayload(messages, stop), call)
+        return _ChatResult(response)
+
+
+# ----- MongoDB -----
+MONGO_READS = ("find_one", "count_documents", "estimated_document_count", "distinct")
+MONGO_WRITES = (
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "find_one_and_update", "bulk_write",
+)
+
+
+def _MongoWriteResponse(result):
+    if result is None or isinstance(result, dict):
+        return result
+    summary = {}
+    for name in ("acknowledged", "inserted_id", "inserted_ids", "matched_count", "modified_count", "upserted_id", "deleted_count"):
+        try:
+            summary[name] = getattr(result, name)
+        except Exception:
+            # e.g. pymongo's InvalidOperation for unacknowledged writes
+            continue
+    return summary
+
+
+class CCassetteCursor:
+    """find() cursor; the sort/skip/limit chain is part of the recorded request."""
+
+    def __init__(self, Collection, Args, Kwargs):
+        self.Collection = Collection
+        self.Args = Args
+        self.Kwargs = Kwargs
+        self.Chain = []
+
+    def sort(self, *args, **kwargs):
+        self.Chain.append(("sort", args, kwargs))
+        return self
+
+    def skip(self, count):
+        self.Chain.append(("skip", (count,), {}))
+        return self
+
+    def limit(self, count):
+        self.Chain.append(("limit", (count,), {}))
+        return self
+
+    def MRun(self):
+        cursor = self.Collection.Inner.find(*self.Args, **self.Kwargs)
+        for method, args, kwargs in self.Chain:
+            cursor = getattr(cursor, method)(*args, **kwargs)
+        return list(cursor)
+
+    def __iter__(self):
+        payload = {"collection": self.Collection.Name, "args": self.Args, "kwargs": self.Kwargs, "chain": self.Chain}
+        return iter(self.Collection.Cassette.MCall("mongo", "find", payload, self.MRun))
+
+
+class CCassetteCollection:
+    def __init__(self, Inner, Cassette, Name):
+        self.Inner = Inner
+        self.Cassette = Cassette
+        self.Name = Name
+
+    def find(self, *args, **kwargs):
+        return CCassetteCursor(self, args, kwargs)
+
+    def aggregate(self, pipeline, **kwargs):
+        payload = {"collection": self.Name, "pipeline": pipeline, "kwargs": kwargs}
+        return iter(self.Cassette.MCall("mongo", "aggregate", payload, lambda: list(self.Inner.aggregate(pipeline, **kwargs))))
+
+    def __getattr__(self, name):
+        if name in MONGO_READS:
+            def read(*args, **kwargs):
+                payload = {"collection": self.Name, "args": args, "kwargs": kwargs}
+                return self.Cassette.MCall("mongo", name, payload, lambda: getattr(self.Inner, name)(*args, **kwargs))
+            return read
+        if name in MONGO_WRITES:
+            def write(*args, **kwargs):
+                response = self.Cassette.MCall(
+                    "mongo", f"{self.Name}.{name}", None,
+                    lambda: getattr(self.Inner, name)(*args, **kwargs), _MongoWriteResponse, Write=True
+                )
+                return SimpleNamespace(**response) if self.Cassette.Replaying and isinstance(response, dict) else response
+            return write
+        if self.Inner is None:
+            raise AttributeError(name)
+        return getattr(self.Inner, name)
+
+
+class CCassetteDatabase:
+    def __init__(self, Inner, Cassette, Name):
+        self.Inner = Inner
+        self.Cassette = Cassette
+        self.Name = Name
+
+    def __getitem__(self, name):
+        return CCassetteCollection(self.Inner[name] if self.Inner is not None else None, self.Cassette, f"{self.Name}.{name}")
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+class CCassetteMongoClient:
+    """pymongo client proxy recording reads to / replaying them from a cassette; Inner is None in replay."""
+
+    def __init__(self, Inner, Cassette):
+        self.Inner = Inner
+        self.Cassette = Cassette
+
+    def __getitem__(self, name):
+        return CCassetteDatabase(self.Inner[name] if self.Inner is not None else None, self.Cassette, name)
+
+
+class CCassetteAsyncCursor:
+    """Motor find()/aggregate() cursor; the chain and to_list length are part of the recorded request."""
+
+    def __init__(self, Collection, Method, Args, Kwargs):
+        self.Collection = Collection
+        self.Method = Method
+        self.Args = Args
+        self.Kwargs = Kwargs
+        self.Chain = []
+
+    def sort(self, *args, **kwargs):
+        self.Chain.append(("sort", args, kwargs))
+        return self
+
+    def skip(self, count):
+        self.Chain.append(("skip", (count,), {}))
+        return self
+
+    def limit(self, count):
+        self.Chain.append(("limit", (count,), {}))
+        return self
+
+    async def MRun(self, length):
+        cursor = getattr(self.Collection.Inner, self.Method)(*self.Args, **self.Kwargs)
+        for method, args, kwargs in self.Chain:
+            cursor = getattr(cursor, method)(*args, **kwargs)
+        return await cursor.to_list(length=length)
+
+    async def to_list(self, length=None):
+        payload = {
+            "collection": self.Collection.Name, "args": self.Args, "kwargs": self.Kwargs,
+            "chain": self.Chain, "length": length,
+        }
+        return await self.Collection.Cassette.MACall("mongo", self.Method, payload, lambda: self.MRun(length))
+
+    async def __aiter__(self):
+        for document in await self.to_list():
+            yield document
+
+
+class CCassetteAsyncCollection:
+    def __init__(self, Inner, Cassette, Name):
+        self.Inner = Inner
+        self.Cassette = Cassette
+        self.Name = Name
+
+    def find(self, *args, **kwargs):
+        return CCassetteAsyncCursor(self, "find", args, kwargs)
+
+    def aggregate(self, pipeline, **kwargs):
+        return CCassetteAsyncCursor(self, "aggregate", (pipeline,), kwargs)
+
+    def __getattr__(self, name):
+        if name in MONGO_READS:
+            async def read(*args, **kwargs):
+                payload = {"collection": self.Name, "args": args, "kwargs": kwargs}
+                return await self.Cassette.MACall("mongo", name, payload, lambda: getattr(self.Inner, name)(*args, **kwargs))
+            return read
+        if name in MONGO_WRITES:
+            async def write(*args, **kwargs):
+                response = await self.Cassette.MACall(
+                    "mongo", f"{self.Name}.{name}", None,
+                    lambda: getattr(self.Inner, name)(*args, **kwargs), _MongoWriteResponse, Write=True
+                )
+                return SimpleNamespace(**response) if self.Cassette.Replaying and isinstance(response, dict) else response
+            return write
+        if self.Inner is None:
+            raise AttributeError(name)
+        return getattr(self.Inner, name)
+
+
+class CCassetteAsyncDatabase:
+    def __init__(self, Inner, Cassette, Name):
+        self.Inner = Inner
+        self.Cassette = Cassette
+        self.Name = Name
+
+    def __getitem__(self, name):
+        return CCassetteAsyncCollection(self.Inner[name] if self.Inner is not None else None, self.Cassette, f"{self.Name}.{name}")
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+class CCassetteAsyncMongoClient:
+    """Motor client proxy recording reads to / replaying them from a cassette; Inner is None in replay."""
+
+    def __init__(self, Inner, Cassette):
+        self.Inner = Inner
+        self.Cassette = Cassette
+
+    def __getitem__(self, name):
+        return CCassetteAsyncDatabase(self.Inner[name] if self.Inner is not None else None, self.Cassette, name)
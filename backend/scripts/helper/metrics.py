@@ -0,0 +1,96 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+from .logConfig import get_logger
+from .tracing import AddSpanObserver
+
+logger = get_logger("helper.metrics")
+
+# Seconds; covers cache hits (ms) through long LLM generations and ingestions
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REQUEST_LATENCY = Histogram(
+    "mineai_http_request_duration_seconds", "HTTP request latency by route.",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    "mineai_stage_duration_seconds", "Latency of one pipeline stage call (embed, vector_query, llm, memory, history, mongo, r2).",
+    ["stage"], buckets=LATENCY_BUCKETS
+)
+NODE_LATENCY = Histogram(
+    "mineai_graph_node_duration_seconds", "Latency of LangGraph node runs.",
+    ["node"], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter("mineai_llm_tokens_total", "LLM tokens used.", ["kind"])
+CACHE_REQUESTS = Counter("mineai_cache_requests_total", "Cache lookups by cache and result (hit/miss).", ["cache", "result"])
+INGEST_IN_PROGRESS = Gauge("mineai_ingest_in_progress", "Uploads currently being ingested.")
+WORKER_QUEUE_DEPTH = Gauge("mineai_worker_queue_depth", "Blocking jobs waiting for a thread in the async worker pool.")
+INGEST_DURATION = Histogram("mineai_ingest_duration_seconds", "Time to chunk, embed and store one file.", buckets=LATENCY_BUCKETS)
+INGESTED_PAGES = Counter("mineai_ingested_pages_total", "Pages ingested.")
+INGESTED_CHUNKS = Counter("mineai_ingested_chunks_total", "Chunks ingested.")
+INGESTED_VECTORS = Counter("mineai_ingested_vectors_total", "Vectors upserted.")
+MODEL_MEMORY = Gauge("mineai_model_memory_bytes", "Memory held by loaded models and in-process indexes.", ["model"])
+
+# Span name (or "prefix.") -> stage label; spans not listed only feed the node histogram or nothing
+SPAN_STAGES = {
+    "embed.": "embed",
+    "pinecone.query": "vector_query",
+    "replica.search": "vector_query",
+    "llm": "llm",
+    "node.get_memory": "memory",
+    "node.save_memory": "memory",
+    "node.retrieve_history": "history",
+    "node.save_history": "history",
+    "mongo.": "mongo",
+    "r2.": "r2",
+}
+
+
+def StageOf(SpanName):
+    """Map a span name to its stage label, or None."""
+    for key, stage in SPAN_STAGES.items():
+        if SpanName == key or (key.endswith(".") and SpanName.startswith(key)):
+            return stage
+    return None
+
+
+def ObserveSpan(span):
+    """Span observer turning finished spans into histogram samples and token counts."""
+    seconds = span.DurationNs / 1e9
+    stage = StageOf(span.Name)
+    if stage is not None:
+        STAGE_LATENCY.labels(stage=stage).observe(seconds)
+    if span.Name.startswith("node."):
+        NODE_LATENCY.labels(node=span.Name[len("node."):]).observe(seconds)
+    if span.Name == "llm":
+        for kind in ("prompt", "completion"):
+            tokens = span.Attributes.get(f"{kind}_tokens")
+            if tokens:
+                LLM_TOKENS.labels(kind=kind).inc(tokens)
+
+
+def RecordIngest(Pages, Chunks, Vectors, Seconds):
+    """Count one finished ingestion; rate() over the counters gives pages/chunks/vectors per second."""
+    INGESTED_PAGES.inc(Pages)
+    INGESTED_CHUNKS.inc(Chunks)
+    INGESTED_VECTORS.inc(Vectors)
+    INGEST_DURATION.observe(Seconds)
+
+
+def ModelBytes(Model):
+    """
+    Estimate the memory held by a loaded model.
+
+    Parameters:
+    Model: A torch module (or an object wrapping one in `_client`), or anything with `nbytes`.
+
+    Returns:
+    int: Bytes in parameters and buffers, or 0 when unknown.
+    """
+    model = getattr(Model, "_client", Model)
+    if hasattr(model, "parameters"):
+        tensors = list(model.parameters()) + list(getattr(model, "buffers", lambda: [])())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    return int(getattr(model, "nbytes", 0) or 0)
+
+
+AddSpanObserver(ObserveSpan)
@@ -0,0 +1,47 @@
+import numpy as np
+
+from .logConfig import get_logger
+
+logger = get_logger("helper.mmr")
+
+
+def MaximalMarginalRelevance(QueryVector, CandidateVectors, K, Lambda=0.5):
+    """
+    Select K candidates balancing relevance to the query against redundancy.
+
+    Each step picks the candidate maximising
+    Lambda * sim(query, c) - (1 - Lambda) * max sim(c, already selected),
+    using cosine similarity. All similarities are computed up front as one
+    matrix product; each step is a vectorized update over the candidates.
+
+    Parameters:
+    QueryVector (sequence of float): The query embedding.
+    CandidateVectors (sequence of sequences of float): Embeddings of the candidates, best match first.
+    K (int): Number of candidates to select.
+    Lambda (float): 1.0 ranks by relevance only, 0.0 by diversity only.
+
+    Returns:
+    list[int]: Indexes into CandidateVectors, in selection order.
+    """
+    candidates = np.asarray(CandidateVectors, dtype=np.float32)
+    if candidates.size == 0 or K <= 0:
+        return []
+    query = np.asarray(QueryVector, dtype=np.float32)
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+    redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    selected = []
+    for _ in range(min(K, len(candidates))):
+        # No redundancy penalty before the first pick
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = np.where(available, Lambda * relevance - (1 - Lambda) * penalty, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    logger.debug(f"MMR selected {selected} from {len(candidates)} candidates (lambda={Lambda})")
+    return selected
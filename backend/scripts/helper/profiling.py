@@ -0,0 +1,78 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import threading
+import time
+from collections import deque
+
+from .logConfig import get_logger
+
+logger = get_logger("helper.profiling")
+
+
+class CProfileGate:
+    """
+    Decides whether a request may be profiled: admin token plus a sliding-window rate limit.
+
+    Profiling is off unless an admin token is configured.
+    """
+
+    def __init__(self, AdminToken, MaxProfiles=5, WindowSeconds=3600):
+        self.AdminToken = AdminToken or ""
+        self.MaxProfiles = MaxProfiles
+        self.WindowSeconds = WindowSeconds
+        self.Started = deque()
+        self._lock = threading.Lock()
+
+    def MAuthorized(self, Token):
+        return bool(self.AdminToken) and hmac.compare_digest(str(Token or ""), self.AdminToken)
+
+    def MAcquire(self):
+        """Reserve a profiling slot; False when the window's budget is used up."""
+        now = time.monotonic()
+        with self._lock:
+            while self.Started and now - self.Started[0] > self.WindowSeconds:
+                self.Started.popleft()
+            if len(self.Started) >= self.MaxProfiles:
+                return False
+            self.Started.append(now)
+            return True
+
+
+def ProfileCall(Directory, func, *args, **kwargs):
+    """
+    Run func under cProfile and save the profile in Directory.
+
+    Writes profile.prof (pstats format, for snakeviz / pstats) and
+    profile.txt (top functions by cumulative and by own time). Only the
+    calling thread is profiled, so callers run the whole request
+    synchronously in one worker thread.
+
+    Parameters:
+    Directory (str): Artifact directory, e.g. Data/Profiles/<request id>.
+    func (callable): The work to profile.
+
+    Returns:
+    The return value of func.
+    """
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        try:
+            os.makedirs(Directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(Directory, "profile.prof"))
+            report = io.StringIO()
+            report.write(f"Wall time: {elapsed:.3f}s\n\n")
+            stats = pstats.Stats(profiler, stream=report).strip_dirs()
+            stats.sort_stats("cumulative").print_stats(50)
+            stats.sort_stats("tottime").print_stats(30)
+            with open(os.path.join(Directory, "profile.txt"), "w", encoding="utf-8") as f:
+                f.write(report.getvalue())
+            logger.info(f"Saved profile ({elapsed:.3f}s) to {Directory}")
+        except Exception as e:
+            logger.error(f"Failed to save profile to {Directory}: {e}")
@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+from .logConfig import get_logger
+
+logger = get_logger("helper.rateLimit")
+
+
+class CAsyncRateLimiter:
+    """
+    Spaces calls evenly so no more than RatePerMinute start in any minute.
+
+    Callers await MAcquire() before each call; each gets the next free start
+    slot, so a burst of waiters is released one interval apart instead of
+    all at once.
+
+    Parameters:
+    RatePerMinute (float): Allowed call starts per minute; 0 or None disables the limit.
+    """
+
+    def __init__(self, RatePerMinute=None):
+        self.Interval = 60.0 / RatePerMinute if RatePerMinute else 0.0
+        self.NextSlot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def MAcquire(self):
+        if not self.Interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.NextSlot)
+            self.NextSlot = slot + self.Interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
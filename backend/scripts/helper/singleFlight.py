@@ -0,0 +1,43 @@
+import asyncio
+
+from .logConfig import get_logger
+
+logger = get_logger("helper.singleFlight")
+
+
+class CSingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one in-flight computation.
+
+    The first caller for a key starts the work; callers arriving before it
+    finishes await the same result (or exception). Nothing is kept once the
+    call completes, so a later call with the same key runs again. This is
+    not a cache.
+
+    The work runs as its own task, so a caller that disconnects and is
+    cancelled does not cancel it for the others waiting on it.
+    """
+
+    def __init__(self):
+        self.InFlight = {}
+
+    async def MDo(self, Key, Func, *args, **kwargs):
+        """
+        Run `await Func(*args, **kwargs)` once per key among concurrent callers.
+
+        Parameters:
+        Key (hashable): Identifies calls that may share a result.
+        Func (coroutine function): The computation to run.
+
+        Returns:
+        tuple: (result, shared); shared is True when this caller joined a call already in flight.
+        """
+        task = self.InFlight.get(Key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(Func(*args, **kwargs))
+            self.InFlight[Key] = task
+            task.add_done_callback(lambda done: self.InFlight.pop(Key) if self.InFlight.get(Key) is done else None)
+        else:
+            logger.debug(f"Joined in-flight call for {Key!r}")
+        return await asyncio.shield(task), shared
@@ -0,0 +1,444 @@
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableLambda
+from langchain_core.runnables.base import coerce_to_runnable
+from langgraph.graph import StateGraph
+from pymongo import monitoring
+
+from .logConfig import get_logger
+
+logger = get_logger("helper.tracing")
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+_export_lock = threading.Lock()
+_export_queue = None
+_export_writer = None
+_settings = None
+_span_observers = []
+
+
+def _Settings():
+    global _settings
+    if _settings is None:
+        from scripts.config import load_config
+        config = load_config()
+        _settings = {
+            "enabled": config.get("TracingEnabled", True),
+            "export_path": config.get("TraceExportPath", "Data/Traces/spans.jsonl"),
+            "export_max_mb": config.get("TraceExportMaxMB", 64),
+            "export_backups": config.get("TraceExportBackups", 3),
+            "export_queue_size": config.get("TraceExportQueueSize", 1000),
+        }
+    return _settings
+
+
+class CSpan:
+    """One timed stage of a request."""
+
+    __slots__ = ("Name", "SpanId", "ParentId", "StartNs", "DurationNs", "Attributes", "Error")
+
+    def __init__(self, Name, ParentId=None, Attributes=None):
+        self.Name = Name
+        self.SpanId = uuid.uuid4().hex[:16]
+        self.ParentId = ParentId
+        self.StartNs = time.time_ns()
+        self.DurationNs = 0
+        self.Attributes = dict(Attributes or {})
+        self.Error = None
+
+    @property
+    def DurationMs(self):
+        return self.DurationNs / 1e6
+
+
+class CTrace:
+    """All spans recorded while handling one request."""
+
+    def __init__(self, RequestId=None):
+        self.RequestId = RequestId or uuid.uuid4().hex
+        self.TraceId = uuid.uuid4().hex
+        self.StartNs = time.time_ns()
+        self.Spans = []
+
+    def MAdd(self, span):
+        # list.append is atomic, so graph branches running on worker threads can record concurrently
+        self.Spans.append(span)
+
+    def MStageTotals(self):
+        """Total milliseconds per span name, in first-seen order."""
+        totals = {}
+        for span in self.Spans:
+            totals[span.Name] = totals.get(span.Name, 0.0) + span.DurationMs
+        return totals
+
+    def MServerTiming(self, TotalMs=None):
+        """Summarise the trace as a Server-Timing header value."""
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.MStageTotals().items()]
+        if TotalMs is not None:
+            parts.append(f"total;dur={TotalMs:.1f}")
+        return ", ".join(parts)
+
+    def MToOtlp(self):
+        """Render the trace as an OTLP/JSON ExportTraceServiceRequest."""
+        spans = []
+        for span in self.Spans:
+            attributes = {"request.id": self.RequestId, **span.Attributes}
+            otlp_span = {
+                "traceId": self.TraceId,
+                "spanId": span.SpanId,
+                "name": span.Name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.StartNs),
+                "endTimeUnixNano": str(span.StartNs + span.DurationNs),
+                "attributes": [{"key": key, "value": _OtlpValue(value)} for key, value in attributes.items()],
+                "status": {"code": 2, "message": span.Error} if span.Error else {"code": 1},
+            }
+            if span.ParentId:
+                otlp_span["parentSpanId"] = span.ParentId
+            spans.append(otlp_span)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "mineai-backend"}}]},
+                "scopeSpans": [{"scope": {"name": "mineai.tracing"}, "spans": spans}],
+            }]
+        }
+
+
+def _OtlpValue(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def AddSpanObserver(Observer):
+    """
+    Call Observer(span) for every finished span, in or outside a traced request.
+
+    Used to feed aggregate metrics from the same instrumentation points.
+    """
+    _span_observers.append(Observer)
+
+
+def _FinishSpan(trace, span):
+    if trace is not None:
+        trace.MAdd(span)
+    for observer in _span_observers:
+        try:
+            observer(span)
+        except Exception as e:
+            logger.error(f"Span observer failed on {span.Name}: {e}")
+
+
+def CurrentTrace():
+    """Return the trace of the request being handled, or None outside a traced request."""
+    return _current_trace.get()
+
+
+def CurrentRequestId():
+    trace = _current_trace.get()
+    return trace.RequestId if trace else None
+
+
+@contextmanager
+def Trace(RequestId=None):
+    """
+    Collect spans for one request.
+
+    Everything run in this context, including work handed to the async
+    worker pool, records into the yielded CTrace.
+
+    Parameters:
+    RequestId (str): Id to tag the spans with; a new one is generated when missing.
+
+    Returns:
+    CTrace: The trace being collected (None when TracingEnabled is false).
+    """
+    if not _Settings()["enabled"]:
+        yield None
+        return
+    trace = CTrace(RequestId)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def Span(Name, **Attributes):
+    """
+    Time a block as a span of the current trace.
+
+    Spans nest: a span opened inside another becomes its child. Outside a
+    traced request, and with no span observers, this is a no-op.
+    """
+    trace = _current_trace.get()
+    if trace is None and not _span_observers:
+        yield None
+        return
+    parent = _current_span.get()
+    span = CSpan(Name, parent.SpanId if parent else None, Attributes)
+    token = _current_span.set(span)
+    start = time.perf_counter_ns()
+    try:
+        yield span
+    except BaseException as e:
+        span.Error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span.DurationNs = time.perf_counter_ns() - start
+        _current_span.reset(token)
+        _FinishSpan(trace, span)
+
+
+def RecordSpan(Name, DurationNs, EndNs=None, **Attributes):
+    """Record an already-timed operation (e.g. reported by a client library) as a child of the current span."""
+    trace = _current_trace.get()
+    if trace is None and not _span_observers:
+        return None
+    parent = _current_span.get()
+    span = CSpan(Name, parent.SpanId if parent else None, Attributes)
+    span.DurationNs = int(DurationNs)
+    span.StartNs = (EndNs or time.time_ns()) - span.DurationNs
+    _FinishSpan(trace, span)
+    return span
+
+
+def Traced(Name):
+    """Decorator running a sync or async function inside a span."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with Span(Name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(Name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def ExportTrace(trace, Path=None):
+    """
+    Append a finished trace to the OTLP/JSON export file (one request per line).
+
+    Parameters:
+    trace (CTrace): The finished trace.
+    Path (str): Export file; defaults to TraceExportPath in config.json (empty disables export).
+    """
+    path = Path if Path is not None else _Settings()["export_path"]
+    if not path or trace is None or not trace.Spans:
+        return
+    try:
+        line = json.dumps(trace.MToOtlp(), separators=(",", ":"))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with _export_lock:
+            _RotateExport(path)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except Exception as e:
+        logger.error(f"Failed to export trace {trace.RequestId}: {e}")
+
+
+def _RotateExport(Path):
+    """Roll the export file over to Path.1 .. Path.N once it reaches TraceExportMaxMB. Caller holds the lock."""
+    settings = _Settings()
+    max_bytes = settings["export_max_mb"] * 1024 * 1024
+    if not max_bytes or not os.path.exists(Path) or os.path.getsize(Path) < max_bytes:
+        return
+    backups = settings["export_backups"]
+    for index in range(backups - 1, 0, -1):
+        if os.path.exists(f"{Path}.{index}"):
+            os.replace(f"{Path}.{index}", f"{Path}.{index + 1}")
+    if backups > 0:
+        os.replace(Path, f"{Path}.1")
+    else:
+        os.remove(Path)
+
+
+def _ExportWriter():
+    while True:
+        trace = _export_queue.get()
+        try:
+            if trace is None:
+                return
+            ExportTrace(trace)
+        finally:
+            _export_queue.task_done()
+
+
+def QueueTraceExport(trace):
+    """
+    Hand a finished trace to the background export writer without blocking.
+
+    Traces are written by a single thread from a queue of TraceExportQueueSize;
+    when the writer falls behind, new traces are dropped rather than delaying
+    requests.
+    """
+    global _export_queue, _export_writer
+    if trace is None or not trace.Spans or not _Settings()["export_path"]:
+        return
+    if _export_writer is None:
+        with _export_lock:
+            if _export_writer is None:
+                _export_queue = queue.Queue(maxsize=_Settings()["export_queue_size"])
+                _export_writer = threading.Thread(target=_ExportWriter, name="trace-export", daemon=True)
+                _export_writer.start()
+                atexit.register(FlushTraceExports)
+    try:
+        _export_queue.put_nowait(trace)
+    except queue.Full:
+        logger.warning(f"Trace export queue full; dropped trace {trace.RequestId}")
+
+
+def FlushTraceExports():
+    """Wait until every queued trace has been written."""
+    if _export_queue is not None:
+        _export_queue.join()
+
+
+# ----- LangGraph nodes -----
+def TraceNode(Name, Action):
+    """Wrap a graph node so each run is a "node.<Name>" span, under both invoke() and ainvoke()."""
+    runnable = coerce_to_runnable(Action)
+
+    def node(state, config):
+        with Span(f"node.{Name}"):
+            return runnable.invoke(state, config)
+
+    async def anode(state, config):
+        with Span(f"node.{Name}"):
+            return await runnable.ainvoke(state, config)
+    return RunnableLambda(node, afunc=anode, name=Name)
+
+
+class TracedStateGraph(StateGraph):
+    """StateGraph whose nodes are traced; a drop-in replacement for StateGraph."""
+
+    def add_node(self, node, action=None, **kwargs):
+        if isinstance(node, str) and action is not None:
+            action = TraceNode(node, action)
+        return super().add_node(node, action, **kwargs)
+
+
+# ----- External clients -----
+class CTracedEmbeddings(Embeddings):
+    """Embeddings wrapper timing each embed call; other attributes pass through to the model."""
+
+    def __init__(self, Inner):
+        self.Inner = Inner
+
+    def __getattr__(self, name):
+        return getattr(self.Inner, name)
+
+    def embed_query(self, text):
+        with Span("embed.query"):
+            return self.Inner.embed_query(text)
+
+    def embed_documents(self, texts):
+        with Span("embed.documents", count=len(texts)):
+            return self.Inner.embed_documents(texts)
+
+
+class CTracedIndex:
+    """Pinecone index proxy timing each data-plane call."""
+
+    TRACED_METHODS = ("query", "fetch", "upsert", "delete", "describe_index_stats")
+
+    def __init__(self, Inner):
+        self.Inner = Inner
+
+    def __getattr__(self, name):
+        attribute = getattr(self.Inner, name)
+        if name not in self.TRACED_METHODS:
+            return attribute
+
+        @functools.wraps(attribute)
+        def wrapper(*args, **kwargs):
+            with Span(f"pinecone.{name}", namespace=kwargs.get("namespace", "")):
+                return attribute(*args, **kwargs)
+        return wrapper
+
+    def list(self, *args, **kwargs):
+        # A generator of id pages: each page request is recorded as it is fetched
+        pages = self.Inner.list(*args, **kwargs)
+        while True:
+            start = time.perf_counter_ns()
+            try:
+                page = next(pages)
+            except StopIteration:
+                return
+            finally:
+                RecordSpan("pinecone.list", time.perf_counter_ns() - start, namespace=kwargs.get("namespace", ""))
+            yield page
+
+
+class CLLMTraceCallback(BaseCallbackHandler):
+    """Records every chat model call as an "llm" span with its token usage."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.Runs = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        if _current_trace.get() is not None or _span_observers:
+            self.Runs[run_id] = time.perf_counter_ns()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self.Runs.pop(run_id, None)
+        if start is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        attributes = {key: usage[key] for key in ("prompt_tokens", "completion_tokens", "total_tokens") if key in usage}
+        RecordSpan("llm", time.perf_counter_ns() - start, **attributes)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        start = self.Runs.pop(run_id, None)
+        if start is not None:
+            span = RecordSpan("llm", time.perf_counter_ns() - start)
+            if span is not None:
+                span.Error = f"{type(error).__name__}: {error}"
+
+
+class CMongoTraceListener(monitoring.CommandListener):
+    """
+    pymongo command listener recording each Mongo command as a "mongo.<command>" span.
+
+    Works for motor as well: motor runs pymongo on its executor with the
+    caller's context, so the request trace is visible here.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        RecordSpan(f"mongo.{event.command_name}", event.duration_micros * 1000, database=event.database_name)
+
+    def failed(self, event):
+        span = RecordSpan(f"mongo.{event.command_name}", event.duration_micros * 1000, database=event.database_name)
+        if span is not None:
+            span.Error = str(event.failure)
@@ -1,9 +1,14 @@
+import argparse
+import asyncio
+import json
 import os
+import sys
+import time
 from typing import Optional, Dict, Any
 from scripts.helper.logConfig import get_logger
-from History import CHistory
-from QueryModule import CQuery
-from VectorStore import CVectorStore
+from scripts.History import CHistory
+from scripts.QueryModule import CQuery
+from scripts.VectorStore import CVectorStore
 from scripts.config import load_config
 
 logger = get_logger("MainChatbot")
@@ -221,8 +226,85 @@ def interactive_chat_mode(chatbot: RAGChatbot, chat_id: str, namespace: str):
         except Exception as e:
             print(f"\n❌ Unexpected error: {e}")
 
+def load_batch_questions(input_path: str, default_namespace: Optional[str]) -> list:
+    """Read batch questions from JSONL: {"query" or "question", optional "namespace", optional "id"} per line."""
+    items = []
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            query = record.get("query") or record.get("question")
+            namespace = record.get("namespace") or default_namespace
+            if not query or not namespace:
+                raise ValueError(f"{input_path}:{line_number} needs a query and a namespace (or pass --namespace)")
+            items.append({"index": len(items), "id": record.get("id"), "query": query, "namespace": namespace})
+    return items
+
+def batch_mode(argv: list):
+    """Answer a JSONL file of questions concurrently and stream results to a JSONL file as they complete.
+
+    Run from backend/ as `python -m scripts.main batch --input questions.jsonl --output answers.jsonl`.
+    """
+    parser = argparse.ArgumentParser(prog="python -m scripts.main batch", description="Answer a JSONL file of questions concurrently and stream results to a JSONL file as they complete.")
+    parser.add_argument("--input", required=True, help="JSONL file of questions")
+    parser.add_argument("--output", required=True, help="JSONL file that results are appended to as they complete")
+    parser.add_argument("--namespace", default=None, help="Namespace for lines that don't name one")
+    parser.add_argument("--topk", type=int, default=5)
+    parser.add_argument("--embed-batch-size", type=int, default=None, help="Overrides BatchEmbedSize")
+    parser.add_argument("--query-concurrency", type=int, default=None, help="Overrides BatchQueryConcurrency")
+    parser.add_argument("--llm-concurrency", type=int, default=None, help="Overrides BatchLLMConcurrency")
+    parser.add_argument("--llm-rpm", type=float, default=None, help="Overrides BatchLLMRequestsPerMinute (0: unlimited)")
+    parser.add_argument("--include-context", action="store_true", help="Keep the retrieved context in each result")
+    parser.add_argument("--resume", action="store_true", help="Skip questions already answered in --output, retry the ones that failed, and append to it")
+    args = parser.parse_args(argv)
+
+    items = load_batch_questions(args.input, args.namespace)
+    done = set()
+    if args.resume and os.path.exists(args.output):
+        with open(args.output, "r", encoding="utf-8") as f:
+            results = [json.loads(line) for line in f if line.strip()]
+        # Failed questions are asked again, so their error lines are dropped rather than left beside the retry
+        answered = [result for result in results if "error" not in result]
+        done = {result["index"] for result in answered}
+        if len(answered) < len(results):
+            with open(f"{args.output}.tmp", "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(result) + "\n" for result in answered)
+            os.replace(f"{args.output}.tmp", args.output)
+        items = [item for item in items if item["index"] not in done]
+    print(f"📋 {len(items)} questions to answer ({len(done)} already in {args.output})")
+
+    query_module = CQuery()
+
+    async def run():
+        answered = errors = 0
+        start = time.perf_counter()
+        with open(args.output, "a" if args.resume else "w", encoding="utf-8") as out:
+            async for result in query_module.MABatchQuery(
+                items,
+                args.topk,
+                embed_batch_size=args.embed_batch_size,
+                query_concurrency=args.query_concurrency,
+                llm_concurrency=args.llm_concurrency,
+                llm_requests_per_minute=args.llm_rpm,
+            ):
+                if not args.include_context:
+                    result.pop("context", None)
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                answered += 1
+                errors += "error" in result
+                if answered % 100 == 0 or answered == len(items):
+                    elapsed = time.perf_counter() - start
+                    print(f"✅ {answered}/{len(items)} answered ({errors} errors, {answered / elapsed:.1f} q/s)")
+
+    asyncio.run(run())
+
 def main():
     """Main function to run the RAG Chatbot."""
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        batch_mode(sys.argv[2:])
+        return
     try:
         print("🚀 Initializing RAG Chatbot...")
         chatbot = RAGChatbot()
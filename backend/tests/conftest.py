@@ -0,0 +1,12 @@
+import os
+import sys
+
+# config.json is read from the working directory, and scripts/ is also on the path for its bare imports
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(BACKEND_DIR)
+for path in (BACKEND_DIR, os.path.join(BACKEND_DIR, "scripts")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Tests never reach Pinecone, Groq, MongoDB or R2: use the offline stand-ins
+os.environ["PROVIDER_MODE"] = "local"
@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import pytest
+
+from scripts.QueryModule import CQuery
+from scripts.main import batch_mode
+
+NAMESPACE = "batch-test"
+DOCUMENTS = [
+    "Refunds are issued within fourteen days of the return being received.",
+    "The office in Porto opens at eight and closes at six.",
+    "Shipping to Norway takes five business days.",
+]
+
+
+@pytest.fixture(scope="module")
+def query_module():
+    module = CQuery()
+    vectors = module.retrieval.embeddings.embed_documents(DOCUMENTS)
+    module.retrieval.pinecone.upsert(
+        vectors=[
+            {"id": f"{NAMESPACE}#{i}", "values": values, "metadata": {"text": text}}
+            for i, (text, values) in enumerate(zip(DOCUMENTS, vectors))
+        ],
+        namespace=NAMESPACE,
+    )
+    return module
+
+
+def test_batch_query_answers_in_input_order(query_module):
+    queries = ["When are refunds issued?", "When does the Porto office open?", "How long does shipping to Norway take?"]
+    results = query_module.MBatchQuery(NAMESPACE, queries, topk=1)
+
+    assert [result["query"] for result in results] == queries
+    assert all("error" not in result and result["answer"].startswith("[local]") for result in results)
+    assert [result["context"] for result in results] == DOCUMENTS
+
+
+def test_batch_query_refuses_a_running_loop(query_module):
+    async def call_from_async_code():
+        return query_module.MBatchQuery(NAMESPACE, ["When are refunds issued?"])
+
+    with pytest.raises(RuntimeError, match="MABatchQuery"):
+        asyncio.run(call_from_async_code())
+
+
+def test_resume_retries_failed_questions(query_module, tmp_path):
+    questions = ["When are refunds issued?", "When does the Porto office open?", "How long does shipping to Norway take?"]
+    input_path, output_path = tmp_path / "questions.jsonl", tmp_path / "answers.jsonl"
+    input_path.write_text("".join(json.dumps({"query": question, "namespace": NAMESPACE}) + "\n" for question in questions))
+    output_path.write_text(
+        json.dumps({"index": 0, "query": questions[0], "answer": "kept"}) + "\n"
+        + json.dumps({"index": 1, "query": questions[1], "answer": "", "error": "rate limited"}) + "\n"
+    )
+
+    batch_mode(["--input", str(input_path), "--output", str(output_path), "--resume"])
+
+    results = {result["index"]: result for result in map(json.loads, output_path.read_text().splitlines())}
+    assert len(output_path.read_text().splitlines()) == 3
+    assert results[0]["answer"] == "kept"
+    assert all("error" not in result for result in results.values())
+    assert [results[i]["query"] for i in range(3)] == questions
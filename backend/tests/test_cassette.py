@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+import scripts.Initialize as Initialize
+from scripts import LocalProviders
+from scripts.helper.cassette import CCassetteMiss
+from scripts.RAGGraph import CRagGraph
+
+NAMESPACE = "cassette-test"
+DOCUMENTS = [
+    "The invoice total for March was 4200 euros, paid by bank transfer.",
+    "Support tickets are answered within two business days.",
+    "The warehouse in Lyon ships orders every weekday morning.",
+]
+QUESTIONS = [
+    "What was the invoice total for March?",
+    "When does the Lyon warehouse ship orders?",
+]
+
+
+def _use_cassette(monkeypatch, path, mode):
+    config = Initialize.load_config()
+    settings = {**config, "CassetteMode": mode, "CassettePath": str(path), "CassetteLatency": "zero"}
+    monkeypatch.setattr(Initialize, "load_config", lambda: settings)
+
+
+def _chat(graph, question):
+    return graph.invoke({"question": question, "memory": ""})["answer"]
+
+
+def _selected_namespaces(filenames):
+    """Resolve namespaces from the uploads collection through the async client, as /chat does."""
+    uploads = Initialize.CInitialize().MInitializeAsyncMongo()["mineai"]["uploads"]
+    file_docs = asyncio.run(uploads.find({"file.filename": {"$in": filenames}}).to_list(length=None))
+    return [doc["file"]["namespace"] for doc in file_docs]
+
+
+def test_record_then_replay_gives_identical_answers(tmp_path, monkeypatch):
+    path = tmp_path / "chat.jsonl.zst"
+
+    _use_cassette(monkeypatch, path, "record")
+    uploads = Initialize.CInitialize().MInitializeAsyncMongo()["mineai"]["uploads"]
+    asyncio.run(uploads.insert_one({"file": {"filename": "handbook.pdf", "namespace": NAMESPACE}}))
+    assert _selected_namespaces(["handbook.pdf"]) == [NAMESPACE]
+    recorder = CRagGraph([NAMESPACE])
+    recorder.pinecone.upsert(
+        vectors=[
+            {"id": f"{NAMESPACE}#{i}", "values": values, "metadata": {"text": text}}
+            for i, (text, values) in enumerate(zip(DOCUMENTS, recorder.embeddings.embed_documents(DOCUMENTS)))
+        ],
+        namespace=NAMESPACE,
+    )
+    graph = recorder.MBuildGraph()
+    recorded = [_chat(graph, question) for question in QUESTIONS]
+    Initialize.CInitialize().Cassette.MSave()
+    assert all(answer.startswith("[local]") for answer in recorded)
+
+    # Replay must not read the local Mongo: the upload is only in the cassette now
+    LocalProviders.GetLocalMongoClient()["mineai"]["uploads"].delete_many({})
+
+    _use_cassette(monkeypatch, path, "replay")
+    assert Initialize.CInitialize().MInitializeAsyncMongo().Inner is None
+    assert _selected_namespaces(["handbook.pdf"]) == [NAMESPACE]
+    with pytest.raises(CCassetteMiss):
+        _selected_namespaces(["other.pdf"])
+    replayer = CRagGraph([NAMESPACE])
+    assert replayer.llm.inner is None
+    graph = replayer.MBuildGraph()
+    assert [_chat(graph, question) for question in QUESTIONS] == recorded
+
+    with pytest.raises(CCassetteMiss):
+        _chat(graph, "Who signed the Lyon lease?")
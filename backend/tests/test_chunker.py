@@ -0,0 +1,31 @@
+import pytest
+from langchain_core.documents import Document
+
+from scripts.Chunker import CTokenChunker, DEFAULT_CHUNK_SETTINGS, SPECIAL_TOKENS
+
+
+def _chunker(**settings):
+    # "hash" is the local-mode tokenizer: one token per word or punctuation mark, no download
+    return CTokenChunker("hash", {"default": {**DEFAULT_CHUNK_SETTINGS, **settings}})
+
+
+def test_default_chunk_fits_the_model_with_special_tokens():
+    chunker = _chunker()
+    assert chunker.MSettingsFor()["chunk_size"] + SPECIAL_TOKENS <= chunker.MaxModelTokens
+
+
+def test_chunks_stay_within_chunk_size():
+    text = " ".join(f"Sentence number {i} talks about attention and transformers." for i in range(200))
+    chunks = _chunker(chunk_size=64, chunk_overlap=8).MSplitDocuments([Document(page_content=text, metadata={"page": 0})])
+    assert len(chunks) > 1
+    assert all(chunk.metadata["chunk_tokens"] <= 64 for chunk in chunks)
+
+
+def test_chunk_size_over_model_limit_is_rejected():
+    chunker = _chunker(chunk_size=256)
+    with pytest.raises(ValueError, match="special tokens"):
+        chunker.MSettingsFor()
+
+
+def test_recursive_strategy_counts_characters_and_is_not_bounded():
+    assert _chunker(strategy="recursive", chunk_size=1000, chunk_overlap=200).MSettingsFor()["chunk_size"] == 1000
@@ -0,0 +1,61 @@
+from scripts.DocStore import DICT_MIN_SAMPLES, CDocStore, MakeChunkId
+
+
+def _texts(count):
+    return [f"Chunk {i}: the quarterly report notes revenue line {i % 7} and region {i % 3}." for i in range(count)]
+
+
+def test_round_trip_with_dictionary(tmp_path):
+    store = CDocStore(str(tmp_path))
+    texts = _texts(DICT_MIN_SAMPLES + 36)
+    store.MWrite("report", texts)
+
+    assert store.MHas("report")
+    assert (tmp_path / "report.zdict").exists()
+    assert store.MGetRange("report", 0, len(texts)) == texts
+    assert store.MGetRange("report", 10, 15) == texts[10:15]
+    assert store.MGetRange("report", -5, len(texts) + 5) == texts
+    assert store.MGet([MakeChunkId("report", i) for i in (0, 42, len(texts) - 1)]) == [texts[0], texts[42], texts[-1]]
+
+
+def test_round_trip_without_dictionary(tmp_path):
+    store = CDocStore(str(tmp_path))
+    texts = _texts(5)
+    store.MWrite("small", texts)
+
+    assert not (tmp_path / "small.zdict").exists()
+    assert store.MGetRange("small", 0, 5) == texts
+    assert store.MGet([MakeChunkId("small", 3)]) == [texts[3]]
+
+
+def test_neighbour_window(tmp_path):
+    store = CDocStore(str(tmp_path))
+    texts = _texts(10)
+    store.MWrite("doc", texts)
+
+    middle, first, last = store.MGet([MakeChunkId("doc", i) for i in (5, 0, 9)], Window=1)
+    assert middle == "\n".join(texts[4:7])
+    assert first == "\n".join(texts[0:2])
+    assert last == "\n".join(texts[8:10])
+
+
+def test_rewrite_replaces_previous_copy(tmp_path):
+    store = CDocStore(str(tmp_path))
+    store.MWrite("doc", _texts(10))
+    assert store.MGet([MakeChunkId("doc", 1)]) == [_texts(10)[1]]
+
+    store.MWrite("doc", ["new first", "new second"])
+    assert store.MGetRange("doc", 0, 10) == ["new first", "new second"]
+
+
+def test_missing_namespace_and_unknown_ids(tmp_path):
+    store = CDocStore(str(tmp_path))
+    store.MWrite("doc", _texts(3))
+
+    assert not store.MHas("absent")
+    assert store.MGetRange("absent", 0, 10) == []
+    assert store.MGet([MakeChunkId("absent", 0), MakeChunkId("doc", 3), "not-an-id"]) == [None, None, None]
+
+    store.MDelete("doc")
+    assert not store.MHas("doc")
+    assert store.MGet([MakeChunkId("doc", 0)]) == [None]
@@ -0,0 +1,52 @@
+import json
+import logging
+
+import numpy as np
+
+from scripts.IntentRouter import CIntentRouter
+
+PROTOTYPES = {
+    "summarize": ["summarize"],
+    "qa": ["qa"],
+    "general": ["general"],
+}
+AXES = {"summarize": [1, 0, 0], "qa": [0, 1, 0], "general": [0, 0, 1]}
+
+
+class _CAxisEmbeddings:
+    """Embeds each prototype as its own axis, so scores are easy to reason about."""
+
+    def embed_documents(self, texts):
+        return [AXES[text] for text in texts]
+
+
+def _router(**kwargs):
+    return CIntentRouter(_CAxisEmbeddings(), PROTOTYPES, **kwargs)
+
+
+def test_clear_winner_is_routed():
+    decision = _router(MinScore=0.35, MinMargin=0.1).MClassify(np.array([0.1, 0.2, 0.9]))
+    assert decision["intent"] == "general"
+
+
+def test_narrow_margin_is_not_confident():
+    # "general" is above MinScore but barely ahead of "qa", e.g. "Who are the authors?"
+    decision = _router(MinScore=0.35, MinMargin=0.1).MClassify(np.array([0.0, 0.68, 0.72]))
+    assert decision["intent"] is None
+    assert decision["margin"] < 0.1
+
+
+def test_low_score_is_not_confident():
+    decision = _router(MinScore=0.9, MinMargin=0.0).MClassify(np.array([0.5, 0.5, 0.7]))
+    assert decision["intent"] is None
+
+
+def test_decision_is_logged_at_info_without_the_question(caplog):
+    caplog.set_level(logging.INFO, logger="IntentRouter")
+    _router().MClassify(np.array([0.1, 0.2, 0.9]), "a private question")
+
+    records = [record for record in caplog.records if record.name == "IntentRouter" and "Intent decision" in record.getMessage()]
+    assert [record.levelno for record in records] == [logging.INFO]
+    decision = json.loads(records[0].getMessage().split("Intent decision ", 1)[1])
+    assert decision["intent"] == "general" and {"confidence", "margin", "ms"} <= set(decision)
+    assert "a private question" not in records[0].getMessage()
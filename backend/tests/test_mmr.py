@@ -0,0 +1,38 @@
+import numpy as np
+
+from scripts.helper.mmr import MaximalMarginalRelevance
+
+QUERY = [1.0, 0.0, 0.0]
+
+
+def test_lambda_one_is_top_k_by_relevance():
+    rng = np.random.default_rng(0)
+    candidates = rng.normal(size=(20, 8))
+    query = rng.normal(size=8)
+    relevance = (candidates / np.linalg.norm(candidates, axis=1, keepdims=True)) @ (query / np.linalg.norm(query))
+
+    assert MaximalMarginalRelevance(query, candidates, 5, Lambda=1.0) == list(np.argsort(-relevance)[:5])
+
+
+def test_duplicate_is_demoted_below_a_diverse_candidate():
+    candidates = [
+        [0.9, 0.1, 0.0],   # best match
+        [0.9, 0.1, 0.0],   # exact duplicate of it
+        [0.7, 0.0, 0.7],   # less relevant but different
+    ]
+    assert MaximalMarginalRelevance(QUERY, candidates, 2, Lambda=1.0) == [0, 1]
+    assert MaximalMarginalRelevance(QUERY, candidates, 2, Lambda=0.5) == [0, 2]
+    assert MaximalMarginalRelevance(QUERY, candidates, 3, Lambda=0.5) == [0, 2, 1]
+
+
+def test_k_at_least_the_candidate_count_returns_each_once():
+    candidates = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.5, 0.5, 0.0]]
+    for k in (3, 10):
+        selected = MaximalMarginalRelevance(QUERY, candidates, k)
+        assert sorted(selected) == [0, 1, 2]
+        assert selected[0] == 0
+
+
+def test_empty_input_and_non_positive_k():
+    assert MaximalMarginalRelevance(QUERY, [], 5) == []
+    assert MaximalMarginalRelevance(QUERY, [[1.0, 0.0, 0.0]], 0) == []
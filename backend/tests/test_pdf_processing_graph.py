@@ -0,0 +1,34 @@
+import asyncio
+import hashlib
+
+from PdfProcessingGraph import PDFProcessingGraph
+
+PAGES = ["Employee handbook\nLeave is accrued monthly.", "Employee handbook\nExpenses need a receipt."]
+
+
+def _seed_pdf(tmp_path, graph, name):
+    # Any bytes will do: the pages come from a seeded text artifact, so the file is only hashed
+    path = tmp_path / f"{name}.pdf"
+    path.write_bytes(f"%PDF-1.4 {name}".encode())
+    file_hash = hashlib.sha256(path.read_bytes()).hexdigest()
+    graph.vector_store.ArtifactStore.MSave(file_hash, PAGES, {"source": path.name})
+    return str(path), file_hash
+
+
+def test_concurrent_runs_keep_their_own_ingest_report(tmp_path):
+    graph = PDFProcessingGraph()
+    graph.vector_store.IngestMemoryProfile = True
+    files = [_seed_pdf(tmp_path, graph, name) for name in ("first", "second")]
+
+    async def run_both():
+        return await asyncio.gather(*(graph.aprocess_pdf(path) for path, _ in files))
+
+    results = asyncio.run(run_both())
+    for result, (_, file_hash) in zip(results, files):
+        assert result["success"], result["error_message"]
+        report = result["ingest_report"]
+        assert report["file_hash"] == file_hash
+        assert report["boilerplate"]["vectors"] > 0
+        # One chunk and one embed stage each, none of the other run's
+        assert [stage["stage"] for stage in report["memory"]] == ["chunk", "embed_store"]
+    assert graph.vector_store.IngestReport == {}
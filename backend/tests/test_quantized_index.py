@@ -0,0 +1,110 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from scripts.QuantizedIndex import CExactIndex, CInt8Index, CPQIndex, CQuantizedIndex, BuildVectorIndex
+
+DIMS = 384
+ROWS = 3000
+K = 10
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    # Clustered vectors, so near neighbours are meaningful, and queries near stored rows
+    rng = np.random.default_rng(7)
+    centres = rng.normal(size=(30, DIMS)).astype(np.float32)
+    matrix = centres[rng.integers(0, len(centres), ROWS)] + 0.5 * rng.normal(size=(ROWS, DIMS)).astype(np.float32)
+    queries = matrix[rng.choice(ROWS, 50, replace=False)] + 0.3 * rng.normal(size=(50, DIMS)).astype(np.float32)
+    ids = [f"id-{row}" for row in range(ROWS)]
+    return ids, matrix, queries
+
+
+def recall(index, exact, queries):
+    hits = 0
+    for query in queries:
+        expected = {id_ for id_, _ in exact.MSearch(query, K)}
+        hits += len(expected & {id_ for id_, _ in index.MSearch(query, K)})
+    return hits / (K * len(queries))
+
+
+@pytest.mark.parametrize("kind, rerank, minimum", [
+    ("int8", False, 0.9),
+    ("int8", True, 0.98),
+    ("pq", False, 0.3),
+    ("pq", True, 0.75),
+])
+def test_recall_against_exact(corpus, tmp_path, kind, rerank, minimum):
+    ids, matrix, queries = corpus
+    exact = CExactIndex(ids, matrix)
+    path = str(tmp_path / "rerank.npy") if rerank else None
+    index = BuildVectorIndex(kind, ids, matrix, path)
+    assert recall(index, exact, queries) >= minimum
+
+
+def test_quantized_index_is_smaller(corpus):
+    ids, matrix, _ = corpus
+    exact = CExactIndex(ids, matrix)
+    assert CInt8Index(ids, matrix).nbytes < exact.nbytes / 3
+    assert CPQIndex(ids, matrix).nbytes < exact.nbytes / 8
+
+
+def test_include_values_returns_stored_vectors(corpus, tmp_path):
+    ids, matrix, queries = corpus
+    index = CInt8Index(ids, matrix, str(tmp_path / "rerank.npy"))
+    results = index.MSearch(queries[0], K, IncludeValues=True)
+    assert len(results) == K
+    row = ids.index(results[0][0])
+    expected = matrix[row] / np.linalg.norm(matrix[row])
+    np.testing.assert_allclose(results[0][2], expected, rtol=1e-5, atol=1e-6)
+
+
+def test_release_removes_rerank_file(corpus, tmp_path):
+    ids, matrix, queries = corpus
+    path = str(tmp_path / "replica" / "rerank.npy")
+    index = CPQIndex(ids, matrix, path)
+    assert os.path.exists(path)
+    index.MRelease()
+    assert not os.path.exists(path)
+    # A search racing the release falls back to the approximate scores instead of failing
+    assert len(index.MSearch(queries[0], K, IncludeValues=True)) == K
+
+
+def test_release_waits_for_readers(corpus, tmp_path):
+    ids, matrix, queries = corpus
+    path = str(tmp_path / "rerank.npy")
+    index = CInt8Index(ids, matrix, path)
+    mapped = index.Rerank
+    reading, release = threading.Event(), threading.Event()
+
+    class _CBlockingRows:
+        def __getitem__(self, key):
+            reading.set()
+            assert release.wait(5)
+            return mapped[key]
+
+    index.Rerank = _CBlockingRows()
+    results = []
+    search = threading.Thread(target=lambda: results.append(index.MSearch(queries[0], K)))
+    search.start()
+    assert reading.wait(5)
+    index.MRelease()
+    # The search still holds the mapped vectors, so the file stays until it finishes
+    assert os.path.exists(path)
+    release.set()
+    search.join(5)
+    assert len(results[0]) == K
+    assert not os.path.exists(path)
+
+
+def test_quantized_base_is_abstract(corpus):
+    ids, matrix, _ = corpus
+    with pytest.raises(TypeError):
+        CQuantizedIndex(ids, matrix)
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        BuildVectorIndex("hnsw", [], np.zeros((0, DIMS)))
@@ -0,0 +1,137 @@
+import os
+import threading
+
+import numpy as np
+
+from scripts.ReplicaCache import CReplicaCache
+
+DIMS = 8
+
+
+class _CVector:
+    def __init__(self, values):
+        self.values = values
+
+
+class _CFetchResponse:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+
+class _CBlockingIndex:
+    """Pinecone-like index whose fetch waits until the test releases it."""
+
+    def __init__(self, block):
+        self.Started = threading.Event()
+        self.Release = threading.Event()
+        if not block:
+            self.Release.set()
+        self.Rng = np.random.default_rng(0)
+
+    def list(self, namespace):
+        yield ["a", "b", "c"]
+
+    def fetch(self, ids, namespace):
+        self.Started.set()
+        self.Release.wait(5)
+        return _CFetchResponse({vector_id: _CVector(list(self.Rng.random(DIMS))) for vector_id in ids})
+
+
+def _warm(cache, namespace="ns"):
+    assert cache.MSearch(namespace, np.ones(DIMS), 2) is None
+    return cache
+
+
+def test_warm_installs_replica():
+    cache = _warm(CReplicaCache(_CBlockingIndex(block=False), WarmAfter=1))
+    cache._executor.shutdown(wait=True)
+    assert "ns" in cache.Replicas
+    assert len(cache.MSearch("ns", np.ones(DIMS), 2)) == 2
+
+
+def test_invalidate_during_warm_discards_the_copy():
+    index = _CBlockingIndex(block=True)
+    cache = _warm(CReplicaCache(index, WarmAfter=1))
+    assert index.Started.wait(5)
+    # Re-indexing finishes while the warm-up is still fetching the old vectors
+    cache.MInvalidate("ns")
+    index.Release.set()
+    cache._executor.shutdown(wait=True)
+    assert "ns" not in cache.Replicas
+    assert cache.Stats["stale_warms"] == 1
+
+
+class _CBlockingRows:
+    """Wraps mapped re-rank vectors so a read waits until the test releases it."""
+
+    def __init__(self, rows):
+        self.Rows = rows
+        self.Reading = threading.Event()
+        self.Release = threading.Event()
+
+    def __getitem__(self, key):
+        self.Reading.set()
+        assert self.Release.wait(5)
+        return self.Rows[key]
+
+
+def _quantized_cache(tmp_path):
+    return CReplicaCache(
+        _CBlockingIndex(block=False), MaxNamespaces=1, WarmAfter=1,
+        Quantization="int8", Rerank=True, Directory=str(tmp_path),
+    )
+
+
+def test_eviction_waits_for_in_flight_search(tmp_path):
+    cache = _quantized_cache(tmp_path)
+    cache.MWarm("a")
+    index = cache.Replicas["a"].Index
+    path = index.RerankPath
+    rows = index.Rerank = _CBlockingRows(index.Rerank)
+
+    results = []
+    search = threading.Thread(target=lambda: results.append(cache.MSearch("a", np.ones(DIMS), 2)))
+    search.start()
+    assert rows.Reading.wait(5)
+    # Warming another namespace evicts "a" while the search is reading its file
+    cache.MWarm("b")
+    assert "a" not in cache.Replicas
+    assert os.path.exists(path)
+
+    rows.Release.set()
+    search.join(5)
+    assert len(results[0]) == 2
+    assert not os.path.exists(path)
+    assert index.Rerank is None
+
+
+def test_concurrent_search_evict_and_invalidate(tmp_path):
+    cache = _quantized_cache(tmp_path)
+    cache.MWarm("a")
+    errors = []
+    stop = threading.Event()
+
+    def search():
+        while not stop.is_set():
+            try:
+                for namespace in ("a", "b"):
+                    hits = cache.MSearch(namespace, np.ones(DIMS), 2, IncludeValues=True)
+                    assert hits is None or len(hits) == 2
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=search) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for round_ in range(30):
+        cache.MWarm("b" if round_ % 2 else "a")
+        if round_ % 5 == 0:
+            cache.MInvalidate("a")
+    stop.set()
+    for thread in threads:
+        thread.join(5)
+    cache._executor.shutdown(wait=True)
+
+    assert errors == []
+    # Only the replica still cached keeps a re-rank file
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(replica.Index.RerankPath) for replica in cache.Replicas.values())
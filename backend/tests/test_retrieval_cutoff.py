@@ -0,0 +1,117 @@
+import pytest
+
+import scripts.RAGGraph as RAGGraph
+import scripts.Retrival as Retrival
+from scripts.AgentGraph import AgentGraphBuilder
+from scripts.RAGGraph import CRagGraph
+from scripts.Retrival import CRetrival
+
+NAMESPACE = "cutoff-test"
+DOCUMENTS = [
+    "The boiler is serviced every October by the building manager.",
+    "Parking permits are renewed online before the end of January.",
+]
+QUESTION = "When is the boiler serviced?"
+NO_CONTEXT_MESSAGE = RAGGraph.config.get("NoContextMessage", "I couldn't find anything about that in your documents.")
+
+
+def _matches(*scores):
+    return [{"id": f"{NAMESPACE}#{i}", "score": score} for i, score in enumerate(scores)]
+
+
+class _CNoLLM:
+    """Fails the test if generation is attempted."""
+
+    def invoke(self, *args, **kwargs):
+        raise AssertionError("the LLM must not be called without context")
+
+    async def ainvoke(self, *args, **kwargs):
+        raise AssertionError("the LLM must not be called without context")
+
+
+@pytest.fixture(scope="module")
+def retrieval():
+    retrieval = CRetrival()
+    vectors = retrieval.embeddings.embed_documents(DOCUMENTS)
+    retrieval.pinecone.upsert(
+        vectors=[
+            {"id": f"{NAMESPACE}#{i}", "values": values, "metadata": {"text": text}}
+            for i, (text, values) in enumerate(zip(DOCUMENTS, vectors))
+        ],
+        namespace=NAMESPACE,
+    )
+    return retrieval
+
+
+def test_relative_cutoff_applies_when_above_the_floor(retrieval, monkeypatch):
+    monkeypatch.setattr(retrieval, "ScoreFloor", 0.25)
+    monkeypatch.setattr(retrieval, "RelativeCutoff", 0.75)
+    # 0.75 x 0.9 = 0.675 is stricter than the floor
+    assert [m["score"] for m in retrieval.MApplyScoreCutoff(_matches(0.9, 0.7, 0.6, 0.3))] == [0.9, 0.7]
+
+
+def test_floor_applies_when_stricter_than_the_relative_cutoff(retrieval, monkeypatch):
+    monkeypatch.setattr(retrieval, "ScoreFloor", 0.25)
+    monkeypatch.setattr(retrieval, "RelativeCutoff", 0.75)
+    # 0.75 x 0.3 = 0.225 is below the floor, so the floor decides
+    assert [m["score"] for m in retrieval.MApplyScoreCutoff(_matches(0.3, 0.26, 0.24))] == [0.3, 0.26]
+
+
+def test_all_below_the_floor_and_no_cutoff(retrieval, monkeypatch):
+    monkeypatch.setattr(retrieval, "ScoreFloor", 0.25)
+    monkeypatch.setattr(retrieval, "RelativeCutoff", 0.75)
+    assert retrieval.MApplyScoreCutoff(_matches(0.2, 0.1)) == []
+    assert retrieval.MApplyScoreCutoff([]) == []
+
+    monkeypatch.setattr(retrieval, "ScoreFloor", 0.0)
+    monkeypatch.setattr(retrieval, "RelativeCutoff", 0.0)
+    assert len(retrieval.MApplyScoreCutoff(_matches(0.9, 0.01, 0.0))) == 3
+
+
+def test_all_below_the_floor_answers_with_the_no_context_message(retrieval, monkeypatch):
+    monkeypatch.setitem(RAGGraph.config, "NoContextFallback", "message")
+    rag = CRagGraph([NAMESPACE])
+    rag.retrieval.ScoreFloor = 0.99
+    rag.llm = _CNoLLM()
+
+    result = rag.MBuildGraph().invoke({"question": QUESTION, "memory": ""})
+    assert result["no_context"] is True
+    assert result["answer"] == NO_CONTEXT_MESSAGE
+
+
+def test_relevant_context_is_answered_by_the_llm(retrieval):
+    rag = CRagGraph([NAMESPACE])
+    result = rag.MBuildGraph().invoke({"question": QUESTION, "memory": ""})
+    assert result["no_context"] is False
+    assert DOCUMENTS[0] in result["context"]
+    assert result["answer"].startswith("[local]")
+
+
+def test_master_fallback_routes_no_context_to_the_general_agent(retrieval, monkeypatch):
+    monkeypatch.setitem(Retrival.config, "RetrievalScoreFloor", 0.99)
+    monkeypatch.setitem(RAGGraph.config, "NoContextFallback", "master")
+    builder = AgentGraphBuilder([NAMESPACE])
+    builder.config["NoContextFallback"] = "master"
+    builder.intent_router = None
+
+    result = builder.build().invoke({"question": QUESTION, "selected_files": ["boiler.pdf"]})
+    assert result["no_context"] is True
+    assert result["answer"].startswith("[local]") and "GENERAL" in result["answer"]
+
+
+def test_query_graph_no_context_paths(retrieval):
+    from QueryProcessingGraph import QueryProcessingGraph
+
+    graph = QueryProcessingGraph()
+    graph.query_module.retrieval.ScoreFloor = 0.99
+    graph.query_module.llm = _CNoLLM()
+    graph.config["NoContextFallback"] = "message"
+    result = graph.process_query("cutoff-chat", NAMESPACE, QUESTION)
+    assert result["ai_response"] == NO_CONTEXT_MESSAGE
+
+    graph = QueryProcessingGraph()
+    graph.query_module.retrieval.ScoreFloor = 0.99
+    graph.config["NoContextFallback"] = "master"
+    result = graph.process_query("cutoff-chat", NAMESPACE, QUESTION)
+    assert result["ai_response"].startswith("[local]")
+    assert "Context" not in result["ai_response"]
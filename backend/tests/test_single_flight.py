@@ -0,0 +1,131 @@
+import asyncio
+
+from scripts.helper.singleFlight import CSingleFlight
+
+
+class _CCountingCall:
+    """Call that blocks until released, counting how many times it actually ran."""
+
+    def __init__(self):
+        self.Runs = 0
+        self.Release = asyncio.Event()
+
+    async def __call__(self, value):
+        self.Runs += 1
+        await self.Release.wait()
+        return value * 2
+
+
+def test_concurrent_identical_keys_run_once():
+    async def scenario():
+        flights = CSingleFlight()
+        call = _CCountingCall()
+        waiters = [asyncio.ensure_future(flights.MDo("key", call, 21)) for _ in range(10)]
+        await asyncio.sleep(0)
+        call.Release.set()
+        results = await asyncio.gather(*waiters)
+        return call.Runs, results, flights.InFlight
+
+    runs, results, in_flight = asyncio.run(scenario())
+    assert runs == 1
+    assert [result for result, _ in results] == [42] * 10
+    assert [shared for _, shared in results].count(False) == 1
+    assert in_flight == {}
+
+
+def test_later_call_runs_again():
+    async def scenario():
+        flights = CSingleFlight()
+        call = _CCountingCall()
+        call.Release.set()
+        await flights.MDo("key", call, 1)
+        await flights.MDo("key", call, 1)
+        return call.Runs
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_cancelling_one_waiter_keeps_the_others():
+    async def scenario():
+        flights = CSingleFlight()
+        call = _CCountingCall()
+        leader = asyncio.ensure_future(flights.MDo("key", call, 5))
+        followers = [asyncio.ensure_future(flights.MDo("key", call, 5)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        call.Release.set()
+        results = await asyncio.gather(*followers)
+        return leader.cancelled(), call.Runs, results
+
+    leader_cancelled, runs, results = asyncio.run(scenario())
+    assert leader_cancelled
+    assert runs == 1
+    assert results == [(10, True)] * 3
+
+
+def test_exception_reaches_every_waiter():
+    async def scenario():
+        flights = CSingleFlight()
+        release = asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise RuntimeError("upstream failed")
+
+        waiters = [asyncio.ensure_future(flights.MDo("key", failing)) for _ in range(4)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*waiters, return_exceptions=True), flights.InFlight
+
+    results, in_flight = asyncio.run(scenario())
+    assert len(results) == 4
+    assert all(isinstance(result, RuntimeError) and str(result) == "upstream failed" for result in results)
+    assert in_flight == {}
+
+
+def test_distinct_keys_do_not_share():
+    async def scenario():
+        flights = CSingleFlight()
+        call = _CCountingCall()
+        waiters = [asyncio.ensure_future(flights.MDo(key, call, key)) for key in (1, 2, 3)]
+        await asyncio.sleep(0)
+        call.Release.set()
+        results = await asyncio.gather(*waiters)
+        return call.Runs, results
+
+    runs, results = asyncio.run(scenario())
+    assert runs == 3
+    assert results == [(2, False), (4, False), (6, False)]
+
+
+class _CFakeGraph:
+    """Agent graph stand-in that answers with the route its state would take."""
+
+    def __init__(self):
+        self.Runs = 0
+        self.Release = asyncio.Event()
+
+    async def ainvoke(self, state):
+        self.Runs += 1
+        await self.Release.wait()
+        return {"answer": "qa" if state["selected_files"] else "master"}
+
+
+def test_chat_turns_differing_only_in_selection_are_not_coalesced():
+    from app.main import run_chat_turn
+
+    async def scenario():
+        graph = _CFakeGraph()
+        turns = [
+            asyncio.ensure_future(run_chat_turn(graph, {"question": "What is due?", "selected_files": selected}, ["ns"]))
+            for selected in ([], ["a.pdf"], ["a.pdf"], [])
+        ]
+        await asyncio.sleep(0)
+        graph.Release.set()
+        results = await asyncio.gather(*turns)
+        return graph.Runs, [result["answer"] for result in results]
+
+    runs, answers = asyncio.run(scenario())
+    assert runs == 2
+    assert answers == ["master", "qa", "qa", "master"]
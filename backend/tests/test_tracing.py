@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from scripts.helper import tracing
+
+
+@pytest.fixture
+def export_path(tmp_path, monkeypatch):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(tracing, "_settings", {
+        "enabled": True,
+        "export_path": str(path),
+        "export_max_mb": 2000 / (1024 * 1024),
+        "export_backups": 2,
+        "export_queue_size": 100,
+    })
+    return path
+
+
+def _finished_trace(name="stage"):
+    with tracing.Trace() as trace:
+        with tracing.Span(name):
+            pass
+    return trace
+
+
+def test_queued_traces_are_written_in_the_background(export_path):
+    traces = [_finished_trace() for _ in range(3)]
+    for trace in traces:
+        tracing.QueueTraceExport(trace)
+    tracing.FlushTraceExports()
+    lines = export_path.read_text().splitlines()
+    assert len(lines) == 3
+    assert "resourceSpans" in json.loads(lines[0])
+
+
+def test_export_file_rotates_and_keeps_a_bounded_number_of_backups(export_path):
+    for _ in range(60):
+        tracing.ExportTrace(_finished_trace())
+    rotated = sorted(p.name for p in export_path.parent.iterdir())
+    assert rotated == ["spans.jsonl", "spans.jsonl.1", "spans.jsonl.2"]
+    assert export_path.stat().st_size < 2000 + 2048